@@ -0,0 +1,149 @@
+import json
+import os
+
+import numpy as np
+
+from .Basis import Basis
+from .Material import Material
+from .Plane import Plane
+from .Polygon import Polygon
+from .Spectrum import Spectrum
+
+class Archive(object):
+
+    # On-disk format for spaces & search results (see Space.save() & Receiver.save()): a directory with one .npy
+    # file per array, memory-mapped when loaded, so that only what is used is read; and archive.json, listing
+    # the arrays & the materials they refer to. Polygons are packed into padded arrays, as in PolygonTable, which
+    # can use them as they are (see Space.load()).
+
+    __version = 1
+
+    @staticmethod
+    def save(path, arrays, materials):
+        os.makedirs(path, exist_ok=True)
+
+        for name in arrays:
+            np.save(os.path.join(path, name + '.npy'), np.asarray(arrays[name]))
+
+        info = { 'version': Archive.__version, 'arrays': sorted(arrays), 'materials': [m.state() for m in materials] }
+        with open(os.path.join(path, 'archive.json'), 'w') as file:
+            json.dump(info, file)
+
+    @staticmethod
+    def load(path, known=None, mode='r'):
+        # returns the arrays, memory-mapped with mode ('r', or 'c' for copy-on-write), & the materials; a material
+        # with the same state as one of known (a list of Materials) is that material, rather than a copy
+        with open(os.path.join(path, 'archive.json'), 'r') as file:
+            info = json.load(file)
+
+        if info['version'] != Archive.__version:
+            print('Archive: ' + path + ' has version ' + str(info['version']) + '; expected ' + str(Archive.__version))
+
+        arrays = { }
+        for name in info['arrays']:
+            arrays[name] = np.load(os.path.join(path, name + '.npy'), mmap_mode=mode)
+
+        if known is None:
+            known = []
+        known_states = [json.dumps(m.state(), sort_keys=True) for m in known]
+
+        materials = []
+        for state in info['materials']:
+            key = json.dumps(state, sort_keys=True)
+            if key in known_states:
+                materials.append(known[known_states.index(key)])
+            else:
+                materials.append(Material.from_state(state))
+
+        return arrays, materials
+
+    @staticmethod
+    def pack(polygons, materials, prefix=''):
+        # arrays for polygons, named with prefix; materials (a list) gains any materials of polygons not already in it
+        count = len(polygons)
+        width = 1
+        for p in polygons:
+            width = max(width, p.count)
+
+        counts = np.zeros(count, dtype=int)
+        verts = np.zeros((count, width, 2))
+        origins = np.zeros((count, 3))
+        matrices = np.zeros((count, 3, 3))
+        offsets = np.zeros((count, 3))
+        index = np.zeros(count, dtype=int)
+        flags = np.zeros((count, 3), dtype=bool) # 'ill_only', 'dynamic', 'offset' in props
+        absorption = np.zeros(count)
+        absorption_bands = np.full((count, Spectrum.count()), np.nan) # NaN if None
+
+        for i in range(0, count):
+            p = polygons[i]
+            counts[i] = p.count
+            verts[i,0:p.count,:] = p.verts[0:p.count,:]
+            origins[i,:] = p.plane.basis.origin
+            matrices[i,:,:] = p.plane.basis.matrix
+
+            material = p.props['material']
+            if material not in materials:
+                materials.append(material)
+            index[i] = materials.index(material)
+
+            flags[i,0] = 'ill_only' in p.props
+            flags[i,1] = 'dynamic' in p.props
+            if 'offset' in p.props:
+                flags[i,2] = True
+                offsets[i,:] = p.props['offset']
+
+            absorption[i] = p.absorption
+            if p.absorption_bands is not None:
+                absorption_bands[i,:] = p.absorption_bands
+
+        return { prefix + 'counts': counts, prefix + 'verts': verts, prefix + 'origins': origins, prefix + 'matrices': matrices,
+                 prefix + 'offsets': offsets, prefix + 'material': index, prefix + 'flags': flags,
+                 prefix + 'absorption': absorption, prefix + 'absorption_bands': absorption_bands }
+
+    @staticmethod
+    def unpack(arrays, materials, prefix='', copy=True):
+        # the polygons packed by pack(); unless copy, their vertices & planes are views onto the (memory-mapped)
+        # arrays, so only what is used is read; the per-polygon scalars (counts, materials, flags, ...) are read in
+        # full, as plain arrays, since they are small & indexing a memmap row by row is slow
+        counts = np.asarray(arrays[prefix + 'counts']).tolist()
+        verts = np.asarray(arrays[prefix + 'verts'])
+        origins = np.asarray(arrays[prefix + 'origins'])
+        matrices = np.asarray(arrays[prefix + 'matrices'])
+        offsets = np.asarray(arrays[prefix + 'offsets'])
+        index = np.asarray(arrays[prefix + 'material']).tolist()
+        flags = np.asarray(arrays[prefix + 'flags']).tolist()
+        absorption = np.asarray(arrays[prefix + 'absorption']).tolist()
+        banded = (~np.isnan(np.asarray(arrays[prefix + 'absorption_bands'][:,0]))).tolist()
+        absorption_bands = np.asarray(arrays[prefix + 'absorption_bands'])
+
+        polygons = []
+
+        for i in range(0, len(counts)):
+            basis = Basis()
+            count = counts[i]
+            if copy:
+                basis.origin = np.array(origins[i,:])
+                basis.matrix = np.array(matrices[i,:,:])
+                p = Polygon(Plane(basis), (count, np.array(verts[i,0:count,:])))
+            else:
+                basis.origin = origins[i,:]
+                basis.matrix = matrices[i,:,:]
+                p = Polygon(Plane(basis), count)
+                p.verts = verts[i,0:count,:]
+
+            p.props['material'] = materials[index[i]]
+            if flags[i][0]:
+                p.props['ill_only'] = True
+            if flags[i][1]:
+                p.props['dynamic'] = True
+            if flags[i][2]:
+                p.props['offset'] = np.array(offsets[i,:])
+
+            p.absorption = absorption[i]
+            if banded[i]:
+                p.absorption_bands = np.array(absorption_bands[i,:])
+
+            polygons.append(p)
+
+        return polygons
@@ -0,0 +1,195 @@
+import numpy as np
+
+class BVH(object):
+
+    __leaf_size = 4     # maximum number of polygons in a leaf node
+    __margin = 1E-6     # padding [m] so that culling is always conservative
+
+    def __init__(self, polygons):
+        # bounding-volume hierarchy (axis-aligned bounding boxes) over the real surfaces in polygons;
+        # query results are indices into polygons, in their original order
+
+        indices = []
+        for i in range(0, len(polygons)):
+            if 'ill_only' not in polygons[i].props:
+                indices.append(i)
+
+        count = len(indices)
+
+        self.poly_index = np.asarray(indices, dtype=int)
+        self.poly_lo, self.poly_hi = BVH.bounds([polygons[i] for i in indices])
+
+        # node arrays; a node is a leaf if node_left < 0, and covers self.order[node_start:node_end]
+        self.order = np.arange(count)
+        self.node_lo = []
+        self.node_hi = []
+        self.node_left = []
+        self.node_right = []
+        self.node_start = []
+        self.node_end = []
+
+        if count > 0:
+            self.__build(0, count)
+
+        self.node_lo = np.asarray(self.node_lo).reshape((-1, 3))
+        self.node_hi = np.asarray(self.node_hi).reshape((-1, 3))
+        self.node_left = np.asarray(self.node_left, dtype=int)
+        self.node_right = np.asarray(self.node_right, dtype=int)
+        self.node_start = np.asarray(self.node_start, dtype=int)
+        self.node_end = np.asarray(self.node_end, dtype=int)
+
+    def __add_node(self, start, end):
+        members = self.order[start:end]
+
+        self.node_lo.append(np.min(self.poly_lo[members,:], axis=0))
+        self.node_hi.append(np.max(self.poly_hi[members,:], axis=0))
+        self.node_left.append(-1)
+        self.node_right.append(-1)
+        self.node_start.append(start)
+        self.node_end.append(end)
+
+        return len(self.node_start) - 1
+
+    def __build(self, start, end):
+        root = self.__add_node(start, end)
+
+        stack = [root]
+        while len(stack) > 0:
+            node = stack.pop()
+            start = self.node_start[node]
+            end = self.node_end[node]
+
+            if end - start <= BVH.__leaf_size:
+                continue
+
+            # split at the median centroid along the longest axis of the node's box
+            members = self.order[start:end]
+            centers = (self.poly_lo[members,:] + self.poly_hi[members,:]) / 2
+            axis = np.argmax(self.node_hi[node] - self.node_lo[node])
+            self.order[start:end] = members[np.argsort(centers[:,axis], kind='stable')]
+
+            middle = (start + end) // 2
+            self.node_left[node] = self.__add_node(start, middle)
+            self.node_right[node] = self.__add_node(middle, end)
+
+            stack.append(self.node_left[node])
+            stack.append(self.node_right[node])
+
+    @staticmethod
+    def bounds(polygons): # (lo, hi) corners (N,3) of the padded bounding boxes of polygons, as the hierarchy uses
+        count = len(polygons)
+        lo = np.zeros((count, 3))
+        hi = np.zeros((count, 3))
+
+        for p in range(0, count):
+            v3D, vc = polygons[p].vertices()
+            lo[p,:] = np.min(v3D[0:vc,:], axis=0) - BVH.__margin
+            hi[p,:] = np.max(v3D[0:vc,:], axis=0) + BVH.__margin
+
+        return lo, hi
+
+    @staticmethod
+    def frustum(origin, window):
+        # half-spaces (n, d), with n.x + d >= 0 inside, bounding the pyramid from origin through window;
+        # returns None if the origin lies in the window plane (nothing can be seen)
+
+        origin = np.asarray(origin, dtype='float64')
+
+        normal = window.plane.normal()
+        xy_o, z_o = window.plane.project(origin)
+        if z_o == 0:
+            return None
+
+        planes = []
+
+        # visible polygons must reach above the window plane
+        planes.append(np.append(normal, -window.plane.distance()))
+
+        if z_o < 0:
+            # the origin is behind the window, so the pyramid is bounded by the window edges too
+            v3D, count = window.vertices()
+            v3D = v3D[0:count,:].copy()
+            center = np.mean(v3D, axis=0)
+
+            for i1 in range(0, count):
+                i2 = i1 + 1
+                if i2 == count:
+                    i2 = 0
+
+                n = np.cross(v3D[i1,:] - origin, v3D[i2,:] - origin)
+                length = np.linalg.norm(n)
+                if length == 0:
+                    continue
+                n /= length
+                if np.dot(n, center - origin) < 0:
+                    n = -n
+
+                planes.append(np.append(n, -np.dot(n, origin)))
+
+        return np.asarray(planes)
+
+    @staticmethod
+    def __outside(lo, hi, planes):
+        # boxes (N,3) entirely on the outside of any one plane; planes (P,4)
+        n = planes[:,0:3]
+        d = planes[:,3]
+        far = np.where(n[np.newaxis,:,:] >= 0, hi[:,np.newaxis,:], lo[:,np.newaxis,:]) # (N,P,3)
+        return np.any(np.sum(far * n[np.newaxis,:,:], axis=2) + d[np.newaxis,:] < 0, axis=1)
+
+    @staticmethod
+    def intersecting(lo, hi, planes): # which of the boxes (N,3) might intersect the convex volume bounded by planes
+        return ~BVH.__outside(lo, hi, planes)
+
+    @staticmethod
+    def overlaps(lo, hi, planes): # whether any of the boxes (N,3) might intersect the convex volume bounded by planes
+        if len(lo) == 0:
+            return False
+        return not np.all(BVH.__outside(lo, hi, planes))
+
+    def query(self, planes):
+        # indices of polygons whose bounding boxes intersect the convex volume bounded by planes
+
+        if len(self.node_start) == 0:
+            return []
+
+        found = []
+        frontier = np.asarray([0])
+
+        while len(frontier) > 0:
+            frontier = frontier[~BVH.__outside(self.node_lo[frontier], self.node_hi[frontier], planes)]
+
+            leaves = frontier[self.node_left[frontier] < 0]
+            for node in leaves:
+                found.append(self.order[self.node_start[node]:self.node_end[node]])
+
+            inner = frontier[self.node_left[frontier] >= 0]
+            frontier = np.concatenate((self.node_left[inner], self.node_right[inner]))
+
+        if len(found) == 0:
+            return []
+
+        members = np.concatenate(found)
+        members = members[~BVH.__outside(self.poly_lo[members], self.poly_hi[members], planes)]
+
+        return np.sort(self.poly_index[members]).tolist()
+
+    @staticmethod
+    def box(lo, hi):
+        # half-spaces (n, d), as frustum(), bounding the axis-aligned box from lo to hi
+        planes = np.zeros((6, 4))
+        planes[0:3,0:3] = np.identity(3)
+        planes[0:3,3] = -np.asarray(lo, dtype='float64')
+        planes[3:6,0:3] = -np.identity(3)
+        planes[3:6,3] = np.asarray(hi, dtype='float64')
+        return planes
+
+    def segment_query(self, p1, p2):
+        # indices of polygons whose bounding boxes meet the bounding box of the line segment from p1 to p2
+        return self.query(BVH.box(np.minimum(p1, p2), np.maximum(p1, p2)))
+
+    def frustum_query(self, origin, window):
+        # indices of polygons that can intersect the pyramid from origin through window
+        planes = BVH.frustum(origin, window)
+        if planes is None:
+            return []
+        return self.query(planes)
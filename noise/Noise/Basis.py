@@ -2,26 +2,29 @@ import numpy as np
 
 class Basis(object):
 
+    __slots__ = ('origin', 'matrix')
+
     __resolution = 1E-9
     __eqdecimals = 9 # how many decimals to round off to for relative coordinates
 
     def __init__(self, basis=None, transform=None):
+        # origin (3,) and axes (3,3; rows e_i, e_j, e_k) are plain arrays, in absolute coordinates
         if basis is not None:
             self.origin = basis.origin.copy()
             if transform is not None:
-                self.matrix = np.asmatrix(transform) * basis.matrix
+                self.matrix = np.dot(np.asarray(transform, dtype='float64'), basis.matrix)
             else:
                 self.matrix = basis.matrix.copy()
         else:
-            self.origin = np.matrix([[0,0,0]], dtype='float64')
-            self.matrix = np.matrix([[1,0,0],[0,1,0],[0,0,1]], dtype='float64')
+            self.origin = np.zeros(3)
+            self.matrix = np.identity(3)
 
     @staticmethod
     def using(origin_abs, ei, ej, ek):
         basis = Basis()
 
-        basis.origin = np.matrix(origin_abs, dtype='float64')
-        basis.matrix = np.matrix([ei, ej, ek], dtype='float64')
+        basis.origin = np.array(origin_abs, dtype='float64').reshape(3)
+        basis.matrix = np.array([ei, ej, ek], dtype='float64')
 
         return basis
 
@@ -30,6 +33,10 @@ class Basis(object):
         Basis.__eqdecimals = decimals
         Basis.__resolution = 10**(-decimals)
 
+    @staticmethod
+    def resolution():
+        return Basis.__resolution
+
     @staticmethod
     def zero_if_negligible(value):
         if (value > -Basis.__resolution) and (value < Basis.__resolution):
@@ -52,35 +59,41 @@ class Basis(object):
     def is_strictly_negative(value):
         return value < -Basis.__resolution
 
-    def rel_to_abs(self, coord_rel):
-        coord_rel = np.asarray(coord_rel)
+    # Note: single points are transformed as (1,3) rows and batches as stacks of (1,3) rows, so that
+    # every point rounds the same way whichever entry point it comes through
 
-        mat_rel = np.asarray(self.origin + np.asmatrix(coord_rel) * self.matrix)
+    def rel_to_abs(self, coord_rel):
+        coord_rel = np.asarray(coord_rel, dtype='float64')
 
         if coord_rel.shape == (3,):
-            return mat_rel[0]
+            return self.origin + np.dot(coord_rel[np.newaxis,:], self.matrix)[0]
 
-        return mat_rel
+        return self.origin + np.dot(coord_rel, self.matrix)
 
     def abs_to_rel(self, coord_abs):
-        mat_abs = (np.asmatrix(coord_abs) - self.origin) * self.matrix.getT()
-
-        #if Basis.__eqdecimals > 0:
-        #    mat_abs = np.around(mat_abs, decimals=Basis.__eqdecimals)
+        coord_abs = np.asarray(coord_abs, dtype='float64')
 
         if coord_abs.shape == (3,):
-            return np.asarray(mat_abs)[0]
+            return np.dot((coord_abs - self.origin)[np.newaxis,:], self.matrix.T)[0]
+
+        return np.dot(coord_abs - self.origin, self.matrix.T)
+
+    def rel_to_abs_many(self, coord_rel): # (N,3) relative to (N,3) absolute coordinates
+        coord_rel = np.asarray(coord_rel, dtype='float64')
+        return self.origin + np.matmul(coord_rel[:,np.newaxis,:], self.matrix)[:,0,:]
 
-        return np.asarray(mat_abs)
+    def abs_to_rel_many(self, coord_abs): # (N,3) absolute to (N,3) relative coordinates
+        coord_abs = np.asarray(coord_abs, dtype='float64')
+        return np.matmul((coord_abs - self.origin)[:,np.newaxis,:], self.matrix.T)[:,0,:]
 
     def e_i(self):
-        return np.asarray(self.matrix[0,:])[0]
+        return self.matrix[0,:]
 
     def e_j(self):
-        return np.asarray(self.matrix[1,:])[0]
+        return self.matrix[1,:]
 
     def e_k(self):
-        return np.asarray(self.matrix[2,:])[0]
+        return self.matrix[2,:]
 
     @staticmethod
     def separation(coord_1, coord_2): # distance between two points; can be abs or rel, so long as the bases are the same
@@ -0,0 +1,126 @@
+import csv
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from .Space import Space
+from .Stats import Stats
+
+class Batch(object):
+
+    # Parametric study: every (scene variant, receiver placement, ear) combination is an independent job,
+    # run across a pool of processes. Variants are built by builder(space, *args), where builder is a
+    # module-level function or a static method, e.g., of Scenes (i.e., picklable); each worker builds a given
+    # variant at most once.
+
+    __ears = ('left', 'right')
+
+    _worker_spaces = { } # per-process cache of built variants
+
+    def __init__(self, iterations, drop_if, printing=False):
+        self.iterations = iterations
+        self.drop_if = drop_if
+        self.printing = printing # whether the searches print their progress & results (see Stats.log())
+
+        self.variants = []  # (label, builder, args)
+        self.receivers = [] # (label, basis, dimension)
+        self.results = None
+
+    def add_variant(self, label, builder, *args):
+        self.variants.append((label, builder, args))
+
+    def add_receiver(self, label, basis, dimension=2):
+        self.receivers.append((label, basis, dimension))
+
+    def jobs(self):
+        jobs = []
+        for v in self.variants:
+            for r in self.receivers:
+                for ear in Batch.__ears:
+                    jobs.append((v, r, ear, self.iterations, self.drop_if, self.printing))
+        return jobs
+
+    @staticmethod
+    def _run_job(job):
+        variant, receiver, ear, iterations, drop_if, printing = job
+        v_label, builder, args = variant
+        r_label, basis, dimension = receiver
+
+        was_printing = Stats.printing()
+        Stats.set_printing(printing)
+
+        start = time.perf_counter()
+        if v_label not in Batch._worker_spaces:
+            space = Space()
+            builder(space, *args)
+            Batch._worker_spaces[v_label] = space
+        space = Batch._worker_spaces[v_label]
+        t_build = time.perf_counter() - start
+
+        l_ear, r_ear = space.make_receiver(basis, dimension, add=False) # leave the cached space as it was built
+        if ear == 'left':
+            receiver = l_ear
+        else:
+            receiver = r_ear
+
+        start = time.perf_counter()
+        receiver.search(iterations, drop_if)
+        t_search = time.perf_counter() - start
+
+        start = time.perf_counter()
+        totals = receiver.calc()
+        t_calc = time.perf_counter() - start
+
+        Stats.set_printing(was_printing)
+
+        return { 'variant': v_label, 'receiver': r_label, 'ear': ear, 'sources': len(receiver.sources),
+                 'totals': totals, 'build': t_build, 'search': t_search, 'calc': t_calc }
+
+    def run(self, workers=None):
+        # workers=None uses every core; workers=1 runs the jobs here, in order
+        jobs = self.jobs()
+
+        if workers == 1:
+            self.results = [Batch._run_job(job) for job in jobs]
+            Batch._worker_spaces = { }
+        else:
+            with ProcessPoolExecutor(workers) as executor:
+                self.results = list(executor.map(Batch._run_job, jobs))
+
+        return self.results
+
+    def table(self):
+        # tidy table: one row per (variant, receiver, ear, label), with the job's timings [s]
+        rows = []
+
+        if self.results is None:
+            print('You need to run() before you can table()')
+            return rows
+
+        for result in self.results:
+            totals = result['totals']
+            if 'total' not in totals: # nothing heard; keep the job (and its timings) in the table
+                totals = { 'total': 0 }
+
+            for label in totals:
+                rows.append({ 'variant': result['variant'], 'receiver': result['receiver'], 'ear': result['ear'],
+                              'label': label, 'dB': totals[label], 'sources': result['sources'],
+                              'build': result['build'], 'search': result['search'], 'calc': result['calc'] })
+
+        return rows
+
+    def value(self, variant, receiver, ear, label): # dB, or 0 if nothing was heard from label
+        for result in self.results:
+            if result['variant'] == variant and result['receiver'] == receiver and result['ear'] == ear:
+                if label in result['totals']:
+                    return result['totals'][label]
+        return 0
+
+    def write_csv(self, filename):
+        fields = ['variant', 'receiver', 'ear', 'label', 'dB', 'sources', 'build', 'search', 'calc']
+
+        with open(filename, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for row in self.table():
+                writer.writerow(row)
@@ -0,0 +1,120 @@
+import numpy as np
+
+from .Basis import Basis
+from .Plane import Plane
+
+class BeamTree(object):
+
+    # Arena of the views that beams have passed through on their way out from a receiver: one record per
+    # parent view, holding what the path walks (dB_calc, show_history) need - the view's origin, its window's
+    # plane & absorption - and the index of the record before it (-1 at the receiver). Views refer to their
+    # parent record by index, so a resolved source pins a few rows here rather than a chain of Views.
+
+    def __init__(self, capacity=256):
+        self.size = 0
+        self.__allocate(capacity)
+
+    def __allocate(self, capacity):
+        origins    = np.zeros((capacity, 3))
+        w_origins  = np.zeros((capacity, 3))
+        w_matrices = np.zeros((capacity, 3, 3))
+        absorption = np.zeros(capacity)
+        parents    = np.zeros(capacity, dtype=int)
+
+        if self.size > 0:
+            n = self.size
+            origins[0:n,:]      = self.origins[0:n,:]
+            w_origins[0:n,:]    = self.w_origins[0:n,:]
+            w_matrices[0:n,:,:] = self.w_matrices[0:n,:,:]
+            absorption[0:n]     = self.absorption[0:n]
+            parents[0:n]        = self.parents[0:n]
+
+        self.origins    = origins    # (N,3) view origins
+        self.w_origins  = w_origins  # (N,3) window plane origins
+        self.w_matrices = w_matrices # (N,3,3) window plane axes (rows e_i, e_j, e_k)
+        self.absorption = absorption # (N,) window absorption; 1 = total absorption
+        self.parents    = parents    # (N,) index of the parent record, or -1
+
+    def add(self, view): # record view as a parent; returns the index of its record
+        if self.size == self.origins.shape[0]:
+            self.__allocate(max(2 * self.size, 256))
+
+        index = self.size
+        self.size += 1
+
+        plane = view.region.window.plane
+        self.origins[index,:] = view.region.origin
+        self.w_origins[index,:] = plane.basis.origin
+        self.w_matrices[index,:,:] = plane.basis.matrix
+        self.absorption[index] = view.region.window.absorption
+        self.parents[index] = view.node
+
+        return index
+
+    def arrays(self): # the records, e.g., to save; see from_arrays()
+        n = self.size
+        return { 'origins': self.origins[0:n,:], 'w_origins': self.w_origins[0:n,:], 'w_matrices': self.w_matrices[0:n,:,:],
+                 'absorption': self.absorption[0:n], 'parents': self.parents[0:n] }
+
+    @staticmethod
+    def from_arrays(arrays):
+        # the arrays are used as they are, so may be memory-mapped & read-only; they are copied when the tree grows
+        tree = BeamTree(0)
+        tree.size = len(arrays['parents'])
+        tree.origins = arrays['origins']
+        tree.w_origins = arrays['w_origins']
+        tree.w_matrices = arrays['w_matrices']
+        tree.absorption = arrays['absorption']
+        tree.parents = arrays['parents']
+        return tree
+
+    def detach(self, view):
+        # give view a tree of its own, holding just the records of its path, so that this tree may be compacted
+        nodes = self.chain(view.node)[::-1] # from the receiver
+        tree = BeamTree(max(len(nodes), 1))
+        tree.size = len(nodes)
+        tree.origins[0:tree.size,:] = self.origins[nodes,:]
+        tree.w_origins[0:tree.size,:] = self.w_origins[nodes,:]
+        tree.w_matrices[0:tree.size,:,:] = self.w_matrices[nodes,:,:]
+        tree.absorption[0:tree.size] = self.absorption[nodes]
+        tree.parents[0:tree.size] = np.arange(-1, tree.size - 1)
+
+        view.tree = tree
+        view.node = tree.size - 1
+
+    def compact(self, views):
+        # keep only the records on the paths of views, renumbering them (& the views' nodes) in the same order; any
+        # other views of this tree are left with the wrong paths, so detach() those still needed first
+        keep = np.zeros(self.size, dtype=bool)
+        for v in views:
+            node = v.node
+            while node >= 0 and not keep[node]: # paths share their records nearer the receiver
+                keep[node] = True
+                node = self.parents[node]
+
+        kept = np.nonzero(keep)[0]
+        renumber = np.full(self.size + 1, -1, dtype=int) # the last entry is for parent -1
+        renumber[kept] = np.arange(len(kept))
+
+        self.origins = self.origins[kept,:] # new arrays; the old may be memory-mapped (see from_arrays())
+        self.w_origins = self.w_origins[kept,:]
+        self.w_matrices = self.w_matrices[kept,:,:]
+        self.absorption = self.absorption[kept]
+        self.parents = renumber[self.parents[kept]]
+        self.size = len(kept)
+
+        for v in views:
+            v.node = int(renumber[v.node])
+
+    def chain(self, node): # indices of the records from node back to the receiver
+        nodes = []
+        while node >= 0:
+            nodes.append(node)
+            node = self.parents[node]
+        return nodes
+
+    def plane(self, node): # the window plane of a record
+        basis = Basis()
+        basis.origin = self.w_origins[node,:].copy()
+        basis.matrix = self.w_matrices[node,:,:].copy()
+        return Plane(basis)
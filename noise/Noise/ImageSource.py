@@ -0,0 +1,140 @@
+import numpy as np
+
+from .Spectrum import Spectrum
+
+class ImageSource(object):
+
+    # Image-source engine: an alternative to the beam search of View.search() for low-order specular paths.
+    # The receiver's origin is mirrored through each reflective polygon in view (View.reflect_view(), i.e.,
+    # Plane.reflect), and from each image in turn through each reflective polygon in its view, up to order
+    # reflections; polygons out of view are culled with the scene's BVH, as in a beam search. Sources reflect too,
+    # as in Receiver.search(). Each source in view of an image is then checked by tracing paths back to the
+    # receiver from points of the part of it in view - its center, & halfway from there to each vertex: a path
+    # must pass through every window on the way, & no real surface may block it. The source's energy is scaled by
+    # the mean transmission over the points, blocked points transmitting nothing, so a partly blocked source
+    # counts in part (an estimate, from a few points, of the share of it that is in the clear), & a source is
+    # only rejected if every path is blocked. Refractive surfaces are not followed, but are treated as
+    # transparent, with their transmission loss, as the through-views of a beam search. The sources found are
+    # Views, as Receiver.search() finds, for Receiver.calc() & calc_bands().
+
+    def __init__(self, space, order, drop_if):
+        self.space = space
+        self.order = order     # maximum number of reflections
+        self.drop_if = drop_if # as Receiver.search(): images whose windows absorb more than this are dropped
+
+        self.sources = []
+        self.images = 0   # number of views (the receiver's & its images) searched
+        self.rejected = 0 # sources in view of an image, whose paths miss a window or are blocked
+
+    def search(self, view): # find the sources reached from view directly, & by up to order reflections
+        self.__search([view])
+
+    def __search(self, chain): # chain: the views from the receiver's to the latest image, in order
+        view = chain[-1]
+        self.images += 1
+
+        for p in self.space.frustum_polygons(view.region.origin, view.region.window):
+            if 'ill_only' in p.props:
+                continue
+
+            material = p.props['material']
+
+            if material.is_source():
+                self.__resolve(chain, p)
+            if material.is_reflective() and len(chain) <= self.order:
+                local_xy, local_z = p.plane.project(view.region.origin)
+                if local_z <= 0:
+                    continue # we're in or behind the plane - no reflection
+
+                seen = view.copy()
+                seen.region.target = p
+                image = seen.reflect_view()
+
+                if image.region.window.absorption > self.drop_if:
+                    continue
+                self.__search(chain + [image])
+
+    def __resolve(self, chain, source):
+        view = chain[-1]
+
+        # the part of the source in view of the image
+        pp = view.region.window.project_and_crop(view.region.origin, source)
+        if pp is None:
+            return
+        window, target = pp
+
+        # the mean transmission of the paths from the points sampled
+        center = target.center()
+        v3D, count = target.vertices()
+        points = [center] + [(center + v3D[k,:]) / 2 for k in range(0, count)]
+
+        reached = 0
+        transmitted = 0
+        transmitted_bands = Spectrum.bands(0)
+        for point in points:
+            absorption, bands = self.__trace(chain, point)
+            if absorption is not None:
+                reached += 1
+                transmitted += (1 - absorption) / len(points)
+                transmitted_bands = transmitted_bands + (1 - bands) / len(points)
+        if reached == 0:
+            self.rejected += 1
+            return
+
+        # window is a new, cropped copy of the image's window
+        window.absorption = 1 - (1 - view.region.window.absorption) * transmitted
+        window.absorption_bands = 1 - (1 - view.region.window.absorption_bands) * transmitted_bands
+
+        found = view.copy()
+        found.region.window = window
+        found.region.target = target
+        self.sources.append(found)
+
+    def __trace(self, chain, point):
+        # follow the path back from point to the receiver, crossing the window of each view in chain; returns the
+        # (broadband, per-band) absorption of the refractive surfaces on the way, or (None, None) if the path
+        # misses a window or is blocked
+        transmitted = 1
+        transmitted_bands = Spectrum.bands(1)
+
+        # the crossings first, since missing a window is quicker to find than a blocker
+        segments = [] # the real path, in parts: (crossing, point)
+        for view in reversed(chain):
+            crossing = ImageSource.__crossing(view.region.window, view.region.origin, point)
+            if crossing is None:
+                return None, None
+            segments.append((crossing, point))
+            point = crossing
+
+        for crossing, point in segments:
+            for p in self.space.segment_polygons(crossing, point):
+                if 'ill_only' in p.props:
+                    continue
+                if ImageSource.__crossing(p, crossing, point) is None:
+                    continue
+
+                material = p.props['material']
+                if not material.is_refractive():
+                    return None, None
+
+                abs_transmitted, abs_refracted = material.absorption()
+                bands_transmitted, bands_refracted = material.absorption_bands()
+                transmitted *= 1 - abs_transmitted
+                transmitted_bands = transmitted_bands * (1 - bands_transmitted)
+
+        return 1 - transmitted, 1 - transmitted_bands
+
+    @staticmethod
+    def __crossing(polygon, p1, p2):
+        # where the line segment from p1 to p2 crosses polygon, strictly between its ends; or None
+        xy_1, z_1 = polygon.plane.project(p1)
+        xy_2, z_2 = polygon.plane.project(p2)
+        if z_1 * z_2 >= 0:
+            return None
+
+        t = z_1 / (z_1 - z_2)
+        xy = np.asarray(xy_1) + t * (np.asarray(xy_2) - np.asarray(xy_1))
+        if not polygon.contains(xy):
+            return None
+
+        return p1 + t * (p2 - p1)
@@ -1,3 +1,7 @@
+import numpy as np
+
+from .Spectrum import Spectrum
+
 class Material(object):
 
     __source = None
@@ -88,6 +92,9 @@ class Material(object):
         self._reflective = False
         self._refractive = False
         self._absorption = 0     # 1 = total absorption
+        self._absorption_bands = Spectrum.bands(0)
+        self._amplitude = 0
+        self._amplitude_bands = Spectrum.bands(0)
         self._illustrative = False
 
     def label(self):        # 1 = total absorption
@@ -96,6 +103,9 @@ class Material(object):
     def absorption(self):        # 1 = total absorption
         return self._absorption
 
+    def absorption_bands(self):  # per octave band; (transmitted,refracted) if refractive
+        return self._absorption_bands
+
     def color(self, ambient, brightness):
         c = self._color
 
@@ -121,45 +131,94 @@ class Material(object):
         return self._source
 
     def make_source(self, absorption, amplitude): # 1 = total absorption; amplitude reference dB at 10m
+        # either may be a single value or per octave band (see Spectrum)
         self._source = True
-        self._amplitude = amplitude
+        self._amplitude, self._amplitude_bands = Spectrum.amplitude(amplitude)
         self._reflective = True
         self._refractive = False
-        self._absorption = absorption
+        self._absorption, self._absorption_bands = Spectrum.absorption(absorption)
         self._illustrative = False
 
     def amplitude(self): # amplitude reference dB at 10m
         return self._amplitude
 
+    def amplitude_bands(self): # per octave band; a single amplitude is spread evenly over the bands
+        return self._amplitude_bands
+
     def is_reflective(self):
         return self._reflective
 
-    def make_reflective(self, absorption): # 1 = total absorption
+    def make_reflective(self, absorption): # 1 = total absorption; a single value or per octave band
         self._source = False
-        self._amplitude = 0
+        self._amplitude, self._amplitude_bands = 0, Spectrum.bands(0)
         self._reflective = True
         self._refractive = False
-        self._absorption = absorption
+        self._absorption, self._absorption_bands = Spectrum.absorption(absorption)
         self._illustrative = False
 
     def is_refractive(self):
         return self._refractive
 
-    def make_refractive(self, absorption): # where absorption=(transmitted,refracted)
+    def make_refractive(self, absorption): # where absorption=(transmitted,refracted); each a single value or per octave band
+        a_t, a_r = absorption
+        a_t, b_t = Spectrum.absorption(a_t)
+        a_r, b_r = Spectrum.absorption(a_r)
         self._source = False
-        self._amplitude = 0
+        self._amplitude, self._amplitude_bands = 0, Spectrum.bands(0)
         self._reflective = False
         self._refractive = True
-        self._absorption = absorption
+        self._absorption, self._absorption_bands = (a_t, a_r), (b_t, b_r)
         self._illustrative = False
 
+    def state(self): # the material as plain values, e.g., to save as JSON; see from_state()
+        if self._refractive:
+            absorption = [float(a) for a in self._absorption]
+            absorption_bands = [b.tolist() for b in self._absorption_bands]
+        else:
+            absorption = float(self._absorption)
+            absorption_bands = self._absorption_bands.tolist()
+
+        if self._color is not None:
+            color = list(self._color)
+        else:
+            color = None
+
+        return { 'label': self._label, 'color': color,
+                 'source': self._source, 'reflective': self._reflective, 'refractive': self._refractive, 'illustrative': self._illustrative,
+                 'absorption': absorption, 'absorption_bands': absorption_bands,
+                 'amplitude': float(self._amplitude), 'amplitude_bands': self._amplitude_bands.tolist() }
+
+    @staticmethod
+    def from_state(state):
+        if state['color'] is not None:
+            material = Material(state['label'], tuple(state['color']))
+        else:
+            material = Material(state['label'])
+
+        material._source = state['source']
+        material._reflective = state['reflective']
+        material._refractive = state['refractive']
+        material._illustrative = state['illustrative']
+
+        if material._refractive:
+            material._absorption = tuple(state['absorption'])
+            material._absorption_bands = tuple(np.asarray(b, dtype='float64') for b in state['absorption_bands'])
+        else:
+            material._absorption = state['absorption']
+            material._absorption_bands = np.asarray(state['absorption_bands'], dtype='float64')
+
+        material._amplitude = state['amplitude']
+        material._amplitude_bands = np.asarray(state['amplitude_bands'], dtype='float64')
+
+        return material
+
     def is_illustrative(self):
         return self._illustrative
 
     def make_illustrative(self):
         self._source = False
-        self._amplitude = 0
+        self._amplitude, self._amplitude_bands = 0, Spectrum.bands(0)
         self._reflective = False
         self._refractive = False
-        self._absorption = 0
+        self._absorption, self._absorption_bands = 0, Spectrum.bands(0)
         self._illustrative = True
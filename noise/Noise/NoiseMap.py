@@ -0,0 +1,81 @@
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .Stats import Stats
+
+class NoiseMap(object):
+
+    # Grid of omnidirectional receivers at a fixed height over a space, for contour plots. Every receiver
+    # searches the same space, whose polygon table & BVH are built once, up front, and sent to each worker
+    # process once; the grid points are then shared out between the workers.
+    #
+    # Only the geometry is shared: each grid point still runs its own full search, since the beams (& so the
+    # sources found) depend on the receiver's origin; nothing about source visibility is reused between points.
+
+    _worker_space = None # each worker process's own copy of the space
+
+    def __init__(self, space, x, y, height, dimension=0.2, printing=False):
+        self.space = space
+        self.X, self.Y = np.meshgrid(np.asarray(x, dtype='float64'), np.asarray(y, dtype='float64'))
+        self.height = height
+        self.dimension = dimension # size of each receiver
+        self.printing = printing   # whether the searches print their progress & results (see Stats.log())
+
+        self.dB = None  # (len(y), len(x)) total levels [dB]; NaN where nothing is heard
+        self.dBA = None # as dB, but A-weighted [dB(A)] from the octave-band calculation
+
+    def points(self):
+        return np.stack((self.X.ravel(), self.Y.ravel(), np.full(self.X.size, self.height)), axis=1)
+
+    @staticmethod
+    def _init_worker(space):
+        NoiseMap._worker_space = space
+
+    @staticmethod
+    def _run_point(job):
+        origin, dimension, iterations, drop_if, printing = job
+
+        was_printing = Stats.printing()
+        Stats.set_printing(printing)
+
+        receiver = NoiseMap._worker_space.make_point_receiver(origin, dimension)
+        receiver.search(iterations, drop_if)
+
+        totals = receiver.calc()
+        bands, a_weighted = receiver.calc_bands()
+
+        Stats.set_printing(was_printing)
+
+        if 'total' in totals:
+            return totals['total'], a_weighted['total']
+        return np.nan, np.nan
+
+    def run(self, iterations, drop_if, workers=None):
+        # workers=None uses every core; workers=1 runs the grid here, in order
+        self.space.bvh() # build before sharing, so that the workers don't each build their own
+
+        jobs = []
+        for origin in self.points():
+            jobs.append((origin, self.dimension, iterations, drop_if, self.printing))
+
+        if workers == 1:
+            NoiseMap._init_worker(self.space)
+            try:
+                results = [NoiseMap._run_point(job) for job in jobs]
+            finally:
+                NoiseMap._worker_space = None
+        else:
+            if workers is None:
+                workers = os.cpu_count()
+            chunksize = max(1, len(jobs) // (4 * workers))
+            with ProcessPoolExecutor(workers, initializer=NoiseMap._init_worker, initargs=(self.space,)) as executor:
+                results = list(executor.map(NoiseMap._run_point, jobs, chunksize=chunksize))
+
+        results = np.asarray(results, dtype='float64').reshape((self.X.shape[0], self.X.shape[1], 2))
+        self.dB = results[:,:,0]
+        self.dBA = results[:,:,1]
+
+        return self.dB
@@ -4,9 +4,15 @@ from .Basis import Basis
 
 class Plane(object):
 
+    __slots__ = ('basis', '_normal', '_distance')
+
     def __init__(self, basis):
         self.basis = basis
 
+        # plane equation: normal . x = distance
+        self._normal = basis.e_k().copy()
+        self._distance = np.dot(self._normal, basis.origin)
+
     @staticmethod
     def from_points(P1, P2, P3): # where P1, P2, P3 are absolute coordinates; P1 & P2 determine e_i; P2 & P3 determine e_j; e_k is normal
         Bi = P2 - P1
@@ -20,25 +26,50 @@ class Plane(object):
 
     def jki(self, new_origin_abs): # new origin specified in absolute coordinates
         basis = self.basis.jki()
-        basis.origin = new_origin_abs
+        basis.origin = np.array(new_origin_abs, dtype='float64').reshape(3)
 
         return Plane(basis)
 
+    def intersections_3D(self, origin, v3D, count): # where the lines from origin to each of v3D cross the plane
+        i3D = np.copy(v3D)
+
+        xy_o, z_o = self.project(origin)
+
+        xy_i, z_i = self.project_many(v3D[0:count,:])
+        i3D[0:count,:] = origin - z_o * (v3D[0:count,:] - origin) / (z_i - z_o)[:,np.newaxis]
+
+        return i3D
+
     def coordinate(self, xy):
         x, y = xy # in-plane coordinates
         return self.basis.rel_to_abs([x, y, 0])
 
+    def coordinate_many(self, xy): # (N,2) in-plane to (N,3) absolute coordinates
+        xy = np.asarray(xy, dtype='float64')
+        xyz = np.zeros((xy.shape[0], 3))
+        xyz[:,0:2] = xy
+        return self.basis.rel_to_abs_many(xyz)
+
     def project(self, xyz):
         pos = self.basis.abs_to_rel(xyz)
         return (pos[0], pos[1]), Basis.zero_if_negligible(pos[2])
 
+    def project_many(self, xyz): # (N,3) absolute coordinates to (N,2) in-plane coordinates & (N,) heights
+        pos = self.basis.abs_to_rel_many(xyz)
+        z = pos[:,2]
+        z[(z > -Basis.resolution()) & (z < Basis.resolution())] = 0
+        return pos[:,0:2], z
+
     def reflect(self, xyz):
         pos = self.basis.abs_to_rel(xyz)
         pos[2] = -pos[2]
         return self.basis.rel_to_abs(pos)
 
     def normal(self):
-        return self.basis.e_k()
+        return self._normal
+
+    def distance(self): # signed distance of the plane from the absolute origin, along the normal
+        return self._distance
 
     def brightness(self, light_vector):
         return np.dot(self.normal(), light_vector)
@@ -1,10 +1,17 @@
 import numpy as np
 
 from .Basis import Basis
+from .Stats import Stats
 
 class Polygon(object):
 
+    __slots__ = ('plane', 'count', 'verts', 'props', 'absorption', 'absorption_bands', 'table', 'index', '__cache', '__cache_offset')
+
+    __stats = { 'hits': 0, 'misses': 0 } # use of the geometry caches, over all polygons in this process
+
     def __init__(self, plane, vertex_count, props=None):
+        Stats.created('Polygon')
+
         self.plane = plane
 
         if isinstance(vertex_count, tuple):
@@ -15,26 +22,45 @@ class Polygon(object):
             self.count = vertex_count
             self.verts = np.zeros((vertex_count, 2))
 
-        self.__v3D = np.zeros((self.count, 3))
+        self.__cache = { } # lazily computed geometry: 'v3D', 'center', 'area', 'aabb'; see __cached()
+        self.__cache_offset = None
+
+        self.absorption = 0         # per-beam state, for polygons used as view windows; 1 = total absorption
+        self.absorption_bands = None # per octave band, if known
+
+        self.table = None # PolygonTable holding this polygon, if any; self.verts is then a view onto it
+        self.index = None
 
         if props is None:
             self.props = { }
         else:
-            self.props = props.copy()
+            self.props = props # shared with the polygon copied from; see set_prop()
         # props:
         #   'material'  Material class instance [required]
         #   'offset'    3D vector offset for the polygon when displaying [optional]
+        #   'index'     index of the polygon in its Space, shared by its copies (e.g., view windows) [set by Space]
+
+    def set_prop(self, key, value): # copy-on-write, since props may be shared between polygons
+        props = self.props.copy()
+        props[key] = value
+        self.props = props
 
     def copy(self, vertex_count=None):
         if vertex_count is None:
             poly = Polygon(self.plane, self.count, self.props)
             poly.verts = self.verts.copy()
+            poly.__cache = self.__cache.copy() # same geometry; the cached arrays are read-only
+            poly.__cache_offset = self.__cache_offset
         else:
             poly = Polygon(self.plane, vertex_count, self.props)
+        poly.absorption = self.absorption
+        poly.absorption_bands = self.absorption_bands
         return poly
 
     def reverse(self, FlipY=True):
         poly = Polygon(self.plane.reverse(), self.count, self.props)
+        poly.absorption = self.absorption
+        poly.absorption_bands = self.absorption_bands
 
         # flip y-axis & reverse order of vertices
 
@@ -48,20 +74,75 @@ class Polygon(object):
 
         return poly
 
+    @staticmethod
+    def cache_stats(): # (hits, misses) of the geometry caches since the last reset
+        return Polygon.__stats['hits'], Polygon.__stats['misses']
+
+    @staticmethod
+    def reset_cache_stats():
+        Polygon.__stats['hits'] = 0
+        Polygon.__stats['misses'] = 0
+
+    def invalidate(self): # call after changing the vertices or plane directly
+        self.__cache = { }
+
+    def __cached(self, key):
+        # the cache for key, or None if it needs computing; the 'offset' prop may be set after creation
+        if 'offset' in self.props:
+            offset = self.props['offset']
+        else:
+            offset = None
+        if offset is not self.__cache_offset:
+            self.__cache = { }
+            self.__cache_offset = offset
+
+        if key in self.__cache:
+            Polygon.__stats['hits'] += 1
+            return self.__cache[key]
+        Polygon.__stats['misses'] += 1
+        return None
+
+    def __cache_value(self, key, value):
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+        self.__cache[key] = value
+        return value
+
     def vertices(self):
-        for v in range(0, self.count):
-            self.__v3D[v,:] = self.plane.coordinate((self.verts[v,0], self.verts[v,1]))
+        v3D = self.__cached('v3D')
+        if v3D is None:
+            v3D = self.plane.coordinate_many(self.verts[0:self.count,:])
 
             if 'offset' in self.props:
-                offset = self.props['offset']
-                self.__v3D[v,:] = self.__v3D[v,:] + offset
+                v3D = v3D + self.props['offset']
+
+            v3D = self.__cache_value('v3D', v3D)
 
-        return self.__v3D, self.count
+        return v3D, self.count
 
     def center(self):
-        return self.plane.coordinate(np.mean(self.verts, axis=0))
+        center = self.__cached('center')
+        if center is None:
+            center = self.__cache_value('center', self.plane.coordinate(np.mean(self.verts, axis=0)))
+        return center
+
+    def normal(self):
+        return self.plane.normal()
+
+    def aabb(self): # (lo, hi) corners of the axis-aligned bounding box of the 3D vertices
+        aabb = self.__cached('aabb')
+        if aabb is None:
+            v3D, count = self.vertices()
+            aabb = self.__cache_value('aabb', (np.min(v3D, axis=0), np.max(v3D, axis=0)))
+        return aabb
 
     def area(self):
+        area = self.__cached('area')
+        if area is None:
+            area = self.__cache_value('area', self.__area())
+        return area
+
+    def __area(self):
         area = 0
         xy_0 = np.mean(self.verts, axis=0)
         for i1 in range(0,self.count):
@@ -73,9 +154,20 @@ class Polygon(object):
             area += v1[0] * v2[1] - v1[1] * v2[0]
         return area / 2
 
+    def contains(self, xy): # whether in-plane point xy is inside the (anticlockwise) polygon, or on its edge
+        v1 = self.verts[0:self.count,:]
+        v2 = np.roll(v1, -1, axis=0)
+        edge = v2 - v1
+        rel = np.asarray(xy, dtype='float64') - v1
+        cross = edge[:,0] * rel[:,1] - edge[:,1] * rel[:,0]
+        return bool(np.all(cross > -Basis.resolution() * np.linalg.norm(edge, axis=1)))
+
     def set_vertex(self, index, xy):
         x, y = xy
         self.verts[index,:] = [x, y]
+        self.invalidate()
+        if self.table is not None:
+            self.table.update(self.index)
 
     def square(self, dimension):
         d = dimension / 2
@@ -83,6 +175,9 @@ class Polygon(object):
         self.verts[1,:] = [-d, d]
         self.verts[2,:] = [-d,-d]
         self.verts[3,:] = [ d,-d]
+        self.invalidate()
+        if self.table is not None:
+            self.table.update(self.index)
 
     def get_colors(self, light_vector, ambient): # vector points to light source
         brightness = self.plane.brightness(light_vector)
@@ -222,15 +317,7 @@ class Polygon(object):
         return poly
 
     def intersections_3D(self, origin, v3D, count):
-        i3D = np.copy(v3D)
-
-        xy_o, z_o = self.plane.project(origin)
-
-        for i in range(0, count):
-            xy_i, z_i = self.plane.project(v3D[i,:])
-            i3D[i,:] = origin - z_o * (v3D[i,:] - origin) / (z_i - z_o)
-
-        return i3D
+        return self.plane.intersections_3D(origin, v3D, count)
 
     @staticmethod
     def __crop_3D_poly(plane, polygon, discard_coplanar=True):
@@ -243,16 +330,18 @@ class Polygon(object):
 
         coplanar = True
 
-        xy_0, z_0 = plane.project(v3D[0,:])
+        xy, z = plane.project_many(v3D[0:count,:])
+
+        z_0 = z[0]
         if z_0:
             coplanar = False
-        xy_1, z_1 = xy_0, z_0
+        z_1 = z_0
         if z_1 >= 0:
             crop_verts[crop_count,:] = polygon.verts[0,:]
             crop_count += 1
         for i2 in range(1,count):
             i1 = i2 - 1
-            xy_2, z_2 = plane.project(v3D[i2,:])
+            z_2 = z[i2]
             if z_2:
                 coplanar = False
             if ((z_1 < 0) and (z_2 > 0)) or ((z_1 > 0) and (z_2 < 0)):
@@ -261,7 +350,7 @@ class Polygon(object):
             if z_2 >= 0:
                 crop_verts[crop_count,:] = polygon.verts[i2,:]
                 crop_count += 1
-            xy_1, z_1 = xy_2, z_2
+            z_1 = z_2
         if ((z_1 < 0) and (z_0 > 0)) or ((z_1 > 0) and (z_0 < 0)):
             i1 = count - 1
             i2 = 0
@@ -310,32 +399,27 @@ class Polygon(object):
 
         v3D, count = polygon.vertices()
 
-        proj_verts = np.zeros((count,2))
         proj_count = count
 
-        found_zero = False
-
         xy_o, z_o = self.plane.project(origin)
         if printing:
             print(xy_o, z_o)
-        for i1 in range(0, count):
-            xy_i, z_i = self.plane.project(v3D[i1,:])
-            if z_i - z_o == 0:
-                found_zero = True
-                break
-            if printing:
-                #print(xy_i, z_i, z_o/(z_i-z_o))
-                print(origin - z_o * (v3D[i1,:] - origin) / (z_i - z_o))
 
-            if reorientate:
-                i2 = count - 1 - i1
-            else:
-                i2 = i1
-            proj_verts[i2,:], z_i = self.plane.project(origin - z_o * (v3D[i1,:] - origin) / (z_i - z_o))
-        if found_zero:
+        xy_i, z_i = self.plane.project_many(v3D[0:count,:])
+        if np.any(z_i - z_o == 0):
             if printing:
                 print('Found zero')
             return None
+
+        i3D = origin - z_o * (v3D[0:count,:] - origin) / (z_i - z_o)[:,np.newaxis]
+        if printing:
+            print(i3D)
+
+        proj_verts, z_p = self.plane.project_many(i3D)
+        if reorientate:
+            proj_verts = proj_verts[::-1,:]
+        proj_verts = proj_verts.copy()
+
         if printing:
             print(origin)
             print(self.plane.basis.origin)
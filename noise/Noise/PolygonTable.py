@@ -0,0 +1,575 @@
+import numpy as np
+
+from .Basis import Basis
+
+class PolygonTable(object):
+
+    # Structure-of-arrays store for the polygons of a space: padded in-plane vertices, absolute vertices,
+    # plane bases & material ids, packed into contiguous arrays so that a view can clip & project all
+    # candidate polygons in one call. Each stored Polygon keeps a view onto its row of self.verts.
+
+    # row status while clipping in batches
+    __ok       = 0
+    __dropped  = 1 # cropped away, or lost amidst the tolerances
+    __fallback = 2 # needs the per-polygon tidy-up; hand over to Polygon.project_and_crop()
+
+    def __init__(self, capacity=64, max_count=4):
+        self.size = 0
+        self.polygons = []
+        self.materials = []
+        self.__material_ids = { }
+
+        self.__allocate(capacity, max_count)
+
+    def __allocate(self, capacity, max_count):
+        verts    = np.zeros((capacity, max_count, 2))
+        v3D      = np.zeros((capacity, max_count, 3))
+        counts   = np.zeros(capacity, dtype=int)
+        origins  = np.zeros((capacity, 3))
+        matrices = np.zeros((capacity, 3, 3))
+        offsets  = np.zeros((capacity, 3))
+        material = np.zeros(capacity, dtype=int)
+        ill_only = np.zeros(capacity, dtype=bool)
+        reflect  = np.zeros(capacity, dtype=bool)
+        refract  = np.zeros(capacity, dtype=bool)
+
+        if self.size > 0:
+            n = self.size
+            k = self.verts.shape[1]
+            verts[0:n,0:k,:] = self.verts[0:n,:,:]
+            v3D[0:n,0:k,:]   = self.v3D[0:n,:,:]
+            counts[0:n]      = self.counts[0:n]
+            origins[0:n,:]   = self.origins[0:n,:]
+            matrices[0:n,:,:] = self.matrices[0:n,:,:]
+            offsets[0:n,:]   = self.offsets[0:n,:]
+            material[0:n]    = self.material[0:n]
+            ill_only[0:n]    = self.ill_only[0:n]
+            reflect[0:n]     = self.reflective[0:n]
+            refract[0:n]     = self.refractive[0:n]
+
+        self.verts      = verts    # (N,K,2) in-plane vertices, zero-padded beyond counts
+        self.v3D        = v3D      # (N,K,3) absolute vertices, including any display offset
+        self.counts     = counts   # (N,) vertex counts
+        self.origins    = origins  # (N,3) plane origins
+        self.matrices   = matrices # (N,3,3) plane axes (rows e_i, e_j, e_k)
+        self.offsets    = offsets  # (N,3) display offsets
+        self.material   = material # (N,) indices into self.materials
+        self.ill_only   = ill_only
+        self.reflective = reflect
+        self.refractive = refract
+
+        # the stored polygons are views onto the (new) vertex array
+        for p in self.polygons:
+            p.verts = self.verts[p.index,0:p.count,:]
+
+    def add(self, polygon):
+        if polygon.table is not None:
+            return polygon.index
+
+        capacity, max_count = self.verts.shape[0:2]
+        if self.size == capacity or polygon.count > max_count:
+            if self.size == capacity:
+                capacity *= 2
+            self.__allocate(capacity, max(max_count, polygon.count))
+
+        index = self.size
+        self.size += 1
+
+        self.verts[index,0:polygon.count,:] = polygon.verts
+        polygon.verts = self.verts[index,0:polygon.count,:]
+        polygon.table = self
+        polygon.index = index
+        self.polygons.append(polygon)
+
+        material = polygon.props['material']
+        if id(material) not in self.__material_ids:
+            self.__material_ids[id(material)] = len(self.materials)
+            self.materials.append(material)
+        self.material[index] = self.__material_ids[id(material)]
+        self.reflective[index] = material.is_reflective()
+        self.refractive[index] = material.is_refractive()
+
+        self.update(index)
+
+        return index
+
+    def add_many(self, polygons, verts, origins, matrices):
+        # add() for each of polygons (none yet in a table) in one go, given their vertices (N,K,2), padded as here,
+        # & their planes' origins (N,3) & axes (N,3,3)
+        n = len(polygons)
+        if n == 0:
+            return
+
+        capacity, max_count = self.verts.shape[0:2]
+        width = verts.shape[1]
+        if self.size + n > capacity or width > max_count:
+            while capacity < self.size + n:
+                capacity *= 2
+            self.__allocate(capacity, max(max_count, width))
+
+        rows = slice(self.size, self.size + n)
+        self.verts[rows,0:width,:] = verts
+        self.verts[rows,width:,:] = 0
+        self.origins[rows,:] = origins
+        self.matrices[rows,:,:] = matrices
+        self.offsets[rows,:] = 0
+
+        for index, polygon in enumerate(polygons, self.size):
+            polygon.verts = self.verts[index,0:polygon.count,:]
+            polygon.table = self
+            polygon.index = index
+            self.polygons.append(polygon)
+
+            self.counts[index] = polygon.count
+            if 'offset' in polygon.props:
+                self.offsets[index,:] = polygon.props['offset']
+            self.ill_only[index] = 'ill_only' in polygon.props
+
+            material = polygon.props['material']
+            if id(material) not in self.__material_ids:
+                self.__material_ids[id(material)] = len(self.materials)
+                self.materials.append(material)
+            self.material[index] = self.__material_ids[id(material)]
+
+        self.size += n
+
+        reflective = np.asarray([m.is_reflective() for m in self.materials], dtype=bool)
+        refractive = np.asarray([m.is_refractive() for m in self.materials], dtype=bool)
+        self.reflective[rows] = reflective[self.material[rows]]
+        self.refractive[rows] = refractive[self.material[rows]]
+
+        valid = PolygonTable.__valid(self.counts[rows], self.verts.shape[1])
+        v3D = PolygonTable.coordinate(self.verts[rows], self.origins[rows], self.matrices[rows], self.offsets[rows])
+        v3D[~valid] = 0
+        self.v3D[rows] = v3D
+
+    @staticmethod
+    def wrap(polygons, verts, origins, matrices, offsets, v3D=None):
+        # a table of polygons (none yet in a table) that uses the given arrays - e.g., memory-mapped (copy-on-write)
+        # by Archive.load() - as its own, rather than copying them in: vertices (N,K,2), padded as here, planes'
+        # origins (N,3) & axes (N,3,3), display offsets (N,3) &, if known, absolute vertices (N,K,3); the polygons
+        # become views onto the table, which copies everything only if it grows
+        n = len(polygons)
+        if n == 0:
+            return PolygonTable()
+        table = PolygonTable(0, verts.shape[1])
+
+        table.verts = verts
+        table.origins = origins
+        table.matrices = matrices
+        table.offsets = offsets
+        table.counts = np.asarray([p.count for p in polygons], dtype=int)
+        table.material = np.zeros(n, dtype=int)
+        table.ill_only = np.asarray(['ill_only' in p.props for p in polygons], dtype=bool).reshape(n)
+
+        for index, polygon in enumerate(polygons):
+            polygon.verts = verts[index,0:polygon.count,:]
+            polygon.table = table
+            polygon.index = index
+            table.polygons.append(polygon)
+
+            material = polygon.props['material']
+            if id(material) not in table.__material_ids:
+                table.__material_ids[id(material)] = len(table.materials)
+                table.materials.append(material)
+            table.material[index] = table.__material_ids[id(material)]
+
+        table.size = n
+
+        reflective = np.asarray([m.is_reflective() for m in table.materials], dtype=bool)
+        refractive = np.asarray([m.is_refractive() for m in table.materials], dtype=bool)
+        table.reflective = reflective[table.material]
+        table.refractive = refractive[table.material]
+
+        if v3D is None:
+            valid = PolygonTable.__valid(table.counts, verts.shape[1])
+            v3D = PolygonTable.coordinate(verts, origins, matrices, offsets)
+            v3D[~valid] = 0
+        table.v3D = v3D
+
+        return table
+
+    def update(self, index): # refresh derived data after the polygon's vertices or props have changed
+        polygon = self.polygons[index]
+
+        self.counts[index] = polygon.count
+        self.origins[index,:] = np.asarray(polygon.plane.basis.origin).reshape(3)
+        self.matrices[index,:,:] = np.asarray(polygon.plane.basis.matrix)
+        if 'offset' in polygon.props:
+            self.offsets[index,:] = polygon.props['offset']
+        else:
+            self.offsets[index,:] = 0
+        self.ill_only[index] = 'ill_only' in polygon.props
+
+        v3D, count = polygon.vertices()
+        self.v3D[index,0:count,:] = v3D[0:count,:]
+        self.v3D[index,count:,:] = 0
+
+    @staticmethod
+    def shared_by(polygons): # the table holding all of polygons, or None
+        if len(polygons) == 0:
+            return None
+        table = polygons[0].table
+        if table is None:
+            return None
+        for p in polygons:
+            if p.table is not table:
+                return None
+        return table
+
+    # Batched kernels; each works on padded vertex arrays (M,K,2) with vertex counts (M,)
+
+    @staticmethod
+    def __next(counts, width):
+        k = np.arange(width)[np.newaxis,:]
+        return np.where(k + 1 < counts[:,np.newaxis], k + 1, 0)
+
+    @staticmethod
+    def __valid(counts, width):
+        return np.arange(width)[np.newaxis,:] < counts[:,np.newaxis]
+
+    @staticmethod
+    def __gather(values, indices): # values[m,indices[m,k]] for each row m; values (M,K) or (M,K,2/3)
+        return values[np.arange(indices.shape[0])[:,np.newaxis], indices]
+
+    @staticmethod
+    def clip(verts, counts, dist):
+        # Sutherland-Hodgman clip of each polygon to the region dist >= 0, where dist (M,K) is the signed
+        # distance of each vertex from the clipping line/plane; vertex order matches Polygon's own croppers
+
+        width = verts.shape[1]
+        valid = PolygonTable.__valid(counts, width)
+        n = PolygonTable.__next(counts, width)
+
+        d1 = dist
+        d2 = PolygonTable.__gather(dist, n)
+        v1 = verts
+        v2 = PolygonTable.__gather(verts, n)
+
+        keep  = valid & (d1 >= 0)
+        cross = valid & (((d1 < 0) & (d2 > 0)) | ((d1 > 0) & (d2 < 0)))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inter = v1 - d1[:,:,np.newaxis] * (v2 - v1) / (d2 - d1)[:,:,np.newaxis]
+
+        M = verts.shape[0]
+        candidates = np.stack((v1, inter), axis=2).reshape((M, 2 * width, 2))
+        emitted = np.stack((keep, cross), axis=2).reshape((M, 2 * width))
+
+        return PolygonTable.__pack(candidates, emitted)
+
+    @staticmethod
+    def __pack(candidates, emitted): # the emitted (M,L) of candidates (M,L,2), packed to the front of each row, in order
+        M = candidates.shape[0]
+        counts = np.sum(emitted, axis=1)
+        width = max(int(np.max(counts, initial=0)), 1)
+        rows, cols = np.nonzero(emitted)
+        position = np.cumsum(emitted, axis=1) - 1
+        verts = np.zeros((M, width, 2))
+        verts[rows, position[rows, cols]] = candidates[rows, cols]
+
+        return verts, counts
+
+    @staticmethod
+    def __norm(values): # as np.linalg.norm(values, axis=-1)
+        return np.sqrt(np.add.reduce(values * values, axis=-1))
+
+    @staticmethod
+    def merge(verts, counts):
+        # Polygon's tidy-up, first part: vertices too close to the next are removed, one after the other, unless
+        # that would leave fewer than 3, in which case the polygon is dropped (count 0). Since the vertices after
+        # the one being checked are as yet untouched, each vertex but the last goes if it is too close to the next;
+        # the last then goes if it is too close to the first that remains
+        close = 2 * Basis.resolution()
+        M, width = verts.shape[0:2]
+        m = np.arange(M)
+        k = np.arange(width)[np.newaxis,:]
+
+        remove = np.zeros((M, width), dtype=bool)
+        remove[:,0:width-1] = PolygonTable.__norm(verts[:,1:,:] - verts[:,0:width-1,:]) < close
+        remove &= k < counts[:,np.newaxis] - 1
+        removed = np.sum(remove, axis=1)
+        dropped = (removed > counts - 3) | (counts < 3)
+
+        keep = PolygonTable.__valid(counts, width) & ~remove
+        first = np.argmax(keep, axis=1)
+        last = np.maximum(counts - 1, 0)
+        last_close = PolygonTable.__norm(verts[m,last,:] - verts[m,first,:]) < close
+        dropped |= last_close & (counts - removed < 4)
+        if not np.any(remove) and not np.any(last_close) and not np.any(dropped):
+            return verts, counts # nothing to merge
+
+        keep[m,last] &= ~last_close
+        keep[dropped] = False
+
+        return PolygonTable.__pack(verts, keep)
+
+    @staticmethod
+    def __convex_status(verts, counts):
+        # Polygon's tidy-up, second part: vertices are removed, one after the other, until the polygon is strictly
+        # convex; since each removal changes the next check, polygons that would lose any are flagged for the
+        # per-polygon treatment
+        res = Basis.resolution()
+        width = verts.shape[1]
+        valid = PolygonTable.__valid(counts, width)
+        n = PolygonTable.__next(counts, width)
+        k = np.arange(width)[np.newaxis,:]
+        p = np.where(k == 0, counts[:,np.newaxis] - 1, k - 1)
+        p = np.maximum(p, 0)
+
+        v1 = PolygonTable.__gather(verts, p)
+        v3 = PolygonTable.__gather(verts, n)
+
+        Bi = v3 - v1
+        Bj = np.stack((-Bi[:,:,1], Bi[:,:,0]), axis=2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            Bj = Bj / PolygonTable.__norm(Bj)[:,:,np.newaxis]
+            concave = np.sum((verts - v1) * Bj, axis=2) > -res
+
+        status = np.where(np.any(valid & concave, axis=1), PolygonTable.__fallback, PolygonTable.__ok)
+        status[counts < 3] = PolygonTable.__dropped
+
+        return status
+
+    @staticmethod
+    def tidy(verts, counts):
+        # batched equivalent of Polygon's tidy-up: returns the tidied verts & counts, & the status of each row -
+        # dropped, or flagged for the per-polygon treatment if the result here may not be the same
+        verts, counts = PolygonTable.merge(verts, counts)
+        return verts, counts, PolygonTable.__convex_status(verts, counts)
+
+    @staticmethod
+    def tidy_status(verts, counts):
+        # whether Polygon's tidy-up leaves each polygon unaffected, i.e., already strictly convex, with distinct
+        # vertices; anything else is either dropped (too few vertices) or flagged for the per-polygon treatment
+        merged, merged_counts = PolygonTable.merge(verts, counts)
+
+        status = PolygonTable.__convex_status(verts, counts)
+        status[(merged_counts != counts) & (status == PolygonTable.__ok)] = PolygonTable.__fallback
+        status[counts < 3] = PolygonTable.__dropped
+
+        return status
+
+    @staticmethod
+    def half_plane(verts, v1, v2):
+        # signed distances (M,K) of the vertices (M,K,2) from the line through v1 & v2, scaled by its length;
+        # -ve for exterior points, if v1 & v2 are consecutive vertices of an anticlockwise polygon
+        Bi = v2 - v1
+        Bj = np.asarray([-Bi[1],Bi[0]])
+        return np.matmul((verts - v1)[:,:,np.newaxis,:], Bj[:,np.newaxis])[:,:,0,0]
+
+    @staticmethod
+    def crop_convex(verts, counts, c_verts, c_count, status=None):
+        # clip each polygon to the interior of the anticlockwise convex polygon (c_verts, c_count), edge by edge,
+        # as Polygon.crop_2D_poly() does; returns the verts, counts & status (see tidy()) of the results
+        if status is None:
+            status = np.zeros(len(counts), dtype=int)
+
+        for s1 in range(0, c_count):
+            s2 = s1 + 1
+            if s2 == c_count:
+                s2 = 0
+
+            d = PolygonTable.half_plane(verts, c_verts[s1,:], c_verts[s2,:])
+            verts, counts = PolygonTable.clip(verts, counts, d)
+            verts, counts, tidied = PolygonTable.tidy(verts, counts)
+            status = np.maximum(status, tidied)
+
+        return verts, counts, status
+
+    @staticmethod
+    def __mark(status, rows, value): # a row's status only ever escalates
+        status[rows] = np.maximum(status[rows], value)
+
+    @staticmethod
+    def __zero_negligible(values):
+        res = Basis.resolution()
+        values = values.copy()
+        values[(values > -res) & (values < res)] = 0
+        return values
+
+    @staticmethod
+    def __reorder(verts, counts, reverse):
+        # reverse the order of vertices in rows where reverse is True
+        width = verts.shape[1]
+        k = np.arange(width)[np.newaxis,:]
+        r = np.maximum(counts[:,np.newaxis] - 1 - k, 0)
+        return PolygonTable.__gather(verts, np.where(reverse[:,np.newaxis], r, k))
+
+    # Note: the plane transforms below are evaluated as stacks of single-point matrix products, which
+    # round exactly as Basis does point by point; a search then takes the same path whichever is used
+
+    @staticmethod
+    def coordinate(verts, origins, matrices, offsets):
+        # in-plane (M,K,2) to absolute (M,K,3) coordinates; origins etc. are (M,3) or (3,)
+        xyz = np.zeros(verts.shape[0:2] + (1, 3))
+        xyz[:,:,0,0:2] = verts
+        if origins.ndim == 1:
+            v3D = origins + np.matmul(xyz, matrices)[:,:,0,:]
+            return v3D + offsets
+        v3D = origins[:,np.newaxis,:] + np.matmul(xyz, matrices[:,np.newaxis,:,:])[:,:,0,:]
+        return v3D + offsets[:,np.newaxis,:]
+
+    @staticmethod
+    def project(v3D, origins, matrices):
+        # absolute (M,K,3) to in-plane coordinates (M,K,3), including the height above the plane
+        with np.errstate(invalid='ignore'): # rows already dropped may hold nan
+            if origins.ndim == 1:
+                return np.matmul((v3D - origins)[:,:,np.newaxis,:], matrices.T)[:,:,0,:]
+            rel = (v3D - origins[:,np.newaxis,:])[:,:,np.newaxis,:]
+            return np.matmul(rel, np.transpose(matrices, (0,2,1))[:,np.newaxis,:,:])[:,:,0,:]
+
+    def project_and_crop(self, window, origin, indices):
+        # batched equivalent of [window.project_and_crop(origin, p) for p in polygons[indices]], skipping
+        # polygons that are illustrative, that the origin lies in the plane of, or that face away (if
+        # reflective); returns the (poly, proj) pairs that remain, in order
+
+        rows = np.asarray(indices, dtype=int)
+        rows = rows[~self.ill_only[rows]]
+
+        origin = np.asarray(origin, dtype='float64').reshape(3)
+
+        o_p = self.origins[rows,:]
+        M_p = self.matrices[rows,:,:]
+
+        # where are we relative to each polygon?
+        o3D = np.broadcast_to(origin, (len(rows), 1, 3))
+        local_z = PolygonTable.__zero_negligible(PolygonTable.project(o3D, o_p, M_p)[:,0,2])
+        keep = (local_z != 0) & ~((local_z < 0) & self.reflective[rows])
+
+        rows    = rows[keep]
+        local_z = local_z[keep]
+        o_p     = o_p[keep]
+        M_p     = M_p[keep]
+        offsets = self.offsets[rows,:]
+
+        # rows leave the batch once dropped, or flagged for the per-polygon treatment; pos is each row's place
+        # in the order of the results
+        candidates = rows
+        pos = np.arange(len(rows))
+        handover = []
+
+        M = len(rows)
+        status = np.zeros(M, dtype=int)
+
+        counts = self.counts[rows].copy()
+        verts  = self.verts[rows,:,:].copy()
+        v3D    = self.v3D[rows,:,:].copy()
+
+        # crop refractive planes according to incidence
+        refract = self.refractive[rows]
+        if np.any(refract):
+            r = np.nonzero(refract)[0]
+            M_jki = M_p[r][:,[1,2,0],:] # plane through the origin, normal to e_i
+            o_jki = np.broadcast_to(origin, (len(r), 3))
+            d = PolygonTable.__zero_negligible(PolygonTable.project(v3D[r], o_jki, M_jki)[:,:,2])
+            r_verts, r_counts = PolygonTable.clip(verts[r], counts[r], d)
+            r_verts, r_counts, status[r] = PolygonTable.tidy(r_verts, r_counts)
+
+            width = max(verts.shape[1], r_verts.shape[1])
+            verts = PolygonTable.__widen(verts, width)
+            v3D = PolygonTable.__widen(v3D, width)
+            verts[r] = PolygonTable.__widen(r_verts, width)
+            counts[r] = r_counts
+            v3D[r] = PolygonTable.coordinate(verts[r], o_p[r], M_p[r], offsets[r])
+
+            alive = PolygonTable.__retire(status, pos, handover)
+            pos, rows, local_z, o_p, M_p, offsets, counts, verts, v3D = \
+                [a[alive] for a in (pos, rows, local_z, o_p, M_p, offsets, counts, verts, v3D)]
+            status = status[alive]
+
+        # crop polygons above the window plane, discarding any in the plane
+        w_plane = window.plane
+        o_w = np.asarray(w_plane.basis.origin, dtype='float64').reshape(3)
+        M_w = np.asarray(w_plane.basis.matrix, dtype='float64')
+        if 'offset' in window.props:
+            w_offset = np.asarray(window.props['offset'], dtype='float64')
+        else:
+            w_offset = np.zeros(3)
+
+        valid = PolygonTable.__valid(counts, verts.shape[1])
+        z = PolygonTable.__zero_negligible(PolygonTable.project(v3D, o_w, M_w)[:,:,2])
+        PolygonTable.__mark(status, np.all((z == 0) | ~valid, axis=1), PolygonTable.__dropped)
+
+        verts, counts = PolygonTable.clip(verts, counts, z)
+        verts, counts, tidied = PolygonTable.tidy(verts, counts)
+        status = np.maximum(status, tidied)
+
+        alive = PolygonTable.__retire(status, pos, handover)
+        pos, rows, local_z, o_p, M_p, offsets, counts, verts = \
+            [a[alive] for a in (pos, rows, local_z, o_p, M_p, offsets, counts, verts)]
+        status = status[alive]
+        v3D = PolygonTable.coordinate(verts, o_p, M_p, offsets)
+
+        # project polygons onto the window plane
+        xy_o, z_o = w_plane.project(origin)
+        if z_o == 0:
+            status[:] = PolygonTable.__dropped
+
+        z = PolygonTable.__zero_negligible(PolygonTable.project(v3D, o_w, M_w)[:,:,2])
+        valid = PolygonTable.__valid(counts, verts.shape[1])
+        PolygonTable.__mark(status, np.any(valid & (z - z_o == 0), axis=1), PolygonTable.__dropped)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            P = origin - z_o * (v3D - origin) / (z - z_o)[:,:,np.newaxis]
+        verts = PolygonTable.project(P, o_w, M_w)[:,:,0:2]
+        verts = PolygonTable.__reorder(verts, counts, z_o * local_z < 0)
+        verts[~valid] = 0
+        verts, counts, tidied = PolygonTable.tidy(verts, counts)
+        status = np.maximum(status, tidied)
+
+        alive = PolygonTable.__retire(status, pos, handover)
+        pos, rows, local_z, o_p, M_p, counts, verts = [a[alive] for a in (pos, rows, local_z, o_p, M_p, counts, verts)]
+        status = status[alive]
+
+        # crop to the window, edge by edge
+        verts, counts, status = PolygonTable.crop_convex(verts, counts, window.verts, window.count, status)
+
+        # project back onto the polygons' own planes
+        w3D = PolygonTable.coordinate(verts, o_w, M_w, w_offset)
+        valid = PolygonTable.__valid(counts, verts.shape[1])
+
+        z = PolygonTable.__zero_negligible(PolygonTable.project(w3D, o_p, M_p)[:,:,2])
+        back = (status == PolygonTable.__ok)
+        status[back & np.any(valid & (z - local_z[:,np.newaxis] == 0), axis=1)] = PolygonTable.__fallback
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            P = origin - local_z[:,np.newaxis,np.newaxis] * (w3D - origin) / (z - local_z[:,np.newaxis])[:,:,np.newaxis]
+        t_verts = PolygonTable.project(P, o_p, M_p)[:,:,0:2]
+        t_verts = PolygonTable.__reorder(t_verts, counts, z_o * local_z < 0)
+        t_verts[~valid] = 0
+
+        back = (status == PolygonTable.__ok)
+        t_status = PolygonTable.tidy_status(t_verts, counts)
+        status[back & (t_status != PolygonTable.__ok)] = PolygonTable.__fallback # the per-polygon version reports these
+
+        PolygonTable.__retire(status, pos, handover)
+
+        found = { }
+        for m in np.nonzero(status == PolygonTable.__ok)[0]:
+            count = counts[m]
+            poly = window.copy((count, verts[m,0:count,:]))
+            proj = self.polygons[rows[m]].copy((count, t_verts[m,0:count,:]))
+            found[pos[m]] = (poly, proj)
+
+        for h in handover:
+            pp = window.project_and_crop(origin, self.polygons[candidates[h]])
+            if pp is not None:
+                found[h] = pp
+
+        return [found[h] for h in sorted(found)]
+
+    @staticmethod
+    def __retire(status, pos, handover): # adds the pos of flagged rows to handover; returns which rows stay
+        handover.extend(pos[status == PolygonTable.__fallback])
+        return status == PolygonTable.__ok
+
+    @staticmethod
+    def __widen(values, width):
+        if values.shape[1] >= width:
+            return values
+        shape = list(values.shape)
+        shape[1] = width
+        wide = np.zeros(shape)
+        wide[:,0:values.shape[1]] = values
+        return wide
@@ -1,11 +1,22 @@
+import heapq
+
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 
 from .Material import Material
+from .Archive import Archive
+from .BeamTree import BeamTree
+from .ImageSource import ImageSource
+from .Spectrum import Spectrum
+from .Stats import Stats
 from .View import View
 
 class Receiver(object):
 
-    def __init__(self, space, origin, poly, material=None):
+    _worker_space = None # each worker process's own copy of the space, for parallel searches
+
+    def __init__(self, space, origin, poly, material=None): # poly is the window, or a list of windows
         self.space = space
         self.sources = None
 
@@ -14,82 +25,580 @@ class Receiver(object):
         else:
             self.material = Material.darkzone()
 
-        poly.props['absorption'] = 0
+        if isinstance(poly, list):
+            windows = poly
+        else:
+            windows = [poly]
+
+        self.tree = BeamTree() # the paths of every view found from here
+
+        self._steps = None # every view searched by the last search(), if kept for research()
+        self._last = None  # (iterations, drop_if, margin) of the last search()
+        self._bounds = None # (lo, hi) of the dynamic polygons' boxes, as last searched
+
+        self._views = []   # views not yet searched; of the same level, if stream() stopped part way through one
+        self._onward = []  # views a level further on, found before stream() stopped part way through a level
+        self._pending = [] # sources found before stream() stopped, not yet yielded
+        self._level = 0    # levels (iterations) searched from the windows, so far
+        for window in windows:
+            window.absorption = 0
+            window.absorption_bands = Spectrum.bands(0)
+            self._views.append(self.__view(origin, window))
+
+        self._start = [(v.region.origin, v.region.window) for v in self._views] # for search_images()
+
+    def __view(self, origin, window):
+        view = View(origin, window)
+        view.tree = self.tree
+        return view
+
+    @staticmethod
+    def _init_worker(space):
+        Receiver._worker_space = space
+
+    @staticmethod
+    def _search_view(view):
+        space = Receiver._worker_space
+        return view.search(space.frustum_polygons(view.region.origin, view.region.window))
+
+    def __search_views(self, views, executor, workers):
+        # v.search() for each of views, in order; yields the list of views found by each, as each is searched
+        if executor is None:
+            for v in views:
+                polygons = self.space.frustum_polygons(v.region.origin, v.region.window)
+                yield v.search(polygons) # , self.space) # for adding polygons if necessary
+            return
+
+        # views are independent; send them without the beam tree, which stays here - a search only
+        # subdivides a view, so the views found keep their node in it
+        for v in views:
+            v.tree = None
+
+        chunksize = max(1, len(views) // (4 * workers))
+        for found in executor.map(Receiver._search_view, views, chunksize=chunksize): # in order, as for a serial search
+            for v in found:
+                v.tree = self.tree
+            yield found
+
+    @staticmethod
+    def __step(view):
+        # a view to search; once searched, 'found' lists (key, sources, onward steps, number dropped) for each view
+        # found by the search, in order, where key (if kept for research()) identifies the view found
+        return { 'view': view, 'found': None }
+
+    def __frontier(self): # the views not yet searched, of any level, as steps; discards any sources pending
+        steps = [Receiver.__step(v) for v in self._views + self._onward]
+        self._views = []
+        self._onward = []
+        self._pending = []
+        self._level = 0
+        return steps
 
-        self._views = [View(origin, poly)]
+    @staticmethod
+    def __key(v): # everything about a view found by a search that __follow() depends on
+        window = v.region.window
+        target = v.region.target
 
-    def search(self, iterations, drop_if, show_projections=False):
+        if window.absorption_bands is not None:
+            bands = window.absorption_bands.tobytes()
+        else:
+            bands = None
+
+        return (np.asarray(v.region.origin).tobytes(), v.node,
+                window.verts[0:window.count,:].tobytes(), window.plane.basis.origin.tobytes(), window.plane.basis.matrix.tobytes(),
+                window.absorption, bands,
+                target.verts[0:target.count,:].tobytes(), target.plane.basis.origin.tobytes(), target.plane.basis.matrix.tobytes(),
+                id(target.props['material']))
+
+    def search(self, iterations, drop_if, show_projections=False, workers=1, margin=None):
+        # workers > 1 searches each iteration's views in parallel, on a pool of processes; if the space has
+        # dynamic polygons, every view searched is kept, as it was, for research(); returns the number of views searched
+        #
+        # if margin [dB] is set, views are also culled before each iteration if the most they could add (see
+        # View.dB_bound_many(), for the loudest source in the space) is more than margin below the total so far
         self.sources = []
 
-        for it in range(0, iterations):
-            resolved = []
+        steps = self.__frontier()
 
-            while len(self._views) > 0:
-                v = self._views.pop(0)
-                resolved += v.search(self.space.polygons) # , self.space) # for adding polygons if necessary
+        if self.space.has_dynamic():
+            self._steps = steps
+            self._last = (iterations, drop_if, margin)
+            self._bounds = self.space.dynamic_bounds()
+        else:
+            self._steps = None
 
-            dropped = 0
+        return self.__complete(self.__walk(steps, iterations, drop_if, margin, show_projections, workers, None, { }))
 
-            while len(resolved) > 0:
-                v = resolved.pop(0)
+    def research(self, show_projections=False, workers=1):
+        # repeat the last search(), after moving the dynamic polygons (see Space.set_dynamic()): only the views that
+        # could see where a dynamic polygon was, or now is, are searched again; the rest keep what they found last
+        # time, as do any views they find again, exactly as before - so the sources are those a new search() would
+        # find; returns the number of views searched
+        if self._steps is None:
+            print('You need to search() a space with dynamic polygons before you can research()')
+            return 0
 
-                material = v.region.target.props['material']
+        iterations, drop_if, margin = self._last
 
-                if material.is_source():
-                    if show_projections:
-                        v.show_history(self.space)
-                    self.sources.append(v.copy())
+        bounds = self.space.dynamic_bounds()
+        lo = np.concatenate((self._bounds[0], bounds[0]))
+        hi = np.concatenate((self._bounds[1], bounds[1]))
+        self._bounds = bounds
 
-                if material.is_refractive():
-                    tv, rv = v.refract_view()
-                    #self.space.cube(rv.region.origin, 0.1, self.material, True)
-                    if tv.region.window.props['absorption'] > drop_if:
-                        dropped += 1
-                    else:
-                        self._views.append(tv) # through-view
-                    if rv.region.window.props['absorption'] > drop_if:
-                        dropped += 1
-                    else:
-                        self._views.append(rv) # refracted view
-                elif material.is_reflective():
-                    if v.region.window.props['absorption'] > drop_if:
+        self.sources = []
+        self._level = 0
+
+        return self.__complete(self.__walk(self._steps, iterations, drop_if, margin, show_projections, workers, (lo, hi), { }))
+
+    def stream(self, iterations, drop_if, show_projections=False, workers=1, margin=None, keep=True, resume=False, progress=None):
+        # generator alternative to search(): yields (source, totals) for each source found, once the view finding it
+        # has been searched, & in the same order as search(); totals are the running totals [dB], per material label
+        # & 'total', as calc() returns; sources are also added to self.sources, unless not keep - in which case the
+        # beam tree only keeps what the views still to search need, & each source yielded has a copy of its own path
+        #
+        # leaving the loop early, or progress(iteration, searched, views) - called after each view is searched -
+        # returning False, stops the search: the views not yet searched are kept, & the sources found by the view
+        # last searched that were not yet yielded, so that stream(..., resume=True) yields those first & continues
+        # from the views, with the sources kept so far (so running totals start again, if not keep), as does a receiver saved & loaded again (see save()); as
+        # iterations counts the levels searched before stopping too, stream(n, ...) & then stream(n, ..., resume=True)
+        # find what search(n, ...) would; research() is not available after stream()
+        if not resume or self.sources is None:
+            self.sources = []
+            steps = self.__frontier()
+            onward = []
+        else:
+            steps = [Receiver.__step(v) for v in self._views]
+            onward = [Receiver.__step(v) for v in self._onward]
+            self._views = []
+            self._onward = []
+        self._steps = None
+
+        power = { } # summed power of the sources found, per material label
+        for source in self.sources:
+            Receiver.__add_power(power, source)
+
+        for source in self.__walk(steps, iterations - self._level, drop_if, margin, show_projections, workers, None, power, keep, progress, onward):
+            if keep:
+                self.sources.append(source)
+            yield source, Receiver.__totals(power)
+
+    def __complete(self, walk): # run walk (see __walk()) to the end, keeping the sources found; returns its result
+        while True:
+            try:
+                self.sources.append(next(walk))
+            except StopIteration as stop:
+                return stop.value
+
+    def __walk(self, steps, iterations, drop_if, margin, show_projections, workers, moved, power, keep=True, progress=None, onward=None):
+        # the search behind search(), research() & stream(): yields the sources in self._pending, then searches
+        # iterations levels of steps, starting from steps (with onward, the steps already found from the first level),
+        # & yields each source found, in order, having added it to power (summed per material label); if moved is
+        # (lo, hi) of the boxes that dynamic polygons have moved from & to, only steps not yet searched, or that see
+        # into the boxes, are searched; when done, or stopped (by closing the generator, or progress() returning
+        # False), the views not yet searched are left in self._views & self._onward, & the sources not yet yielded
+        # in self._pending, with self._level counting the levels done; returns the number of views searched
+        if margin is not None:
+            amplitude = self.space.loudest()
+        if workers > 1:
+            executor = ProcessPoolExecutor(workers, initializer=Receiver._init_worker, initargs=(self.space,))
+        else:
+            executor = None
+
+        count = len(self.sources) # sources found, in all
+        searched = 0
+        done = 0    # of steps, this iteration
+        if onward is None:
+            onward = [] # the steps found by them
+        waiting = self._pending # sources found by the steps done, not yet yielded
+        self._pending = []
+
+        try:
+            while len(waiting) > 0:
+                source = waiting.pop(0)
+                Receiver.__add_power(power, source)
+                if not keep:
+                    self.tree.detach(source)
+                count += 1
+                yield source
+
+            for it in range(0, iterations):
+                if margin is not None and len(power) > 0:
+                    steps = [steps[i] for i in self.__cull([step['view'] for step in steps], sum(power.values()), amplitude, margin)]
+
+                if moved is None:
+                    dirty = steps
+                else:
+                    dirty = [step for step in steps if step['found'] is None or step['view'].sees(moved)]
+                is_dirty = set([id(step) for step in dirty])
+
+                started = Stats.iteration()
+                searching = self.__search_steps(dirty, executor, workers, drop_if, show_projections)
+                dropped = 0
+
+                for step in steps:
+                    if id(step) in is_dirty:
+                        next(searching)
+                        searched += 1
+
+                    for key, step_sources, step_onward, step_dropped in step['found']:
+                        onward += step_onward
+                        dropped += step_dropped
+                        waiting += step_sources
+                    done += 1 # before yielding its sources, so that stopping part way through them keeps the rest
+
+                    while len(waiting) > 0:
+                        source = waiting.pop(0)
+                        Receiver.__add_power(power, source)
+                        if not keep:
+                            self.tree.detach(source)
+                        count += 1
+                        yield source
+
+                    if progress is not None and progress(it, done, len(steps)) is False:
+                        return searched
+
+                Stats.iteration_end(started)
+                Stats.log("Sources (total): " + str(count) + '; views dropped (this iteration): ' + str(dropped))
+
+                steps = onward
+                onward = []
+                done = 0
+                self._level += 1
+
+                if not keep:
+                    self.tree.compact([step['view'] for step in steps])
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+            if done > 0 and done == len(steps): # stopped after the last step of a level
+                steps = onward
+                onward = []
+                done = 0
+                self._level += 1
+            views = [step['view'] for step in steps[done:]]
+            ahead = [step['view'] for step in onward]
+            for v in views + ahead:
+                v.tree = self.tree # if sent to a worker
+            if self._steps is not None:
+                views = [v.copy() for v in views]
+                ahead = [v.copy() for v in ahead]
+            self._views = views
+            self._onward = ahead
+            self._pending = waiting
+
+        return searched
+
+    def __cull(self, views, power, amplitude, margin):
+        # the indices of the views that could add within margin [dB] of the total so far, where power is the summed
+        # power of the sources found
+        total = 10 * np.log10(power)
+
+        bound = View.dB_bound_many(views, amplitude)
+        kept = [i for i in range(0, len(views)) if bound[i] >= total - margin]
+
+        Stats.beams('culled', len(views) - len(kept))
+        if len(kept) < len(views):
+            Stats.log('Views culled (more than ' + str(margin) + ' dB below ' + str(total) + ' dB): ' + str(len(views) - len(kept)) + ' of ' + str(len(views)))
+
+        return kept
+
+    def __follow(self, v, sources, show_projections):
+        # add v to sources if it has found a source; returns the views onward from its target
+        started = Stats.start('follow')
+
+        material = v.region.target.props['material']
+
+        if material.is_source():
+            if show_projections:
+                v.show_history(self.space)
+            sources.append(v.copy())
+
+        if material.is_refractive():
+            tv, rv = v.refract_view()
+            #self.space.cube(rv.region.origin, 0.1, self.material, True)
+            onward = [tv, rv] # through-view & refracted view
+        elif material.is_reflective():
+            onward = [v.reflect_view()]
+        else:
+            onward = []
+
+        Stats.beams('created', len(onward))
+        Stats.stop(started)
+
+        return onward
+
+    def __search_steps(self, dirty, executor, workers, drop_if, show_projections):
+        # search the views of the dirty steps & follow what they find; yields each step, in order, once its 'found'
+        # is set, so the views it found are ready to search in turn
+        views = []
+        for step in dirty:
+            if self._steps is not None: # keep the view as it was, for research()
+                views.append(step['view'].copy())
+            else:
+                views.append(step['view'])
+
+        for step, resolved in zip(dirty, self.__search_views(views, executor, workers)):
+            before = { } # what the step found last time, if searched before, by key
+            if step['found'] is not None:
+                for found in step['found']:
+                    if found[0] not in before:
+                        before[found[0]] = []
+                    before[found[0]].append(found)
+
+            step['found'] = []
+
+            Stats.beams('resolved', len(resolved))
+
+            for v in resolved:
+                key = None
+                if self._steps is not None:
+                    key = Receiver.__key(v)
+                    if key in before and len(before[key]) > 0: # found again; so leads to the same as before
+                        step['found'].append(before[key].pop(0))
+                        continue
+
+                sources = []
+                onward = []
+                dropped = 0
+
+                for view in self.__follow(v, sources, show_projections):
+                    if view.region.window.absorption > drop_if:
+                        Stats.beams('dropped')
                         dropped += 1
                     else:
-                        self._views.append(v.reflect_view())
+                        onward.append(Receiver.__step(view))
 
-            print("Sources (total): " + str(len(self.sources)) + '; views dropped (this iteration): ' + str(dropped))
+                step['found'].append((key, sources, onward, dropped))
 
-    def calc(self):
+            yield step
+
+    @staticmethod
+    def __add_power(power, source):
+        label = source.region.target.props['material'].label()
+        power[label] = power.get(label, 0) + np.power(10, source.dB_calc() / 10)
+
+    @staticmethod
+    def __totals(power): # as calc(), from the power summed per material label
         totals = { }
-        total = 0
 
+        total = sum(power.values())
+        if total > 0:
+            for label in power:
+                totals[label] = max(10 * np.log10(power[label]), 0)
+            totals['total'] = 10 * np.log10(total)
+
+        return totals
+
+    @staticmethod
+    def __energy(view):
+        # fraction of the sound energy still carried through the view's window: the share of the sphere that the
+        # window covers, from the view's origin, less what has been absorbed; so the views split from a window share
+        # its energy, rather than each carrying all of it
+        return (1 - view.region.window.absorption) * view.solid_angle() / (4 * np.pi)
+
+    def search_budget(self, tolerance, max_views=5000, show_projections=False):
+        # convergence-driven alternative to search(): views are searched loudest first (by remaining energy),
+        # until the unexplored views can no longer change the total by more than tolerance [dB], or until
+        # max_views views have been searched (None for no limit); returns the number of views searched
+        #
+        # the bound is an estimate: unexplored energy is valued at the loudest source power per unit energy
+        # found so far, since the distance & area terms of dB_calc() are not known until a source is found
+        self.sources = []
+        self._steps = None
+        started = Stats.iteration() # one, for the whole search
+
+        heap = []     # (-energy, sequence, view); the sequence keeps ties in the order found
+        sequence = 0
+        remaining = 0 # summed energy of the views in the heap
+
+        for step in self.__frontier():
+            energy = Receiver.__energy(step['view'])
+            heapq.heappush(heap, (-energy, sequence, step['view']))
+            sequence += 1
+            remaining += energy
+
+        total = 0    # summed power of the sources found
+        loudest = 0  # maximum source power per unit energy
+        searched = 0
+
+        while len(heap) > 0:
+            if total > 0 and 10 * np.log10(1 + remaining * loudest / total) < tolerance:
+                break
+            if max_views is not None and searched == max_views:
+                break
+
+            neg_energy, s, v = heapq.heappop(heap)
+            remaining -= -neg_energy
+
+            polygons = self.space.frustum_polygons(v.region.origin, v.region.window)
+            searched += 1
+
+            resolved = v.search(polygons)
+            Stats.beams('resolved', len(resolved))
+
+            for r in resolved:
+                found = len(self.sources)
+
+                for onward in self.__follow(r, self.sources, show_projections):
+                    energy = Receiver.__energy(onward)
+                    if energy > 0:
+                        heapq.heappush(heap, (-energy, sequence, onward))
+                        sequence += 1
+                        remaining += energy
+
+                if len(self.sources) > found:
+                    source = self.sources[-1]
+                    power = np.power(10, source.dB_calc() / 10)
+                    total += power
+                    energy = Receiver.__energy(source)
+                    if energy > 0:
+                        loudest = max(loudest, power / energy)
+
+        self._views = [entry[2] for entry in sorted(heap)] # unexplored, loudest first
+
+        Stats.iteration_end(started)
+
+        Stats.log('Sources (total): ' + str(len(self.sources)) + '; views searched: ' + str(searched) + '; views unexplored: ' + str(len(self._views)))
+
+        return searched
+
+    def search_images(self, order=2, drop_if=0.999):
+        # image-source alternative to search(), for specular paths of up to order reflections (see ImageSource);
+        # quicker for low orders, but without diffraction, & with a partly blocked source counted by the share of a
+        # few paths from it that are in the clear; replaces any sources found, but leaves the beam search's
+        # unexplored views alone; returns the number of sources found
+        engine = ImageSource(self.space, order, drop_if)
+
+        started = Stats.start('images')
+        for origin, window in self._start:
+            engine.search(self.__view(origin, window))
+        Stats.stop(started)
+
+        self.sources = engine.sources
+        self._steps = None
+
+        Stats.log('Sources (total): ' + str(len(self.sources)) + '; images searched: ' + str(engine.images) + '; paths rejected: ' + str(engine.rejected))
+
+        return len(self.sources)
+
+    def save(self, path):
+        # save the receiver, the sources found by the last search & the views not yet searched to the directory path
+        # (see Archive); e.g., to resume a stream() later
         if self.sources is None:
-            print('You need to search() before you can calc()')
-            return totals
+            print('You need to search() before you can save()')
+            return
+
+        materials = [self.material]
+
+        arrays = Archive.pack([window for origin, window in self._start], materials, 'windows_')
+        arrays['origin'] = self._start[0][0]
+
+        arrays.update(Receiver.__pack_views(self.sources, materials, 'source_', 'source_windows_', 'targets_'))
+        arrays.update(Receiver.__pack_views(self._pending, materials, 'pending_', 'pending_windows_', 'pending_targets_'))
+        arrays.update(Receiver.__pack_views(self._views, materials, 'view_', 'views_'))
+        arrays.update(Receiver.__pack_views(self._onward, materials, 'onward_', 'onward_windows_'))
+        arrays['level'] = np.asarray(self._level)
+
+        tree = self.tree.arrays()
+        for name in tree:
+            arrays['tree_' + name] = tree[name]
+
+        Archive.save(path, arrays, materials)
+
+    @staticmethod
+    def load(space, path):
+        # a receiver in space, with the sources & views saved by save(), ready for calc() or stream(..., resume=True);
+        # materials also in space are shared
+        arrays, materials = Archive.load(path, space.table.materials)
+
+        receiver = Receiver(space, np.array(arrays['origin']), Archive.unpack(arrays, materials, 'windows_'), materials[0])
 
+        tree = { }
+        for name in ['origins', 'w_origins', 'w_matrices', 'absorption', 'parents']:
+            tree[name] = arrays['tree_' + name]
+        receiver.tree = BeamTree.from_arrays(tree)
+        for v in receiver._views:
+            v.tree = receiver.tree
+
+        receiver.sources = receiver.__unpack_views(arrays, materials, 'source_', 'source_windows_', 'targets_')
+        if 'view_origins' in arrays: # not in archives saved before these were
+            receiver._views = receiver.__unpack_views(arrays, materials, 'view_', 'views_')
+        if 'onward_origins' in arrays:
+            receiver._onward = receiver.__unpack_views(arrays, materials, 'onward_', 'onward_windows_')
+            receiver._pending = receiver.__unpack_views(arrays, materials, 'pending_', 'pending_windows_', 'pending_targets_')
+            receiver._level = int(arrays['level'])
+
+        return receiver
+
+    @staticmethod
+    def __pack_views(views, materials, prefix, windows, targets=None):
+        # arrays for views: their origins & beam tree nodes (named from prefix), their windows &, if targets is
+        # set (e.g., for sources), their targets (packed with Archive.pack(), with windows & targets as prefixes)
+        arrays = Archive.pack([v.region.window for v in views], materials, windows)
+        if targets is not None:
+            arrays.update(Archive.pack([v.region.target for v in views], materials, targets))
+        arrays[prefix + 'origins'] = np.zeros((len(views), 3))
+        arrays[prefix + 'nodes'] = np.zeros(len(views), dtype=int)
+        for i in range(0, len(views)):
+            arrays[prefix + 'origins'][i,:] = views[i].region.origin
+            arrays[prefix + 'nodes'][i] = views[i].node
+        return arrays
+
+    def __unpack_views(self, arrays, materials, prefix, windows, targets=None): # as packed by __pack_views(), in this receiver's beam tree
+        windows = Archive.unpack(arrays, materials, windows)
+        if targets is not None:
+            found = Archive.unpack(arrays, materials, targets)
+        origins = arrays[prefix + 'origins']
+        nodes = arrays[prefix + 'nodes']
+
+        views = []
+        for i in range(0, len(windows)):
+            v = View(origins[i,:], windows[i])
+            if targets is not None:
+                v.region.target = found[i]
+            v.tree = self.tree
+            v.node = int(nodes[i])
+            views.append(v)
+        return views
+
+    def __labels(self):
+        # material labels of the sources, in order of first appearance, & the index into these of each source
+        index = { }
+        labels = []
+        labels_of = []
         for s in self.sources:
             label = s.region.target.props['material'].label()
+            if label not in index:
+                index[label] = len(labels)
+                labels.append(label)
+            labels_of.append(index[label])
+        return labels, np.asarray(labels_of, dtype=int)
 
-            if label in totals:
-                l_tot = totals[label]
-            else:
-                l_tot = 0
+    def calc(self):
+        totals = { }
+
+        if self.sources is None:
+            print('You need to search() before you can calc()')
+            return totals
+
+        # power summed per material label
+        labels, labels_of = self.__labels()
 
-            dB = s.dB_calc()
-            dB_pow = np.power(10, dB / 10)
-            # print('  dB: ' + str(dB))
-            total += dB_pow
-            l_tot += dB_pow
+        dB_pow = np.power(10, View.dB_calc_many(self.sources) / 10)
+        l_tots = np.bincount(labels_of, weights=dB_pow, minlength=len(labels))
 
-            totals[label] = l_tot
+        total = np.sum(dB_pow)
+        for i in range(0, len(labels)):
+            totals[labels[i]] = l_tots[i]
 
         if total > 0:
             total = 10 * np.log10(total)
-            print('Total: '+str(total)+' dB')
+            Stats.log('Total: '+str(total)+' dB')
 
             for t in totals:
                 subtotal = 10 * np.log10(totals[t])
-                print(' - '+t+': '+str(subtotal)+' dB')
+                Stats.log(' - '+t+': '+str(subtotal)+' dB')
                 if subtotal < 0:
                     print('* * * Error: Negative Sound Level * * *')
                     subtotal = 0
@@ -98,3 +607,36 @@ class Receiver(object):
             totals['total'] = total
 
         return totals
+
+    def calc_bands(self):
+        # levels per octave band (see Spectrum) & A-weighted, from the same search as calc();
+        # returns two dictionaries, keyed by material label & 'total': band levels [dB], & overall [dB(A)]
+        bands = { }
+        a_weighted = { }
+
+        if self.sources is None:
+            print('You need to search() before you can calc_bands()')
+            return bands, a_weighted
+
+        if len(self.sources) == 0:
+            return bands, a_weighted
+
+        labels, labels_of = self.__labels()
+
+        dB_pow = np.power(10, View.dB_bands_many(self.sources) / 10)
+        l_tots = np.zeros((len(labels), Spectrum.count()))
+        np.add.at(l_tots, labels_of, dB_pow)
+
+        with np.errstate(divide='ignore'):
+            for i in range(0, len(labels)):
+                bands[labels[i]] = 10 * np.log10(l_tots[i,:])
+            bands['total'] = 10 * np.log10(np.sum(l_tots, axis=0))
+
+        for label in bands:
+            a_weighted[label] = Spectrum.a_weighted(bands[label])
+
+        Stats.log('Total: '+str(a_weighted['total'])+' dB(A)')
+        for label in labels:
+            Stats.log(' - '+label+': '+str(a_weighted[label])+' dB(A)')
+
+        return bands, a_weighted
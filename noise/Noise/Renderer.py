@@ -0,0 +1,97 @@
+import numpy as np
+
+from .PolygonTable import PolygonTable
+
+class Renderer(object):
+
+    # Batched display of polygons with VisPy: rather than a Mesh per polygon (& another per outline), every polygon is
+    # fan-triangulated into one shared vertex, face & color buffer per category - 'solid' (real polygons with a face
+    # color), 'illustrative' (e.g., the projections added by View.show_history()) & 'edges' (the outlines of polygons
+    # without a face color, as Polygon.get_colors()) - so that a scene of any size is drawn with at most three visuals.
+    # Only draw() needs VisPy.
+
+    __categories = ('solid', 'illustrative', 'edges')
+
+    def __init__(self, light_vector, ambient=0.7): # as Polygon.get_colors()
+        self.light_vector = np.asarray(light_vector, dtype='float64')
+        self.ambient = ambient
+
+    def buffers(self, polygons):
+        # { category: (vertices (V,3), indices, colors) } for each category with any polygons, where indices are
+        # triangles (F,3) with colors (F,4) for 'solid' & 'illustrative', & line segments (E,2) with per-vertex
+        # colors (V,4) for 'edges' - every edge of each outline, where a Mesh(mode='lines') per polygon, as before,
+        # joined only vertices 0 & 1, 2 & 3, ...
+        v3D, counts, normals = Renderer.__geometry(polygons)
+        brightness = np.matmul(normals, self.light_vector)
+
+        category = np.zeros(len(polygons), dtype=int)
+        colors = np.zeros((len(polygons), 4))
+        for i in range(0, len(polygons)):
+            color = polygons[i].props['material'].color(self.ambient, brightness[i])
+            if color is None:
+                category[i] = 2
+                colors[i,:] = (0,0,0,1)
+            else:
+                if 'ill_only' in polygons[i].props:
+                    category[i] = 1
+                colors[i,:] = color
+
+        buffers = { }
+        for c in range(0, len(Renderer.__categories)):
+            rows = np.nonzero((category == c) & (counts >= 2))[0]
+            if len(rows) == 0:
+                continue
+            buffers[Renderer.__categories[c]] = Renderer.__pack(v3D[rows], counts[rows], colors[rows], c == 2)
+
+        return buffers
+
+    @staticmethod
+    def __geometry(polygons): # absolute vertices (N,K,3), counts (N,) & normals (N,3) of polygons
+        table = PolygonTable.shared_by(polygons)
+        if table is not None:
+            rows = np.asarray([p.index for p in polygons], dtype=int)
+            return table.v3D[rows], table.counts[rows], table.matrices[rows,2,:]
+
+        width = max([p.count for p in polygons] + [1])
+        v3D = np.zeros((len(polygons), width, 3))
+        counts = np.zeros(len(polygons), dtype=int)
+        normals = np.zeros((len(polygons), 3))
+        for i in range(0, len(polygons)):
+            vertices, count = polygons[i].vertices()
+            v3D[i,0:count,:] = vertices[0:count,:]
+            counts[i] = count
+            normals[i,:] = polygons[i].plane.normal()
+        return v3D, counts, normals
+
+    @staticmethod
+    def __pack(v3D, counts, colors, outlines):
+        # the vertices of each polygon, one after the other, with the triangles of a fan from its first vertex (or, if
+        # outlines, its edges) & their colors
+        width = v3D.shape[1]
+        valid = np.arange(width)[np.newaxis,:] < counts[:,np.newaxis]
+        vertices = v3D[valid]
+        first = np.cumsum(counts) - counts # index in vertices of each polygon's first vertex
+
+        if outlines:
+            polygon = np.repeat(np.arange(len(counts)), counts)
+            k = np.arange(len(vertices)) - first[polygon]
+            segments = np.stack((first[polygon] + k, first[polygon] + (k + 1) % counts[polygon]), axis=1)
+            return vertices, segments, colors[polygon]
+
+        fans = np.maximum(counts - 2, 0)
+        polygon = np.repeat(np.arange(len(counts)), fans)
+        k = np.arange(len(polygon)) - (np.cumsum(fans) - fans)[polygon] + 1
+        triangles = np.stack((first[polygon], first[polygon] + k, first[polygon] + k + 1), axis=1)
+        return vertices, triangles, colors[polygon]
+
+    def draw(self, polygons, parent):
+        # add the polygons to the VisPy scene node parent (e.g., view.scene) as at most three visuals; returns them
+        from vispy import scene
+
+        visuals = []
+        for category, (vertices, indices, colors) in self.buffers(polygons).items():
+            if category == 'edges':
+                visuals.append(scene.visuals.Line(pos=vertices, connect=indices, color=colors, parent=parent))
+            else:
+                visuals.append(scene.visuals.Mesh(vertices=vertices, faces=indices, face_colors=colors, parent=parent))
+        return visuals
@@ -0,0 +1,202 @@
+import numpy as np
+
+from .Material import Material
+
+class Scenes(object):
+
+    # The scenes of scene.py, barrier.py & train.py, for those scripts & for benchmark.py to share: each builds its
+    # polygons in a space S; the cases of scene.py also add & return its receiver (the ears). Nothing here needs
+    # VisPy or xlwings. The builders are static methods, so Batch can send them to its worker processes.
+
+    @staticmethod
+    def vehicle_materials(): # the source-materials of barrier.py & train.py: (engine, hvac, wheel, rail)
+        engine = Material('Engine', (1,0,0,1))
+        engine.make_source(0,80)
+
+        hvac = Material('HVAC', (0,0,1,1))
+        hvac.make_source(0,30)
+
+        wheel = Material('Wheel', (0.75,0.75,0.75,1))
+        wheel.make_source(0,50)
+
+        rail = Material('Rail', (0.25,0.25,0.25,1))
+        rail.make_source(0,50)
+
+        # Note: Rolling Noise: Lp = Lp0 + 30 log10 (V / V0), where Lp0 is the noise level at the speed V0
+        #       [https://www.southampton.ac.uk/engineering/research/groups/dynamics/rail/rolling_railway_noise.page]
+
+        return engine, hvac, wheel, rail
+
+    @staticmethod
+    def case_1_materials(): # the source-materials of case 1 of scene.py, which has no engine: (None, hvac, wheel, rail)
+        hvac = Material('HVAC', (0,0,1,1))
+        hvac.make_source(0,60)
+
+        wheel = Material('Wheel', (0.75,0.75,0.75,1))
+        wheel.make_source(0,60)
+
+        rail = Material('Rail', (0.25,0.25,0.25,1))
+        rail.make_source(0,60)
+
+        return None, hvac, wheel, rail
+
+    @staticmethod
+    def add_vehicle(S, basis, materials, zoned=False): # materials as vehicle_materials(); no engine if it is None
+        engine, hvac, wheel, rail = materials
+
+        if zoned:
+            S.add_box(basis.offset([ 0,   0,    1    ]), (20,   3   ), 3,    Material.glass(), (Material.diffzone(), [0,0,0.25,0.25]))
+        else:
+            S.add_box(basis.offset([ 0,   0,    1    ]), (20,   3   ), 3,    Material.glass())
+        S.add_box(basis.offset([ 0,   0,    4    ]), ( 2,   2   ), 0.25, hvac)
+        if engine is not None:
+            S.add_box(basis.offset([ 0,   0,    0.5  ]), ( 2,   2   ), 0.5,  engine)
+        S.add_box(basis.offset([-8,  -0.75, 0    ]), ( 8,   0.25), 0.25, rail)
+        S.add_box(basis.offset([-8,   0.75, 0    ]), ( 8,   0.25), 0.25, rail)
+        S.add_box(basis.offset([ 8,  -0.75, 0    ]), ( 8,   0.25), 0.25, rail)
+        S.add_box(basis.offset([ 8,   0.75, 0    ]), ( 8,   0.25), 0.25, rail)
+        S.add_box(basis.offset([-9.5,-0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
+        S.add_box(basis.offset([-6.5,-0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
+        S.add_box(basis.offset([-9.5, 0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
+        S.add_box(basis.offset([-6.5, 0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
+        S.add_box(basis.offset([ 9.5,-0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
+        S.add_box(basis.offset([ 6.5,-0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
+        S.add_box(basis.offset([ 9.5, 0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
+        S.add_box(basis.offset([ 6.5, 0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
+
+    @staticmethod
+    def window(S): # basis of the receiver at the window of the tower block of case 1, barrier.py & train.py
+        B = S.offset([0,-30,0])
+        return B.rotate_k(-30,[0,0,1]).rotate_k(90,[0,10.5,30])
+
+    @staticmethod
+    def ground(S): # basis of the receiver on the ground, for barrier.py & train.py
+        B = S.offset([0,-30,0])
+        return B.rotate_k(90, [-20,30,2])
+
+    @staticmethod
+    def __surroundings(S, B): # the ground around the tower block, & the block itself, at B
+        S.add_box(B.offset([  0,  0,0]), (40,40), 1, Material.concrete())
+
+        S.add_box(B.offset([ 19, 30,0]), (62,20), 1, Material.grass())
+        S.add_box(B.offset([-35, 14,0]), (30,52), 1, Material.grass())
+        S.add_box(B.offset([-19,-35,0]), (62,30), 1, Material.grass())
+        S.add_box(B.offset([ 35,-19,0]), (30,62), 1, Material.grass())
+
+        S.add_box(B.offset([ 16,-35,0]), (8,30), 1, Material.concrete())
+        S.add_box(B.offset([-35,-16,0]), (30,8), 1, Material.concrete())
+        S.add_box(B.offset([ 35, 16,0]), (30,8), 1, Material.concrete())
+        S.add_box(B.offset([-16, 30,0]), (8,20), 1, Material.concrete())
+
+        S.add_box(B.rotate_k(-30,[0,0,1]), (20,20), 40, Material.brick(), (Material.diffzone(), [1,1,0,1]))
+
+    @staticmethod
+    def case_1_static(S): # the buildings, barrier & ground of case 1, & of train.py
+        B = S.offset([0,-30,0])
+
+        S.add_box(B.offset([ 0,44.5,-1]), (100,9), 1, Material.concrete())
+        S.add_box(B.offset([20,40.5, 0]), ( 60,1), 4, Material.barrier(), (Material.diffzone(), [0,0,0,1]))
+
+        Scenes.__surroundings(S, B)
+
+    @staticmethod
+    def case_1_vehicle(S, x, materials): # the vehicle of case 1, at position x along the track
+        B = S.offset([0,-30,0])
+        Scenes.add_vehicle(S, B.offset([x,46,0]), materials)
+
+    @staticmethod
+    def case_1(S):
+        Scenes.case_1_static(S)
+        Scenes.case_1_vehicle(S, 30, Scenes.case_1_materials())
+
+        return S.make_receiver(Scenes.window(S), 2)
+
+    @staticmethod
+    def case_2(S):
+        S.add_box(S.offset([0,0,-1]), (100,100), 1, Material.concrete())
+
+        S.add_box(S.rotate_k(45, [0,45,1]), (10,10), 10, Material.source())
+
+        S.add_box(S.rotate_k(30), (20,20), 40, Material.brick(), (Material.diffzone(), [5,5,5,5]))
+
+        S.add_tree(S.offset([20,20,0]), 2, 5, 3)
+        S.add_tree(S.offset([30,15,0]), 2, 5, 2)
+
+        return S.make_receiver(S.rotate_k(90, [30,-15,20]), 2)
+
+    @staticmethod
+    def __ring_pair(S, r, angles, inner_zoned): # one arc of the case 3 ring barriers: a tall (zoned) & a low wall
+        if inner_zoned:
+            S.add_box(S.offset([0,5,0]), ((r-6,angles),4), 7.5, Material.concrete(), (Material.diffzone(), [1,1,0,1]))
+            S.add_box(S.offset([0,5,0]), ((r-2,angles),4), 5, Material.concrete())
+        else:
+            S.add_box(S.offset([0,5,0]), ((r-6,angles),4), 5, Material.concrete())
+            S.add_box(S.offset([0,5,0]), ((r-2,angles),4), 7.5, Material.concrete(), (Material.diffzone(), [1,1,0,1]))
+
+    @staticmethod
+    def case_3(S):
+        S.add_box(S.offset([0,0,-1]), (1000,1000), 1, Material.grass())
+
+        S.add_box(S.rotate_k(-27, [190,163,1]), (500,3), 3, Material.source())
+
+        for ring, r in enumerate([45, 85, 120, 160, 190, 230]):
+            theta_45 = 45 - (6 / (r - 8) * 180 / np.pi) / 2
+            d_theta = 7.5 / r * 180 / np.pi
+            count = int(theta_45 / d_theta)
+            inner_zoned = (ring % 2 == 0)
+
+            if ring < 3:
+                Scenes.__ring_pair(S, r, theta_45 + d_theta * np.asarray(range(-count,1)), inner_zoned)
+                Scenes.__ring_pair(S, r, 90 + d_theta * np.asarray(range(-count,count+1)), inner_zoned)
+            elif ring == 3:
+                Scenes.__ring_pair(S, r, 90 + d_theta * np.asarray(range(0,count+1)), inner_zoned)
+            else:
+                c_65 = int(count*20/45)
+                theta_65 = 115 - (6 / (r - 8) * 180 / np.pi) / 2
+                Scenes.__ring_pair(S, r, theta_65 + d_theta * np.asarray(range(0,c_65+1)), inner_zoned)
+            Scenes.__ring_pair(S, r, 180 - theta_45 + d_theta * np.asarray(range(0,count+1)), inner_zoned)
+
+        return S.make_receiver(S.rotate_k(90, [0,0,2]), 2)
+
+    @staticmethod
+    def case_4(S):
+        basis = S.offset([-5,5,0])
+        S.add_box(basis, (10,4), 6, Material.brick(), (Material.diffzone(), [1,1,1,1]))
+
+        basis = S.offset([5,5,0])
+        S.add_box(basis, (6,8), (5,2), Material.concrete(), (Material.diffzone(), [1,1,0,1]))
+
+        S.add_box(S, ((20, [0,10,30,60,100]),8), (7,1), Material.glass(), (Material.diffzone(), [1,1,0,1]))
+
+        S.add_box(S, ((20, [270,315]),8), (7,1), Material.barrier(), (Material.diffzone(), [1,1,1,1]))
+
+        S.add_tree(S.offset([-15,5,0]), 2, 5, 3)
+        S.add_tree(S.offset([-15,15,0]), 2, 5, 2)
+
+        basis = S.offset([-5,10,0])
+        S.add_box(basis, (2,2), 2, Material.source())
+
+        return S.make_receiver(S.rotate_k(90, [0,-5,2]), 2)
+
+    @staticmethod
+    def case(S, number): # case number (1-4) of scene.py; returns the ears
+        return [Scenes.case_1, Scenes.case_2, Scenes.case_3, Scenes.case_4][number - 1](S)
+
+    @staticmethod
+    def barrier(S, h): # barrier.py: barriers of height h either side of the track, & a (zoned) vehicle between them
+        B = S.offset([0,-30,0])
+
+        S.add_box(B.offset([ 0,52,  -1]), (100, 24), 1, Material.concrete())
+        S.add_box(B.offset([ 0,40.5, 0]), (100,  1), h, Material.barrier(), (Material.diffzone(), [0,0,0,0.5]))
+        S.add_box(B.offset([ 0,53.5, 0]), (100,  1), h, Material.barrier(), (Material.diffzone(), [0,0,0,0.5]))
+
+        Scenes.__surroundings(S, B)
+
+        Scenes.add_vehicle(S, B.offset([-19,49,0]), Scenes.vehicle_materials(), True)
+
+    @staticmethod
+    def train(S, x): # train.py: the scene of case 1, with the vehicle at position x along the track
+        Scenes.case_1_static(S)
+
+        B = S.offset([0,-30,0])
+        Scenes.add_vehicle(S, B.offset([x,46,0]), Scenes.vehicle_materials())
@@ -2,36 +2,437 @@ from operator import itemgetter
 
 import numpy as np
 
+from .Archive import Archive
 from .Material import Material
 from .Basis import Basis
 from .Plane import Plane
 from .Polygon import Polygon
 from .Receiver import Receiver
+from .BVH import BVH
+from .PolygonTable import PolygonTable
+from .Stats import Stats
 
 class Space(Basis):
 
-    def __init__(self):
+    def __init__(self, use_bvh=True, use_pvs=False):
         self.polygons = []
+        self.table = PolygonTable() # packed copy of the polygons, for batched cropping
+        self.use_bvh = use_bvh # cull polygons outside each view's frustum before cropping
+        self._bvh = None
+        self.use_pvs = use_pvs # with the BVH, search from windows in polygons of the space using their potentially visible sets
+        self._pvs = None # the polygons potentially visible from the front & back of each polygon searched from; see pvs()
+        self._dynamic = False # whether polygons are being added as dynamic (moving); see set_dynamic()
         Basis.__init__(self)
 
     def add_poly(self, polygon, material=None):
         if material is not None:
-            polygon.props['material'] = material
+            polygon.set_prop('material', material)
         else:
             material = polygon.props['material']
         if material.is_illustrative():
-            polygon.props['ill_only'] = True
+            polygon.set_prop('ill_only', True)
+        if self._dynamic:
+            polygon.set_prop('dynamic', True)
+        polygon.set_prop('index', len(self.polygons))
         self.polygons.append(polygon)
-
-    def __make_poly(self, v3D, indices, material, crop_planes=None):
+        self.table.add(polygon)
+        if 'ill_only' not in polygon.props:
+            self._bvh = None # scene geometry has changed; rebuild the hierarchy & the visible sets when next needed
+            self._pvs = None
+
+    def save(self, path): # save the polygons & their materials to the directory path (see Archive)
+        materials = []
+        arrays = Archive.pack(self.polygons, materials)
+        if self.table.size == len(self.polygons): # the table's rows are the polygons; keep their absolute vertices too
+            arrays['v3D'] = self.table.v3D[0:len(self.polygons),0:arrays['verts'].shape[1],:]
+        arrays['use_bvh'] = np.asarray(self.use_bvh)
+        arrays['use_pvs'] = np.asarray(self.use_pvs)
+        Archive.save(path, arrays, materials)
+
+    @staticmethod
+    def load(path):
+        # a space saved by save(); its polygon table uses the arrays as memory-mapped (copy-on-write), & its polygons
+        # are views onto them, so only what is used is read
+        arrays, materials = Archive.load(path, mode='c')
+
+        space = Space(bool(arrays['use_bvh']), bool(arrays['use_pvs']) if 'use_pvs' in arrays else False)
+        space.polygons = Archive.unpack(arrays, materials, copy=False)
+        for i in range(0, len(space.polygons)):
+            space.polygons[i].props['index'] = i # props are the polygon's own, as just unpacked
+        v3D = np.asarray(arrays['v3D']) if 'v3D' in arrays else None
+        space.table = PolygonTable.wrap(space.polygons, np.asarray(arrays['verts']), np.asarray(arrays['origins']),
+                                        np.asarray(arrays['matrices']), np.asarray(arrays['offsets']), v3D)
+
+        return space
+
+    def set_dynamic(self, dynamic):
+        # polygons added after set_dynamic(True) are dynamic, i.e., may be moved by remove_dynamic() & adding them
+        # again; until set_dynamic(False), after which they are static, as by default. Receiver.research() relies
+        # on static polygons never changing.
+        self._dynamic = dynamic
+
+    def has_dynamic(self):
+        for p in self.polygons:
+            if 'dynamic' in p.props:
+                return True
+        return False
+
+    def loudest(self): # the greatest amplitude of the source materials of the polygons, or None if there are none
+        amplitude = None
+        for p in self.polygons:
+            material = p.props['material']
+            if material.is_source() and (amplitude is None or material.amplitude() > amplitude):
+                amplitude = material.amplitude()
+        return amplitude
+
+    def dynamic_bounds(self): # (lo, hi) corners of the padded bounding boxes of the real dynamic polygons
+        return BVH.bounds([p for p in self.polygons if 'dynamic' in p.props and 'ill_only' not in p.props])
+
+    def remove_dynamic(self): # remove the dynamic polygons; returns them
+        removed = [p for p in self.polygons if 'dynamic' in p.props]
+        if len(removed) == 0:
+            return removed
+
+        self.polygons = [p for p in self.polygons if 'dynamic' not in p.props]
+
+        # the polygons' indices change; their props are updated in place, for their copies (e.g., the windows of
+        # views kept for Receiver.research()) to follow
+        renumber = np.full(len(self.polygons) + len(removed), -1, dtype=int)
+        kept = np.asarray([p.props['index'] for p in self.polygons], dtype=int)
+        renumber[kept] = np.arange(len(kept))
+
+        self.table = PolygonTable()
+        for i in range(0, len(self.polygons)):
+            p = self.polygons[i]
+            p.table = None
+            self.table.add(p)
+            p.props['index'] = i
+        for p in removed:
+            p.table = None
+            p.index = None
+            p.props['index'] = None
+
+        self._bvh = None
+        self._pvs = None
+        return removed
+
+    __coplanar = 1E-6 # [m]; how close polygons' planes & vertices must be for simplify() to treat them as the same
+
+    def simplify(self):
+        # merge real, static polygons that lie in the same plane, facing the same way, with the same material, &
+        # share a whole edge, wherever the merged polygon is still convex; then drop reflective polygons that are
+        # covered by a reflective polygon in the same plane facing the other way (e.g., the base of a box standing
+        # on the ground), since they can only be seen from inside a solid; returns the numbers of polygons merged
+        # away & dropped. Call before searching; polygons kept, e.g., receiver windows, keep their props.
+        # Diffraction zones (refractive polygons standing on an edge) are left as they are, & an edge with a zone
+        # on it is never merged away; a dropped polygon's zones go with it, if they stand behind its cover.
+        zones = Space.__zone_edges([p for p in self.polygons if Space.__is_zone(p)])
+
+        groups = { } # plane & material: indices of the polygons
+        for i in range(0, len(self.polygons)):
+            p = self.polygons[i]
+            if 'ill_only' in p.props or 'dynamic' in p.props or 'offset' in p.props or p.props['material'].is_refractive():
+                continue
+            key = Space.__plane_key(p.plane.normal(), p.plane.distance()) + (id(p.props['material']),)
+            if key not in groups:
+                groups[key] = []
+            groups[key].append(i)
+
+        polygons = list(self.polygons) # merged polygons replace the first of theirs; None where merged away
+        merged = 0
+        for key in groups:
+            plane = self.polygons[groups[key][0]].plane
+            blocked = lambda v1, v2: len(Space.__zones_on(zones, plane.coordinate_many(np.asarray([v1, v2])))) > 0
+            for first, others, verts in Space.__merge_group([self.polygons[i] for i in groups[key]], blocked):
+                i = groups[key][first]
+                polygons[i] = Polygon(plane, (len(verts), verts), dict(self.polygons[i].props))
+                for other in others:
+                    polygons[groups[key][other]] = None
+                merged += len(others)
+
+        polygons = [p for p in polygons if p is not None]
+
+        covers = { } # plane: the reflective polygons in it
+        for p in polygons:
+            if 'ill_only' in p.props or 'dynamic' in p.props or 'offset' in p.props or not p.props['material'].is_reflective():
+                continue
+            key = Space.__plane_key(p.plane.normal(), p.plane.distance())
+            if key not in covers:
+                covers[key] = []
+            covers[key].append(p)
+
+        dropped = 0
+        behind = set() # ids of the zones of dropped polygons, standing behind their covers
+        kept = []
+        for p in polygons:
+            if p.props['material'].is_reflective() and not ('ill_only' in p.props or 'dynamic' in p.props or 'offset' in p.props):
+                key = Space.__plane_key(-p.plane.normal(), -p.plane.distance())
+                if key in covers and any(Space.__covers(q, p) for q in covers[key]):
+                    dropped += 1
+                    v3D, count = p.vertices()
+                    for k in range(0, count):
+                        for zone in Space.__zones_on(zones, v3D[[k, (k + 1) % count],:]):
+                            z3D, z_count = zone.vertices()
+                            if np.max(np.matmul(z3D[0:z_count,:], p.plane.normal()) - p.plane.distance()) > Space.__coplanar:
+                                behind.add(id(zone))
+                    continue
+            kept.append(p)
+
+        if len(behind) > 0:
+            kept = [p for p in kept if id(p) not in behind]
+            dropped += len(behind)
+
+        if merged + dropped > 0:
+            self.polygons = kept
+            self.table = PolygonTable()
+            for i in range(0, len(self.polygons)):
+                p = self.polygons[i]
+                p.table = None
+                self.table.add(p)
+                p.props['index'] = i # in place, as for remove_dynamic()
+
+            self._bvh = None
+            self._pvs = None
+
+        Stats.log('Simplified: ' + str(merged + dropped) + ' polygons removed (' + str(merged) + ' merged, ' + str(dropped - len(behind)) + ' covered, ' + str(len(behind)) + ' zones); ' + str(len(self.polygons)) + ' left')
+
+        return merged, dropped
+
+    @staticmethod
+    def __plane_key(normal, distance): # the same for planes within __coplanar of each other, mostly
+        places = int(-np.log10(Space.__coplanar))
+        return tuple(np.round(np.append(normal, distance), places) + 0.0) # + 0.0, so that -0 & 0 are the same
+
+    @staticmethod
+    def __is_zone(p): # real, static & refractive, e.g., a diffraction zone
+        return p.props['material'].is_refractive() and not ('ill_only' in p.props or 'dynamic' in p.props or 'offset' in p.props)
+
+    @staticmethod
+    def __line_key(v1, v2):
+        # the line through v1 & v2 (the same for lines within __coplanar of each other, mostly) & the interval of it
+        # between them; or (None, None) if they are the same point
+        direction = v2 - v1
+        length = np.linalg.norm(direction)
+        if length < Space.__coplanar:
+            return None, None
+        direction = direction / length
+        if direction[np.argmax(np.abs(direction) > Space.__coplanar)] < 0:
+            direction = -direction
+        closest = v1 - np.dot(v1, direction) * direction # to the absolute origin
+        places = int(-np.log10(Space.__coplanar))
+        key = tuple(np.round(np.append(direction, closest), places) + 0.0)
+        return key, sorted((np.dot(v1, direction), np.dot(v2, direction)))
+
+    @staticmethod
+    def __zone_edges(zones): # line: (t1, t2, zone) for each edge of each zone
+        edges = { }
+        for zone in zones:
+            v3D, count = zone.vertices()
+            for k in range(0, count):
+                key, interval = Space.__line_key(v3D[k,:], v3D[(k + 1) % count,:])
+                if key is None:
+                    continue
+                if key not in edges:
+                    edges[key] = []
+                edges[key].append((interval[0], interval[1], zone))
+        return edges
+
+    @staticmethod
+    def __zones_on(edges, v3D): # the zones with an edge along the edge v3D (2,3), overlapping it, as __zone_edges()
+        key, interval = Space.__line_key(v3D[0,:], v3D[1,:])
+        if key is None or key not in edges:
+            return []
+        return [zone for t1, t2, zone in edges[key] if min(t2, interval[1]) - max(t1, interval[0]) > Space.__coplanar]
+
+    @staticmethod
+    def __merge_group(group, blocked=None):
+        # merge the polygons of group (all in the same plane, as the first), wherever two share an edge & the result
+        # is convex, unless blocked(v1, v2) for that edge; returns (first, others, verts) for each merged polygon: the
+        # indices in group of the polygons it replaces, & its vertices in the plane of group[0]
+        plane = group[0].plane
+        places = int(-np.log10(Space.__coplanar))
+
+        loops = { }  # loop number: (first, others, verts), for the polygons as merged so far
+        edges = { }  # rounded (v1, v2) of each edge: loop number
+        for i in range(0, len(group)):
+            v3D, count = group[i].vertices()
+            xy, z = plane.project_many(v3D)
+            loops[i] = (i, [], np.asarray(xy))
+
+        def edge_keys(verts):
+            rounded = [tuple(np.round(v, places) + 0.0) for v in verts]
+            return [(rounded[k], rounded[(k + 1) % len(rounded)]) for k in range(0, len(rounded))]
+
+        for n in loops:
+            for e in edge_keys(loops[n][2]):
+                edges[e] = n
+
+        pending = list(loops)
+        count = len(group)
+        while len(pending) > 0:
+            n = pending.pop()
+            if n not in loops:
+                continue
+            first, others, verts = loops[n]
+
+            keys = edge_keys(verts)
+            for k in range(0, len(keys)):
+                m = edges.get((keys[k][1], keys[k][0]))
+                if m is None or m == n or m not in loops:
+                    continue
+                if blocked is not None and blocked(verts[k], verts[(k + 1) % len(verts)]):
+                    continue
+                m_first, m_others, m_verts = loops[m]
+                union = Space.__union(verts, k, m_verts, edge_keys(m_verts).index((keys[k][1], keys[k][0])))
+                if union is None:
+                    continue
+
+                for e in keys + edge_keys(m_verts):
+                    if edges.get(e) in (n, m):
+                        del edges[e]
+                del loops[n]
+                del loops[m]
+
+                loops[count] = (min(first, m_first), others + m_others + [max(first, m_first)], union)
+                for e in edge_keys(union):
+                    edges[e] = count
+                pending.append(count)
+                count += 1
+                break
+
+        return [loops[n] for n in loops if len(loops[n][1]) > 0]
+
+    @staticmethod
+    def __union(a, i, b, j):
+        # the polygon a (N,2) with edge i, from a[i] to a[i+1], joined to b (M,2) along its edge j, the same edge
+        # reversed; or None, if that is not strictly convex
+        n = len(a)
+        m = len(b)
+        loop = np.concatenate((np.roll(a, -(i + 1), axis=0), np.roll(b, -(j + 2), axis=0)[0:m-2]))
+
+        # drop vertices in line with their neighbours
+        before = np.roll(loop, 1, axis=0)
+        after = np.roll(loop, -1, axis=0)
+        span = after - before
+        cross = span[:,1] * (loop[:,0] - before[:,0]) - span[:,0] * (loop[:,1] - before[:,1])
+        side = cross / np.linalg.norm(span, axis=1) # distance to the right of the line through the neighbours
+        if np.any(side < -Space.__coplanar):
+            return None # a reflex vertex
+        loop = loop[side > Space.__coplanar]
+
+        if len(loop) < 3:
+            return None
+        return loop
+
+    @staticmethod
+    def __covers(q, p): # whether polygon q covers polygon p, which is in the same plane, facing the other way
+        v3D, count = p.vertices()
+        xy, z = q.plane.project_many(v3D)
+
+        v1 = q.verts[0:q.count,:]
+        edge = np.roll(v1, -1, axis=0) - v1
+        for k in range(0, count):
+            rel = xy[k,:] - v1
+            cross = edge[:,0] * rel[:,1] - edge[:,1] * rel[:,0]
+            if np.any(cross < -Space.__coplanar * np.linalg.norm(edge, axis=1)):
+                return False
+        return True
+
+    def bvh(self):
+        if self._bvh is None:
+            self._bvh = BVH(self.polygons)
+        return self._bvh
+
+    def pvs(self, index):
+        # (front, back): indices of the polygons potentially visible from either side of polygon index, i.e., whose
+        # (padded) bounding boxes reach into that side of its plane; computed when first needed, & kept until the
+        # polygons change, or until the sets kept would hold more than __pvs_budget indices in all
+        if self._pvs is None:
+            self._pvs_lo, self._pvs_hi = BVH.bounds(self.polygons)
+            self._pvs_planes = np.zeros((len(self.polygons), 4))
+            for i in range(0, len(self.polygons)):
+                self._pvs_planes[i,0:3] = self.polygons[i].plane.normal()
+                self._pvs_planes[i,3] = self.polygons[i].plane.distance()
+            self._pvs = { }
+            self._pvs_size = 0
+
+        if index not in self._pvs:
+            normal = self._pvs_planes[index,0:3]
+            distance = self._pvs_planes[index,3]
+
+            front = np.nonzero(Space.__pvs_reach(self._pvs_lo, self._pvs_hi, normal) >= distance - Space.__pvs_margin)[0]
+            back = np.nonzero(Space.__pvs_reach(self._pvs_lo, self._pvs_hi, -normal) >= -distance - Space.__pvs_margin)[0]
+
+            if self._pvs_size + len(front) + len(back) > Space.__pvs_budget:
+                self._pvs = { }
+                self._pvs_size = 0
+            self._pvs[index] = (front, back)
+            self._pvs_size += len(front) + len(back)
+
+        return self._pvs[index]
+
+    __pvs_margin = 1E-3 # [m]; so that the sets are conservative for windows in, or nearly in, the polygon's plane
+    __pvs_budget = 10000000 # most polygon indices kept in the sets, over all polygons
+
+    @staticmethod
+    def __pvs_reach(lo, hi, normal): # the furthest each box (lo, hi) reaches along normal; either may be (N,3)
+        return np.sum(np.where(normal >= 0, hi, lo) * normal, axis=1)
+
+    def __pvs_query(self, origin, window):
+        # as frustum_polygons(), from the potentially visible set of the polygon that the window lies in, if any;
+        # otherwise None
+        index = window.props.get('index')
+        if index is None:
+            return None
+
+        polygon = self.polygons[index]
+        normal = polygon.plane.normal()
+        distance = polygon.plane.distance()
+        alignment = np.dot(window.plane.normal(), normal)
+
+        if alignment > 1 - 1E-9 and abs(window.plane.distance() - distance) < 1E-6:
+            candidates = self.pvs(index)[0]
+        elif alignment < -1 + 1E-9 and abs(window.plane.distance() + distance) < 1E-6:
+            candidates = self.pvs(index)[1]
+        else:
+            return None
+
+        planes = BVH.frustum(origin, window)
+        if planes is None:
+            return []
+
+        found = candidates[BVH.intersecting(self._pvs_lo[candidates], self._pvs_hi[candidates], planes)]
+        return [self.polygons[i] for i in found if 'ill_only' not in self.polygons[i].props]
+
+    def frustum_polygons(self, origin, window):
+        # polygons that can intersect the pyramid from origin through window, in scene order; if the window lies in
+        # a polygon of the space (e.g., after a reflection), only that polygon's potentially visible set is tested
+        if not self.use_bvh:
+            return self.polygons
+        if self.use_pvs:
+            found = self.__pvs_query(origin, window)
+            if found is not None:
+                return found
+        return [self.polygons[i] for i in self.bvh().frustum_query(origin, window)]
+
+    def segment_polygons(self, p1, p2):
+        # polygons that can intersect the line segment from p1 to p2, in scene order
+        if not self.use_bvh:
+            return [p for p in self.polygons if 'ill_only' not in p.props]
+        return [self.polygons[i] for i in self.bvh().segment_query(p1, p2)]
+
+    @staticmethod
+    def __poly(v3D, indices): # polygon through the indexed points, anticlockwise about its normal
         plane = Plane.from_points(v3D[indices[0],:], v3D[indices[1],:], v3D[indices[2],:])
         polygon = Polygon(plane, len(indices))
 
-        pi = 0
-        for i in indices:
-            xy, z = plane.project(v3D[i,:])
-            polygon.set_vertex(pi, xy)
-            pi += 1
+        xy, z = plane.project_many(v3D[list(indices),:])
+        polygon.verts[:,:] = xy
+
+        return polygon
+
+    def __make_poly(self, v3D, indices, material, crop_planes=None):
+        polygon = Space.__poly(v3D, indices)
 
         if crop_planes is not None:
             polygon = polygon.crop_3D_poly_between(crop_planes, False)
@@ -73,11 +474,11 @@ class Space(Basis):
 
         p_left = Polygon(left_plane, count)
         p_left.verts[:,:] = verts
-        p_left.props['face'] = 'left'
+        p_left.set_prop('face', 'left')
         self.add_poly(p_left, material)
         p_right = p_left.reverse(False)
         p_right.plane = right_plane
-        p_right.props['face'] = 'right'
+        p_right.set_prop('face', 'right')
         self.add_poly(p_right, material)
 
         l3D, lc = p_left.vertices()
@@ -102,13 +503,13 @@ class Space(Basis):
 
             # faces go: front, base, back, [top, [top, [...]]] - i.e., 0 or more 'top' faces possible
             if l1 == 0:
-                poly.props['face'] = 'front'
+                poly.set_prop('face', 'front')
             elif l1 == 1:
-                poly.props['face'] = 'base'
+                poly.set_prop('face', 'base')
             elif l1 == 2:
-                poly.props['face'] = 'back'
+                poly.set_prop('face', 'back')
             else:
-                poly.props['face'] = 'top'
+                poly.set_prop('face', 'top')
 
             polygons.append(poly)
 
@@ -203,6 +604,209 @@ class Space(Basis):
 
             self.add_prism(verts, count, left_plane, right_plane, material, diffraction_zones)
 
+    @staticmethod
+    def __planes(P1, P2, P3): # Plane.from_points() for stacks (M,3) of points; returns the (M,3) origins & (M,3,3) axes
+        Bi = P2 - P1
+        Bk = np.cross(Bi, P3 - P2)
+        Bj = np.cross(Bk, Bi)
+
+        B = np.stack((Bi, Bj, Bk), axis=1)
+        return P1.copy(), B / np.linalg.norm(B, axis=2)[:,:,np.newaxis]
+
+    @staticmethod
+    def __quads(v3D): # __poly() for stacks (M,4,3) of points; returns the (M,3) origins, (M,3,3) axes & (M,4,2) vertices
+        origins, matrices = Space.__planes(v3D[:,0,:], v3D[:,1,:], v3D[:,2,:])
+        return origins, matrices, PolygonTable.project(v3D, origins, matrices)[:,:,0:2]
+
+    @staticmethod
+    def __zones(v3D, normal, indices, neighbour, zone_width):
+        # __add_zone() for stacks of polygons, with vertices v3D (M,K,3) & normals (M,3), next to polygons with
+        # normals neighbour (M,3); returns the (M,4,3) corners of the zones
+        angle = np.arccos(np.sum(normal * neighbour, axis=1)) * 180 / np.pi
+        angle = (90 + angle / 3) * np.pi / 180
+
+        v1 = v3D[:,indices[0],:]
+        v2 = v3D[:,indices[1],:]
+
+        Bj = np.cross(normal, v2 - v1)
+        Bj /= np.linalg.norm(Bj, axis=1)[:,np.newaxis]
+
+        offset = zone_width * (normal * np.sin(angle)[:,np.newaxis] + Bj * np.cos(angle)[:,np.newaxis])
+
+        return np.stack((v2, v2 + offset, v1 + offset, v1), axis=1)
+
+    @staticmethod
+    def __zone_plan(count, diffraction_zones):
+        # the zones add_prism() adds to a prism with count vertices per end, in order: (face, indices, neighbour,
+        # size), where faces are numbered left, right, then the count sides
+        zone_material, zone_dimensions = diffraction_zones
+        z_left, z_right, z_base, z_other = zone_dimensions[0:4]
+
+        plan = []
+        for l1 in range(0, count):
+            l2 = l1 + 1
+            if l2 == count:
+                l2 = 0
+            r1 = count - 1 - l1
+            r2 = count - 1 - l2
+
+            if z_base and z_left and l1 == 1:
+                plan += [(0, [l1, l2], 2 + l1, z_left), (2 + l1, [0, 1], 0, z_base)]
+            if z_base and z_right and l1 == 1:
+                plan += [(1, [r2, r1], 2 + l1, z_right), (2 + l1, [2, 3], 1, z_base)]
+            if z_other and z_left and not l1 == 1:
+                plan += [(0, [l1, l2], 2 + l1, z_left), (2 + l1, [0, 1], 0, z_other)]
+            if z_other and z_right and not l1 == 1:
+                plan += [(1, [r2, r1], 2 + l1, z_right), (2 + l1, [2, 3], 1, z_other)]
+            if z_base and z_other and l1 < 2:
+                plan += [(2 + l1, [3, 0], 2 + l2, z_base), (2 + l2, [1, 2], 2 + l1, z_base)]
+            if z_other and l1 > 1:
+                plan += [(2 + l1, [3, 0], 2 + l2, z_other), (2 + l2, [1, 2], 2 + l1, z_other)]
+
+        return plan
+
+    def add_boxes(self, bases, base_whs, heights, materials, diffraction_zones=None):
+        # add_box() for each of a list of bases, in one go: base_whs (N,2) are the boxes' (w, h), & heights (N,) their
+        # heights, or (N,2) their (height, roof); materials is a material, or a list with one per box; diffraction
+        # zones are as for add_box(), the same for every box; the boxes can't be swung, but are otherwise built as
+        # add_box() builds them, & their polygons added in the same order; returns the polygons added
+        #
+        # Note: add_prism() crops the zones along a prism between its end planes; for boxes, which are square-ended,
+        # that leaves them as they are, so no cropping is needed here
+        count_boxes = len(bases)
+        if count_boxes == 0:
+            return []
+
+        origins = np.asarray([b.origin for b in bases], dtype='float64')
+        matrices = np.asarray([b.matrix for b in bases], dtype='float64')
+
+        base_whs = np.asarray(base_whs, dtype='float64')
+        w = base_whs[:,0]
+        h = base_whs[:,1]
+
+        heights = np.asarray(heights, dtype='float64')
+        if heights.ndim == 2:
+            height = heights[:,0]
+            count = 5
+        else:
+            height = heights
+            count = 4
+
+        if isinstance(materials, list):
+            box_materials = materials
+        else:
+            box_materials = [materials] * count_boxes
+
+        # the ends: the left face & its reverse, the right face (see add_box() & add_prism())
+        verts = np.zeros((count_boxes, count, 2))
+        verts[:,0,0] = -h/2
+        verts[:,0,1] = height
+        verts[:,1,0] = -h/2
+        verts[:,2,0] = h/2
+        verts[:,3,0] = h/2
+        verts[:,3,1] = height
+        if count == 5:
+            verts[:,4,1] = height + heights[:,1]
+
+        r_verts = verts[:,::-1,:] * [-1, 1]
+
+        zero = np.zeros(count_boxes)
+        jki = np.matmul([[0,1,0],[0,0,1],[1,0,0]], matrices)
+        l_origins = origins + np.matmul(np.stack((-w/2, zero, zero), axis=1)[:,np.newaxis,:], matrices)[:,0,:]
+        r_origins = origins + np.matmul(np.stack(( w/2, zero, zero), axis=1)[:,np.newaxis,:], matrices)[:,0,:]
+        l_matrices = np.matmul([[-1,0,0],[0,1,0],[0,0,-1]], jki)
+        r_matrices = jki
+
+        l3D = PolygonTable.coordinate(verts, l_origins, l_matrices, np.zeros((count_boxes, 3)))
+        r3D = PolygonTable.coordinate(r_verts, r_origins, r_matrices, np.zeros((count_boxes, 3)))
+
+        # the sides: front, base, back, & the top(s)
+        faces = 2 + count
+        width = max(count, 4)
+
+        f_origins = np.zeros((count_boxes, faces, 3))
+        f_matrices = np.zeros((count_boxes, faces, 3, 3))
+        f_verts = np.zeros((count_boxes, faces, width, 2))
+        f_3D = np.zeros((count_boxes, faces, width, 3)) # as Polygon.vertices()
+
+        f_origins[:,0,:], f_matrices[:,0,:,:], f_verts[:,0,0:count,:], f_3D[:,0,0:count,:] = l_origins, l_matrices, verts, l3D
+        f_origins[:,1,:], f_matrices[:,1,:,:], f_verts[:,1,0:count,:], f_3D[:,1,0:count,:] = r_origins, r_matrices, r_verts, r3D
+
+        for l1 in range(0, count):
+            l2 = l1 + 1
+            if l2 == count:
+                l2 = 0
+            r1 = count - 1 - l1
+            r2 = count - 1 - l2
+
+            quads = np.stack((l3D[:,l2,:], l3D[:,l1,:], r3D[:,r1,:], r3D[:,r2,:]), axis=1)
+            s_origins, s_matrices, s_verts = Space.__quads(quads)
+
+            f_origins[:,2+l1,:], f_matrices[:,2+l1,:,:], f_verts[:,2+l1,0:4,:] = s_origins, s_matrices, s_verts
+            f_3D[:,2+l1,0:4,:] = PolygonTable.coordinate(s_verts, s_origins, s_matrices, np.zeros((count_boxes, 3)))
+
+        f_counts = [count, count] + [4] * count
+        f_names = ['left', 'right', 'front', 'base', 'back'] + ['top'] * (count - 3)
+
+        # the diffraction zones, if any
+        if diffraction_zones is not None:
+            zone_material = diffraction_zones[0]
+            plan = Space.__zone_plan(count, diffraction_zones)
+        else:
+            plan = []
+
+        z_origins = np.zeros((count_boxes, len(plan), 3))
+        z_matrices = np.zeros((count_boxes, len(plan), 3, 3))
+        z_verts = np.zeros((count_boxes, len(plan), width, 2))
+
+        for z in range(0, len(plan)):
+            face, indices, neighbour, size = plan[z]
+            corners = Space.__zones(f_3D[:,face,:,:], f_matrices[:,face,2,:], indices, f_matrices[:,neighbour,2,:], size)
+            z_origins[:,z,:], z_matrices[:,z,:,:], z_verts[:,z,0:4,:] = Space.__quads(corners)
+
+        # all of a box's polygons, then the next box's
+        origins = np.concatenate((f_origins, z_origins), axis=1).reshape(-1, 3)
+        matrices = np.concatenate((f_matrices, z_matrices), axis=1).reshape(-1, 3, 3)
+        verts = np.concatenate((f_verts, z_verts), axis=1).reshape(-1, width, 2)
+
+        polygons = []
+        i = 0
+        for b in range(0, count_boxes):
+            for f in range(0, faces + len(plan)):
+                basis = Basis()
+                basis.origin = origins[i,:]
+                basis.matrix = matrices[i,:,:]
+
+                if f < faces:
+                    polygon = Polygon(Plane(basis), (f_counts[f], verts[i,0:f_counts[f],:]))
+                    polygon.props = { 'material': box_materials[b], 'face': f_names[f] }
+                else:
+                    polygon = Polygon(Plane(basis), (4, verts[i,0:4,:]))
+                    polygon.props = { 'material': zone_material }
+
+                polygons.append(polygon)
+                i += 1
+
+        self.__add_polys(polygons, verts, origins, matrices)
+
+        return polygons
+
+    def __add_polys(self, polygons, verts, origins, matrices):
+        # add_poly() for each of polygons, with their materials already set, given their packed vertices & planes
+        # (see PolygonTable.add_many())
+        for polygon in polygons:
+            if polygon.props['material'].is_illustrative():
+                polygon.props['ill_only'] = True
+            if self._dynamic:
+                polygon.props['dynamic'] = True
+            polygon.props['index'] = len(self.polygons)
+            self.polygons.append(polygon)
+            if 'ill_only' not in polygon.props:
+                self._bvh = None
+                self._pvs = None
+
+        self.table.add_many(polygons, verts, origins, matrices)
+
     def add_tree(self, basis, radius, height, trunk=None):
         count = 7
         verts = np.zeros((count, 2))
@@ -224,7 +828,9 @@ class Space(Basis):
         p_fbot = Plane(basis.rotate_j(180,[0,0,base]))
         self.add_prism(verts * radius, count, p_fbot, p_ftop, Material.foliage(), (Material.foliage(), [0,0.5,1,1]))
 
-    def make_receiver(self, basis, dimension, material=None):
+    def make_receiver(self, basis, dimension, material=None, add=True):
+        # left & right ears, each looking out through a window; unless add, the windows are not added to the space
+        # (as in make_point_receiver()), e.g., for ears made again & again in the same space
         if material is None:
             material = Material.darkzone()
 
@@ -234,17 +840,45 @@ class Space(Basis):
         verts[1,:] = [ 1,  0,    0.5 ]
         verts[2,:] = [ 1,  0,   -0.5 ]
         verts[3,:] = [ 0,  0.5, -0.5 ]
-        poly_l = self.__make_poly(basis.rel_to_abs(verts * dimension), [0,1,2,3], material)
-        poly_l.props['ill_only'] = True
+        poly_l = self.__make_window(basis.rel_to_abs(verts * dimension), [0,1,2,3], material, add)
 
         verts[0,:] = [ 0, -0.5,  0.5 ]
         verts[1,:] = [ 1,  0,    0.5 ]
         verts[2,:] = [ 1,  0,   -0.5 ]
         verts[3,:] = [ 0, -0.5, -0.5 ]
-        poly_r = self.__make_poly(basis.rel_to_abs(verts * dimension), [3,2,1,0], material)
-        poly_r.props['ill_only'] = True
+        poly_r = self.__make_window(basis.rel_to_abs(verts * dimension), [3,2,1,0], material, add)
 
         l = Receiver(self, basis.rel_to_abs([0,0,dimension/3]), poly_l, material)
         r = Receiver(self, basis.rel_to_abs([0,0,dimension/3]), poly_r, material)
 
         return l, r
+
+    def __make_window(self, v3D, indices, material, add): # a receiver's window, added to the space if add
+        if add:
+            polygon = self.__make_poly(v3D, indices, material)
+        else:
+            polygon = Space.__poly(v3D, indices)
+            polygon.set_prop('material', material)
+        polygon.set_prop('ill_only', True)
+        return polygon
+
+    def make_point_receiver(self, origin, dimension, material=None):
+        # omnidirectional receiver: a view out through each face of a cube of side dimension about origin;
+        # unlike make_receiver(), the windows are not added to the space
+        if material is None:
+            material = Material.darkzone()
+
+        # corner c is at ((c >> 2) & 1, (c >> 1) & 1, c & 1), scaled & centered on origin
+        corners = np.zeros((8,3))
+        for c in range(0, 8):
+            corners[c,:] = [(c >> 2) & 1, (c >> 1) & 1, c & 1]
+        corners = np.asarray(origin, dtype='float64') + (corners - 0.5) * dimension
+
+        windows = []
+        for indices in [[4,6,7,5], [0,1,3,2], [2,3,7,6], [0,4,5,1], [1,5,7,3], [0,2,6,4]]: # +x, -x, +y, -y, +z, -z
+            poly = Space.__poly(corners, indices)
+            poly.set_prop('material', material)
+            poly.set_prop('ill_only', True)
+            windows.append(poly)
+
+        return Receiver(self, origin, windows, material)
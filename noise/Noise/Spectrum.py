@@ -0,0 +1,59 @@
+import numpy as np
+
+class Spectrum(object):
+
+    # octave bands: centre frequencies [Hz]
+    __centers = np.asarray([63, 125, 250, 500, 1000, 2000, 4000, 8000])
+
+    # A-weighting [dB] at the band centres (IEC 61672-1)
+    __A = np.asarray([-26.2, -16.1, -8.6, -3.2, 0, 1.2, 1.0, -1.1])
+
+    # atmospheric absorption [dB/km] at 20C & 70% relative humidity (ISO 9613-2, table 2)
+    __attenuation = np.asarray([0.1, 0.3, 1.1, 2.8, 5.0, 9.0, 22.9, 76.6])
+
+    @staticmethod
+    def centers():
+        return Spectrum.__centers
+
+    @staticmethod
+    def count():
+        return len(Spectrum.__centers)
+
+    @staticmethod
+    def attenuation(): # [dB/km] per band
+        return Spectrum.__attenuation
+
+    @staticmethod
+    def bands(value): # per-band array from a single value (same in every band) or from a per-band sequence
+        if np.ndim(value) == 0:
+            return np.full(Spectrum.count(), value, dtype='float64')
+
+        bands = np.array(value, dtype='float64')
+        if bands.shape != (Spectrum.count(),): # a wrong-shaped array would only fail later, far from its cause
+            raise ValueError('Spectrum: expected ' + str(Spectrum.count()) + ' bands; got ' + str(bands.shape))
+        return bands
+
+    @staticmethod
+    def total(levels): # energetic sum [dB] of levels over the (last) band axis
+        with np.errstate(divide='ignore'):
+            return 10 * np.log10(np.sum(np.power(10, np.asarray(levels) / 10), axis=-1))
+
+    @staticmethod
+    def a_weighted(levels): # overall A-weighted level [dB(A)] of per-band levels
+        return Spectrum.total(np.asarray(levels) + Spectrum.__A)
+
+    @staticmethod
+    def absorption(value): # (broadband, per-band) absorption; 1 = total absorption
+        # the broadband value, used when pruning views, is the mean over the bands
+        bands = Spectrum.bands(value)
+        if np.ndim(value) == 0:
+            return value, bands
+        return np.mean(bands), bands
+
+    @staticmethod
+    def amplitude(value): # (broadband, per-band) amplitude; reference dB at 10m
+        # a single value is spread evenly over the bands, so that they sum back to it
+        if np.ndim(value) == 0:
+            return value, Spectrum.bands(value - 10 * np.log10(Spectrum.count()))
+        bands = Spectrum.bands(value)
+        return Spectrum.total(bands), bands
@@ -0,0 +1,152 @@
+import csv
+import json
+import time
+
+class Stats(object):
+
+    # Opt-in instrumentation of the search, for this process: per phase of the search, the calls, wall time [s]
+    # (including any phases within) & objects created; per search iteration, the wall time [s] & the beams (views)
+    # created, split, dropped, culled & resolved; & a histogram of the vertex counts of the windows refined. Worker
+    # processes of a parallel search keep their own, which are not collected. Also whether progress & results are
+    # printed.
+
+    __enabled = False
+    __printing = True
+
+    __objects = ('Polygon', 'View', 'Visible')
+    __beams = ('created', 'split', 'dropped', 'culled', 'resolved')
+
+    __phases = { }    # name: { 'calls', 'time', & the count of each of __objects }
+    __active = []     # the phases in progress, innermost last
+    __iterations = [] # per search iteration: 'time', & the count of each of __beams
+    __windows = { }   # window vertex count: number of windows refined
+
+    @staticmethod
+    def enable():
+        Stats.__enabled = True
+
+    @staticmethod
+    def disable():
+        Stats.__enabled = False
+        Stats.__active = []
+
+    @staticmethod
+    def enabled():
+        return Stats.__enabled
+
+    @staticmethod
+    def reset():
+        Stats.__phases = { }
+        Stats.__active = []
+        Stats.__iterations = []
+        Stats.__windows = { }
+
+    @staticmethod
+    def set_printing(printing): # whether log() prints; e.g., off for batch runs
+        Stats.__printing = printing
+
+    @staticmethod
+    def printing():
+        return Stats.__printing
+
+    @staticmethod
+    def log(text): # progress & results; errors are always printed
+        if Stats.__printing:
+            print(text)
+
+    @staticmethod
+    def start(phase): # returns what stop() needs; None if not enabled
+        if not Stats.__enabled:
+            return None
+        Stats.__active.append(Stats.__phase(phase))
+        return time.perf_counter()
+
+    @staticmethod
+    def stop(started):
+        if started is None:
+            return
+        entry = Stats.__active.pop()
+        entry['calls'] += 1
+        entry['time'] += time.perf_counter() - started
+
+    @staticmethod
+    def __phase(phase):
+        if phase not in Stats.__phases:
+            entry = { 'calls': 0, 'time': 0.0 }
+            for kind in Stats.__objects:
+                entry[kind] = 0
+            Stats.__phases[phase] = entry
+        return Stats.__phases[phase]
+
+    @staticmethod
+    def created(kind): # an object of the given class has been created; counted against the innermost phase
+        if not Stats.__enabled:
+            return
+        if len(Stats.__active) > 0:
+            Stats.__active[-1][kind] += 1
+        else:
+            Stats.__phase('(none)')[kind] += 1
+
+    @staticmethod
+    def iteration(): # a search iteration starts; returns what iteration_end() needs; None if not enabled
+        if not Stats.__enabled:
+            return None
+        entry = { 'time': 0.0 }
+        for kind in Stats.__beams:
+            entry[kind] = 0
+        Stats.__iterations.append(entry)
+        return time.perf_counter()
+
+    @staticmethod
+    def iteration_end(started):
+        if started is None:
+            return
+        Stats.__iterations[-1]['time'] += time.perf_counter() - started
+
+    @staticmethod
+    def beams(kind, count=1): # kind is one of 'created', 'split', 'dropped', 'culled', 'resolved'
+        if not Stats.__enabled:
+            return
+        if len(Stats.__iterations) == 0:
+            Stats.iteration()
+        Stats.__iterations[-1][kind] += count
+
+    @staticmethod
+    def window(count): # a window with count vertices is being refined
+        if not Stats.__enabled:
+            return
+        Stats.__windows[count] = Stats.__windows.get(count, 0) + 1
+
+    @staticmethod
+    def report(): # everything recorded so far, as plain values
+        windows = { }
+        for count in sorted(Stats.__windows):
+            windows[str(count)] = Stats.__windows[count]
+
+        return { 'phases': { name: dict(Stats.__phases[name]) for name in Stats.__phases },
+                 'iterations': [dict(entry) for entry in Stats.__iterations],
+                 'windows': windows }
+
+    @staticmethod
+    def save_json(path):
+        with open(path, 'w') as file:
+            json.dump(Stats.report(), file, indent=1)
+
+    @staticmethod
+    def save_csv(path): # one row per value: section ('phase', 'iteration' or 'windows'), key, field, value
+        report = Stats.report()
+
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['section', 'key', 'field', 'value'])
+
+            for name in report['phases']:
+                for field, value in report['phases'][name].items():
+                    writer.writerow(['phase', name, field, value])
+
+            for i in range(0, len(report['iterations'])):
+                for field, value in report['iterations'][i].items():
+                    writer.writerow(['iteration', i + 1, field, value])
+
+            for count, value in report['windows'].items():
+                writer.writerow(['windows', count, 'count', value])
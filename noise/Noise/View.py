@@ -1,14 +1,25 @@
 import numpy as np
 
+from .Basis import Basis
+from .BeamTree import BeamTree
+from .BVH import BVH
 from .Plane import Plane
 from .Polygon import Polygon
+from .PolygonTable import PolygonTable
+from .Spectrum import Spectrum
+from .Stats import Stats
 from .Visible import Visible
 
 class View(object):
 
+    __slots__ = ('region', 'tree', 'node', '_visibles')
+
     def __init__(self, origin, window, visibles=None):
+        Stats.created('View')
+
         self.region = Visible(np.copy(origin), window)
-        self.parent = None
+        self.tree = None # BeamTree holding the views that led here, if any;
+        self.node = -1   # & the index there of the parent view (-1 at the receiver)
 
         if visibles is not None:
             self._visibles = visibles.copy()
@@ -21,11 +32,19 @@ class View(object):
             view.region.target = self.region.target.copy()
         else:
             view.region.target = None
-        view.parent = self.parent
+        view.tree = self.tree
+        view.node = self.node
         return view
 
-    def __search_polygons(self, polygons, space):
-        self._visibles = []
+    def __crop_polygons(self, polygons):
+        table = PolygonTable.shared_by(polygons)
+        if table is not None: # crop & project the lot in one go
+            started = Stats.start('project_and_crop')
+            found = table.project_and_crop(self.region.window, self.region.origin, [p.index for p in polygons])
+            Stats.stop(started)
+            return found
+
+        found = []
 
         for p in polygons:
             # Immediately discard any non-real surfaces
@@ -43,16 +62,24 @@ class View(object):
             # Let's check the polygon relative to our window
             pp = self.region.window.project_and_crop(self.region.origin, p)
             if pp is not None:
-                poly, proj = pp
-                if poly is None:
-                    print('Error: No window')
-                if proj is None:
-                    print('Error: No target')
-                if space is not None:
-                    proj.props['offset'] = proj.plane.normal()
-                    proj.props['ill_only'] = True
-                    space.add_poly(proj)
-                self._visibles.append(Visible(self.region.origin, poly, proj)) # although it may be occluded
+                found.append(pp)
+
+        return found
+
+    def __search_polygons(self, polygons, space):
+        self._visibles = []
+
+        for pp in self.__crop_polygons(polygons):
+            poly, proj = pp
+            if poly is None:
+                print('Error: No window')
+            if proj is None:
+                print('Error: No target')
+            if space is not None:
+                proj.set_prop('offset', proj.plane.normal())
+                proj.set_prop('ill_only', True)
+                space.add_poly(proj)
+            self._visibles.append(Visible(self.region.origin, poly, proj)) # although it may be occluded
 
     def __refine_visibles(self):
         visibles = []
@@ -65,7 +92,27 @@ class View(object):
 
         self._visibles = visibles
 
+    def __compare(self, interior, ids, i1, i2, printing):
+        # is visible i1 within, and behind, visible i2? the window test is looked up in interior
+        v1 = self._visibles[i1]
+        v2 = self._visibles[i2]
+
+        if printing:
+            v1_exterior, v1_interior, v1_farther, v1_coplanar = v2.compare_visible(v1, printing)
+            print('Exterior: '+str(v1_exterior)+', Interior: '+str(v1_interior)+', Farther: '+str(v1_farther)+', Coplanar: '+str(v1_coplanar))
+            return v1_interior, v1_farther, v1_coplanar
+
+        if not interior[ids[i1], ids[i2]]:
+            return False, False, False
+
+        v1_farther, v1_coplanar = v2.compare_target(v1)
+        return True, v1_farther, v1_coplanar
+
     def __remove_occluded(self, printing=False):
+        # all the window tests are done at once, up front; ids maps self._visibles back into interior
+        interior = Visible.interiors(self._visibles)
+        ids = list(range(0, len(self._visibles)))
+
         iv1 = 0
         while (iv1 < len(self._visibles) - 1) and (len(self._visibles) > 1):
             poly1_is_occluded = False
@@ -77,9 +124,7 @@ class View(object):
                 v2 = self._visibles[iv2]
 
                 # check to see if poly1 is contained within poly2
-                v1_exterior, v1_interior, v1_farther, v1_coplanar = v2.compare_visible(v1, printing)
-                if printing:
-                    print('Exterior: '+str(v1_exterior)+', Interior: '+str(v1_interior)+', Farther: '+str(v1_farther)+', Coplanar: '+str(v1_coplanar))
+                v1_interior, v1_farther, v1_coplanar = self.__compare(interior, ids, iv1, iv2, printing)
                 if v1_interior and v1_farther:
                     poly1_is_occluded = True
                     break
@@ -87,11 +132,10 @@ class View(object):
                     print('Error: interior-coplanar polygons?')
 
                 # check to see if poly2 is contained within poly1
-                v2_exterior, v2_interior, v2_farther, v2_coplanar = v1.compare_visible(v2, printing)
-                if printing:
-                    print('Exterior: '+str(v2_exterior)+', Interior: '+str(v2_interior)+', Farther: '+str(v2_farther)+', Coplanar: '+str(v2_coplanar))
+                v2_interior, v2_farther, v2_coplanar = self.__compare(interior, ids, iv2, iv1, printing)
                 if v2_interior and v2_farther:
                     del self._visibles[iv2]
+                    del ids[iv2]
                     poly2_deleted = True
                     break
                 if v2_interior and v2_coplanar:
@@ -101,11 +145,13 @@ class View(object):
                     print(v1.target.vertices())
                     print(v2.target.vertices())
                     del self._visibles[iv2]
+                    del ids[iv2]
                     poly2_deleted = True
                     break
 
             if poly1_is_occluded:
                 del self._visibles[iv1]
+                del ids[iv1]
             elif not poly2_deleted:
                 iv1 += 1
 
@@ -116,7 +162,9 @@ class View(object):
         if len(self._visibles) == 0: # can't see anything
             return subviews, resolved
 
+        started = Stats.start('remove_occluded')
         self.__remove_occluded() # remove any obviously occluded polygons
+        Stats.stop(started)
 
         if len(self._visibles) == 1: # can see only one thing; restrict view & return
             self.region = self._visibles[0]
@@ -156,6 +204,9 @@ class View(object):
 
         # split the window in two and refine the set of self._visibles, etc.
 
+        Stats.beams('split')
+        started = Stats.start('split')
+
         view = self.copy()
 
         self.region.window = self.region.window.split(v1_best, v2_best)
@@ -172,50 +223,98 @@ class View(object):
             view.__refine_visibles()
             subviews.append(view)
 
+        Stats.stop(started)
+
         return subviews, resolved
 
     def search(self, polygons, space=None):
         # self._target should be None at this point
 
+        searching = Stats.start('search')
+
+        started = Stats.start('search_polygons')
         self.__search_polygons(polygons, space)
+        Stats.stop(started)
 
         resolved = []
         subviews = [self]
 
         while len(subviews) > 0:
             subview = subviews.pop(0)
+            Stats.window(subview.region.window.count)
+            started = Stats.start('refine')
             refined_subviews, refined_resolved = subview.__refine()
+            Stats.stop(started)
             subviews += refined_subviews # __refine() will drop the view as empty; or move itself to resolved
             resolved += refined_resolved # if reduced to a single visible; or it will divide into two subviews
 
+        Stats.stop(searching)
+
         return resolved
 
+    def sees(self, bounds): # whether the view might see into any of the boxes (lo, hi)
+        planes = BVH.frustum(self.region.origin, self.region.window)
+        if planes is None:
+            return False
+        return BVH.overlaps(bounds[0], bounds[1], planes)
+
+    @staticmethod
+    def __absorption_bands(window): # per octave band; windows from before band data was kept have the broadband value
+        if window.absorption_bands is not None:
+            return window.absorption_bands
+        return Spectrum.bands(window.absorption)
+
+    def __child(self, origin, window, node):
+        child = View(origin, window)
+        child.tree = self.tree
+        child.node = node
+        return child
+
+    def __record(self): # add self to the beam tree, as the parent of a new view
+        if self.tree is None:
+            self.tree = BeamTree()
+        return self.tree.add(self)
+
+    def __path(self): # (origin, window plane) of self & each of the views before it, back to the receiver
+        path = [(self.region.origin, self.region.window.plane)]
+        if self.tree is not None:
+            for node in self.tree.chain(self.node):
+                path.append((self.tree.origins[node,:], self.tree.plane(node)))
+        return path
+
     def reflect_view(self):
         material = self.region.target.props['material']
         absorption = material.absorption()
+        abs_bands = material.absorption_bands()
 
-        abs_prior = self.region.window.props['absorption']
+        abs_prior = self.region.window.absorption
         abs_new = 1 - (1 - absorption) * (1 - abs_prior)
+        bands_prior = View.__absorption_bands(self.region.window)
+        bands_new = 1 - (1 - abs_bands) * (1 - bands_prior)
         
         window = self.region.target.copy()
-        window.props['absorption'] = abs_new
+        window.absorption = abs_new
+        window.absorption_bands = bands_new
 
         origin = window.plane.reflect(self.region.origin)
 
-        child = View(origin, window)
-        child.parent = self
-        return child
+        return self.__child(origin, window, self.__record())
 
     def refract_view(self):
         material = self.region.target.props['material']
         abs_transmitted, abs_refracted = material.absorption()
+        bands_transmitted, bands_refracted = material.absorption_bands()
 
-        abs_prior = self.region.window.props['absorption']
+        abs_prior = self.region.window.absorption
         abs_new_t = 1 - (1 - abs_transmitted) * (1 - abs_prior)
         abs_new_r = 1 - (1 - abs_refracted) * (1 - abs_prior)
+        bands_prior = View.__absorption_bands(self.region.window)
+        bands_new_t = 1 - (1 - bands_transmitted) * (1 - bands_prior)
+        bands_new_r = 1 - (1 - bands_refracted) * (1 - bands_prior)
         
         window = self.region.target.copy()
-        window.props['absorption'] = abs_new_r
+        window.absorption = abs_new_r
+        window.absorption_bands = bands_new_r
 
         xy_w, z_w = window.plane.project(self.region.origin)
         if z_w > 0:
@@ -224,16 +323,17 @@ class View(object):
         center = window.center()
         origin = center - np.linalg.norm(self.region.origin - center) * window.plane.normal()
 
+        node = self.__record()
+
         # rotate origin until directly behind the window's center
-        child = View(origin, window)
-        child.parent = self
+        child = self.__child(origin, window, node)
 
         window = window.copy()
-        window.props['absorption'] = abs_new_t
+        window.absorption = abs_new_t
+        window.absorption_bands = bands_new_t
 
         # let's also treat the refractive surface as transparent
-        through = View(self.region.origin, window)
-        through.parent = self
+        through = self.__child(self.region.origin, window, node)
 
         return through, child
 
@@ -242,15 +342,14 @@ class View(object):
 
         i3D, count = self.region.target.vertices()
 
-        v = self
-        while v:
+        for origin, window_plane in self.__path():
             v3D = i3D
-            i3D = v.region.window.intersections_3D(v.region.origin, v3D, count)
+            i3D = window_plane.intersections_3D(origin, v3D, count)
 
             for i2 in range(1, count):
                 i1 = i2 - 1
 
-                plane = Plane.from_points(v.region.origin, v3D[i1,:], v3D[i2,:])
+                plane = Plane.from_points(origin, v3D[i1,:], v3D[i2,:])
 
                 poly = Polygon(plane, 4, props)
 
@@ -259,18 +358,16 @@ class View(object):
                 poly.verts[2,:], z_2 = plane.project(i3D[i2,:])
                 poly.verts[3,:], z_3 = plane.project(i3D[i1,:])
 
-                poly.props['ill_only'] = True
+                poly.set_prop('ill_only', True)
                 space.add_poly(poly)
 
-            v = v.parent
-
     def dB_calc(self):
         material = self.region.target.props['material']
 
         amplitude = material.amplitude() # reference: dB at 10m, based on 1m2 visible source
         dist_ref = 10 # reference distance = 10m
 
-        absorption = self.region.window.props['absorption'] # very unscientific scaling (??) # FIXME
+        absorption = self.region.window.absorption # very unscientific scaling (??) # FIXME
         if 1 - absorption < 1E-6:
             return 0
         surf_loss  = 10 * np.log10(1 - absorption)
@@ -283,18 +380,15 @@ class View(object):
 
         area_scale = None
 
-        v = self
-        while v:
+        for origin, window_plane in self.__path():
             v3D = i3D
-            i3D = v.region.window.intersections_3D(v.region.origin, v3D, count)
+            i3D = window_plane.intersections_3D(origin, v3D, count)
 
             distance += np.linalg.norm(v3D[0,:] - i3D[0,:])
 
             if area_scale is None:
                 incidence_vector = (i3D[0,:] - v3D[0,:]) / np.linalg.norm(v3D[0,:] - i3D[0,:])
-                area_scale = np.dot(incidence_vector, v.region.target.plane.normal())
-
-            v = v.parent
+                area_scale = np.dot(incidence_vector, self.region.target.plane.normal())
 
         area = self.region.target.area()
         area_loss = 10 * np.log10(area * area_scale)
@@ -312,3 +406,206 @@ class View(object):
         #      str(dist_loss)+' (dist) [dist='+str(distance)+'; area='+str(area)+']')
 
         return amplitude + area_loss + surf_loss + h2o_loss + dist_loss
+
+    @staticmethod
+    def __heights(points, origins, matrices):
+        # heights of (N,3) points above N planes, each as plane.project() would find them
+        rel = np.matmul((points - origins)[:,np.newaxis,:], np.transpose(matrices, (0,2,1)))[:,0,:]
+        z = rel[:,2]
+        z[(z > -Basis.resolution()) & (z < Basis.resolution())] = 0
+        return z
+
+    @staticmethod
+    def __paths(views):
+        # (distance, area, area_scale) for every view in views at once, as dB_calc() finds them; the paths
+        # are walked a step at a time for all the views at once, where step d is through the d-th window back
+        count = len(views)
+
+        normals = []    # target plane
+        t_origins = []
+        t_matrices = []
+        t_verts = []
+
+        origins = []    # the views' own windows, the first step back
+        w_origins = []
+        w_matrices = []
+
+        trees = { }     # id(tree): (tree, [view index], [parent record]); the rest of each path is in its beam tree
+
+        for s in range(0, count):
+            v = views[s]
+            target = v.region.target
+            normals.append(target.plane.normal())
+            t_origins.append(target.plane.basis.origin)
+            t_matrices.append(target.plane.basis.matrix)
+            t_verts.append(target.verts[0:target.count,:])
+
+            origins.append(v.region.origin)
+            w_origins.append(v.region.window.plane.basis.origin)
+            w_matrices.append(v.region.window.plane.basis.matrix)
+
+            if v.tree is not None and v.node >= 0:
+                if id(v.tree) not in trees:
+                    trees[id(v.tree)] = (v.tree, [], [])
+                tree, index, nodes = trees[id(v.tree)]
+                index.append(s)
+                nodes.append(v.node)
+
+        # per step: (view indices, view origins, window basis origins, window basis matrices)
+        steps = [(np.arange(count), np.asarray(origins), np.asarray(w_origins), np.asarray(w_matrices))]
+
+        for key in trees:
+            tree, index, nodes = trees[key]
+            index = np.asarray(index, dtype=int)
+            nodes = np.asarray(nodes, dtype=int)
+            while len(nodes) > 0:
+                steps.append((index, tree.origins[nodes,:], tree.w_origins[nodes,:], tree.w_matrices[nodes,:,:]))
+                nodes = tree.parents[nodes]
+                index = index[nodes >= 0]
+                nodes = nodes[nodes >= 0]
+
+        normals = np.asarray(normals)
+        t_origins = np.asarray(t_origins)
+        t_matrices = np.asarray(t_matrices)
+
+        # target vertices, zero-padded
+        counts = np.asarray([len(xy) for xy in t_verts])
+        verts = np.zeros((count, np.max(counts), 2))
+        for s in range(0, count):
+            verts[s,0:counts[s],:] = t_verts[s]
+        padding = np.arange(np.max(counts))[np.newaxis,:] >= counts[:,np.newaxis]
+
+        # the target centers, as Polygon.center() finds them
+        means = np.zeros((count, 3)) # relative to the target plane
+        means[:,0:2] = np.sum(verts, axis=1) / counts[:,np.newaxis]
+        i3D = t_origins + np.matmul(means[:,np.newaxis,:], t_matrices)[:,0,:]
+
+        # the target areas, as Polygon.area() finds them; padding repeats vertex 0, adding nothing
+        v1 = verts - means[:,np.newaxis,0:2]
+        v1[padding] = np.repeat(v1[:,0,:], np.max(counts) - counts, axis=0)
+        v2 = np.roll(v1, -1, axis=1)
+        areas = np.sum(v1[:,:,0] * v2[:,:,1] - v1[:,:,1] * v2[:,:,0], axis=1) / 2
+
+        distance = np.zeros(count)
+        area_scale = None
+
+        for index, origins, w_origins, w_matrices in steps:
+            v3D = i3D[index,:]
+
+            # as Polygon.intersections_3D() with the window, for a single point
+            z_o = View.__heights(origins, w_origins, w_matrices)
+            z_i = View.__heights(v3D, w_origins, w_matrices)
+            i3D[index,:] = origins - z_o[:,np.newaxis] * (v3D - origins) / (z_i - z_o)[:,np.newaxis]
+
+            step = np.linalg.norm(v3D - i3D[index,:], axis=1)
+            distance[index] += step
+
+            if area_scale is None: # the first step covers every view
+                incidence_vector = (i3D - v3D) / step[:,np.newaxis]
+                area_scale = np.sum(incidence_vector * normals, axis=1)
+
+        return distance, areas, area_scale
+
+    @staticmethod
+    def dB_calc_many(views):
+        # dB_calc() for every view in views at once
+        count = len(views)
+        dB = np.zeros(count)
+        if count == 0:
+            return dB
+
+        amplitude = np.asarray([v.region.target.props['material'].amplitude() for v in views], dtype='float64')
+        absorption = np.asarray([v.region.window.absorption for v in views], dtype='float64')
+
+        distance, areas, area_scale = View.__paths(views)
+
+        attenuation = 10 # [dB/km] Note: very humidity- & frequency-dependent # FIXME
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            surf_loss = 10 * np.log10(1 - absorption)
+            area_loss = 10 * np.log10(areas * area_scale)
+            h2o_loss = -attenuation * distance / 1000
+            dist_loss = -20 * np.abs(np.log10(10 / distance)) # reference distance = 10m
+
+            dB = amplitude + area_loss + surf_loss + h2o_loss + dist_loss
+
+        dB[1 - absorption < 1E-6] = 0 # very unscientific scaling (??) # FIXME
+
+        return dB
+
+    def solid_angle(self): # of the window, from the origin [sr]
+        origin = self.region.origin
+
+        v3D, n = self.region.window.vertices()
+        a = v3D[0,:] - origin      # the window as a fan of triangles (a, b, c), relative to the origin
+        b = v3D[1:n-1,:] - origin
+        c = v3D[2:n,:] - origin
+
+        la = np.linalg.norm(a)
+        lb = np.linalg.norm(b, axis=1)
+        lc = np.linalg.norm(c, axis=1)
+
+        # solid angle of each triangle [Van Oosterom & Strackee]
+        numerator = np.abs(np.dot(np.cross(b, c), a))
+        denominator = la * lb * lc + np.dot(b, a) * lc + np.dot(c, a) * lb + np.sum(b * c, axis=1) * la
+        return np.sum(2 * np.arctan2(numerator, denominator))
+
+    @staticmethod
+    def dB_bound_many(views, amplitude):
+        # an estimate (to within a dB or so) of the most that dB_calc() could give for any source found through each of views, which may
+        # yet be subdivided, reflected or refracted: the source's visible area, scaled as in dB_calc(), is at most
+        # the window's solid angle (from the view's origin) times the square of its distance, which is no more than
+        # the path's length - so area & distance losses together are at most 10 log10 (100 x solid angle); with
+        # the surface loss so far, & the atmospheric loss to the window's plane, for a source of the given amplitude
+        count = len(views)
+        if count == 0:
+            return np.zeros(0)
+
+        solid_angle = np.zeros(count)
+        distance = np.zeros(count)
+        absorption = np.zeros(count)
+
+        for i in range(0, count):
+            origin = views[i].region.origin
+            window = views[i].region.window
+
+            solid_angle[i] = views[i].solid_angle()
+
+            local_xy, local_z = window.plane.project(origin)
+            distance[i] = abs(local_z)
+            absorption[i] = window.absorption
+
+        attenuation = 10 # [dB/km], as dB_calc_many()
+
+        with np.errstate(divide='ignore'):
+            dB = amplitude + 10 * np.log10(100 * solid_angle) + 10 * np.log10(1 - absorption) - attenuation * distance / 1000
+
+        dB[1 - absorption < 1E-6] = 0 # as dB_calc_many()
+
+        return dB
+
+    @staticmethod
+    def dB_bands_many(views):
+        # as dB_calc_many(), but per octave band (see Spectrum), with frequency-dependent surface & atmospheric
+        # absorption; returns (N,bands); a band that is totally absorbed has no level (-inf)
+        count = len(views)
+        dB = np.zeros((count, Spectrum.count()))
+        if count == 0:
+            return dB
+
+        amplitude = np.asarray([v.region.target.props['material'].amplitude_bands() for v in views])
+        absorption = np.asarray([View.__absorption_bands(v.region.window) for v in views])
+
+        distance, areas, area_scale = View.__paths(views)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            surf_loss = 10 * np.log10(1 - absorption)
+            area_loss = 10 * np.log10(areas * area_scale)
+            h2o_loss = -Spectrum.attenuation()[np.newaxis,:] * distance[:,np.newaxis] / 1000
+            dist_loss = -20 * np.abs(np.log10(10 / distance)) # reference distance = 10m
+
+            dB = amplitude + (area_loss + dist_loss)[:,np.newaxis] + surf_loss + h2o_loss
+
+        dB[1 - absorption < 1E-6] = -np.inf
+
+        return dB
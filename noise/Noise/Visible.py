@@ -1,10 +1,18 @@
 import numpy as np
 
 from .Basis import Basis
+from .Stats import Stats
 
 class Visible(object):
 
+    __slots__ = ('origin', 'window', 'target')
+
+    __margin = 1E-6 # padding of window bounding boxes, in interiors()
+    __pair_budget = 1 << 20 # entries in each (pairs, edges, vertices) array of interiors(), so its memory is bounded
+
     def __init__(self, origin, window, target=None):
+        Stats.created('Visible')
+
         self.origin = origin
         self.window = window
         self.target = target
@@ -104,18 +112,74 @@ class Visible(object):
                 is_interior = False
                 break
 
+        is_farther, is_coplanar = self.compare_target(visible, printing)
+
+        return is_exterior, is_interior, is_farther, is_coplanar
+
+    def compare_target(self, visible, printing=False):
+        # the target half of compare_visible(): is_farther & is_coplanar
+
         v3D, count = visible.target.vertices()
 
         xy_o, z_o = self.target.plane.project(self.origin)
-        for i in range(0, count):
-            xy_i, z_i = self.target.plane.project(v3D[i,:])
-            zoi = z_o * z_i
-            if printing:
-                print('vis-cmp: '+str((z_o, z_i, zoi)))
-            if Basis.is_strictly_positive(zoi):
-                is_farther = False
-                is_coplanar = False
-            if Basis.is_strictly_negative(zoi):
-                is_coplanar = False
-
-        return is_exterior, is_interior, is_farther, is_coplanar
+        xy, z = self.target.plane.project_many(v3D[0:count,:])
+        zoi = z_o * z
+        if printing:
+            for i in range(0, count):
+                print('vis-cmp: '+str((z_o, z[i], zoi[i])))
+
+        is_farther  = not np.any(Basis.is_strictly_positive(zoi))
+        is_coplanar = is_farther and not np.any(Basis.is_strictly_negative(zoi))
+
+        return is_farther, is_coplanar
+
+    @staticmethod
+    def interiors(visibles):
+        # interior[i,j] is True if visibles[i].window is within visibles[j].window, exactly as for
+        # visibles[j].compare_visible(visibles[i]); assumes coincident origins & coplanar windows
+
+        n = len(visibles)
+        interior = np.zeros((n, n), dtype=bool)
+        if n < 2:
+            return interior
+
+        # windows padded to a common vertex count by repeating vertex (& edge) 0, which changes nothing below
+        K = max([v.window.count for v in visibles])
+        verts = np.zeros((n, K, 2))
+        S1 = np.zeros((n, K, 2)) # edge start
+        Bj = np.zeros((n, K, 2)) # inward-pointing edge normal; not normalised
+        for i in range(0, n):
+            w = visibles[i].window
+            c = w.count
+            verts[i,0:c,:] = w.verts[0:c,:]
+            verts[i,c:,:] = w.verts[0,:]
+            Bi = np.roll(verts[i,0:c,:], -1, axis=0) - verts[i,0:c,:]
+            S1[i,0:c,:] = verts[i,0:c,:]
+            S1[i,c:,:] = verts[i,0,:]
+            Bj[i,0:c,0] = -Bi[:,1]
+            Bj[i,0:c,1] =  Bi[:,0]
+            Bj[i,c:,:] = Bj[i,0,:]
+
+        # reject pairs whose bounding boxes are apart
+        lo = np.min(verts, axis=1) - Visible.__margin
+        hi = np.max(verts, axis=1) + Visible.__margin
+        overlap = np.all(lo[:,np.newaxis,:] <= hi[np.newaxis,:,:], axis=2) & np.all(lo[np.newaxis,:,:] <= hi[:,np.newaxis,:], axis=2)
+        np.fill_diagonal(overlap, False)
+        I, J = np.nonzero(overlap)
+        if len(I) == 0:
+            return interior
+
+        # half-plane tests, dp[p,edge,vertex], as stacked single dot-products (to match np.dot on each pair); in
+        # chunks of pairs, since nearly all the windows overlap if cropped to the same window
+        chunk = max(1, Visible.__pair_budget // (K * K))
+        for start in range(0, len(I), chunk):
+            i = I[start:start+chunk]
+            j = J[start:start+chunk]
+            D = verts[i][:,np.newaxis,:,:] - S1[j][:,:,np.newaxis,:]
+            dp = np.matmul(D[:,:,:,np.newaxis,:], Bj[j][:,:,np.newaxis,:,np.newaxis])[:,:,:,0,0]
+
+            inside = ~np.any(Basis.is_strictly_negative(dp), axis=(1,2))
+            spans = np.all(np.any(Basis.is_strictly_positive(dp), axis=2), axis=1) # no edge has all vertices outside/on it
+            interior[i, j] = inside & spans
+
+        return interior
@@ -0,0 +1,912 @@
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from Noise.Space import Space
+from Noise.Material import Material
+from Noise.Polygon import Polygon
+from Noise.NoiseMap import NoiseMap
+from Noise.Receiver import Receiver
+from Noise.Renderer import Renderer
+from Noise.Scenes import Scenes
+from Noise.Stats import Stats
+from Noise.View import View
+from Noise.Visible import Visible
+
+def scene_city(S, count, bulk): # count blocks of (zoned) buildings on a grid, along a road; add_boxes() if bulk
+    side = int(np.ceil(np.sqrt(count)))
+
+    S.add_box(S.offset([0,0,-1]), (30 * side + 100, 30 * side + 100), 1, Material.grass())
+
+    bases = []
+    base_whs = []
+    heights = []
+    for i in range(0, count):
+        row, col = divmod(i, side)
+        bases.append(S.rotate_k((i * 37) % 30 - 15, [30 * (col - side / 2), 30 * (row - side / 2) + 15, 0]))
+        base_whs.append([12 + (i * 7) % 9, 10 + (i * 5) % 7])
+        heights.append(6 + (i * 3) % 19)
+
+    zones = (Material.diffzone(), [1,1,0,1])
+    if bulk:
+        S.add_boxes(bases, base_whs, heights, Material.brick(), zones)
+    else:
+        for i in range(0, count):
+            S.add_box(bases[i], base_whs[i], heights[i], Material.brick(), zones)
+
+    S.add_box(S.offset([0,-30 * side / 2,1]), (30 * side, 3), 3, Material.source())
+
+    return S.make_receiver(S.rotate_k(90, [5,-30 * side / 2 + 8,2]), 2)
+
+def scene_tiles(S): # ground of 10 m tiles, grass with a concrete road through it, & buildings standing on it
+    for x in range(-3, 3):
+        for y in range(-3, 3):
+            if y == 0:
+                material = Material.concrete()
+            else:
+                material = Material.grass()
+            S.add_box(S.offset([10 * x + 5, 10 * y + 5, -1]), (10,10), 1, material)
+
+    S.add_box(S.offset([-15,20,0]), (10,10), 12, Material.brick(), (Material.diffzone(), [1,1,0,1]))
+    S.add_box(S.offset([15,-20,0]), (10,10), 8, Material.brick(), (Material.diffzone(), [1,1,0,1]))
+
+    S.add_box(S.offset([0,5,0]), (40,3), 3, Material.source())
+
+    return S.make_receiver(S.rotate_k(90, [-5,-15,2]), 2)
+
+scene_cases = { 1: Scenes.case_1, 2: Scenes.case_2, 3: Scenes.case_3, 4: Scenes.case_4 } # as in scene.py
+
+# The parametric scenes of barrier.py & train.py (see Scenes), with the Window receiver
+
+def scene_barrier(S, h): # barrier.py, with barriers of height h
+    Scenes.barrier(S, h)
+    return S.make_receiver(Scenes.window(S), 2)
+
+def scene_train(S, x): # train.py, with the vehicle at position x
+    Scenes.train(S, x)
+    return S.make_receiver(Scenes.window(S), 2)
+
+def run_case(case, iterations, drop_if, use_bvh=True, workers=1):
+    S = Space(use_bvh)
+    l_ear, r_ear = scene_cases[case](S)
+
+    start = time.perf_counter()
+    l_ear.search(iterations, drop_if, workers=workers)
+    r_ear.search(iterations, drop_if, workers=workers)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, len(S.polygons), l_ear.calc(), r_ear.calc()
+
+def compare_bvh(case, iterations=1, drop_if=0.999):
+    # time the search with & without frustum culling; the results should be identical
+    t_all, count, l_all, r_all = run_case(case, iterations, drop_if, False)
+    t_bvh, count, l_bvh, r_bvh = run_case(case, iterations, drop_if, True)
+
+    print('Case ' + str(case) + ' (' + str(count) + ' polygons; ' + str(iterations) + ' iteration(s)):')
+    print('  all polygons: ' + str(t_all) + ' s')
+    print('  BVH culling:  ' + str(t_bvh) + ' s (speed-up x' + str(t_all / t_bvh) + ')')
+    if l_all != l_bvh or r_all != r_bvh:
+        print('* * * Error: BVH search results differ * * *')
+
+def crop_scalar(space, origin, window):
+    # the per-polygon path through Polygon.project_and_crop, as used for polygons outside a table
+    found = []
+    for p in space.polygons:
+        if 'ill_only' in p.props:
+            continue
+        local_xy, local_z = p.plane.project(origin)
+        if local_z == 0 or ((local_z < 0) and p.props['material'].is_reflective()):
+            continue
+        pp = window.project_and_crop(origin, p)
+        if pp is not None:
+            found.append(pp)
+    return found
+
+def compare_crop(case, repeats=10):
+    # time the batched crop & project kernel against the per-polygon path, from each ear's window
+    S = Space()
+    ears = scene_cases[case](S)
+    indices = list(range(0, len(S.polygons)))
+
+    print('Case ' + str(case) + ' (' + str(len(S.polygons)) + ' polygons):')
+    for ear in ears:
+        view = ear._views[0]
+        origin = view.region.origin
+        window = view.region.window
+
+        start = time.perf_counter()
+        for r in range(0, repeats):
+            scalar = crop_scalar(S, origin, window)
+        t_scalar = (time.perf_counter() - start) / repeats
+
+        start = time.perf_counter()
+        for r in range(0, repeats):
+            batched = S.table.project_and_crop(window, origin, indices)
+        t_batched = (time.perf_counter() - start) / repeats
+
+        print('  per-polygon: ' + str(t_scalar) + ' s; batched: ' + str(t_batched) + ' s (speed-up x' + str(t_scalar / t_batched) + ')')
+
+        same = len(scalar) == len(batched)
+        if same:
+            for s_pp, b_pp in zip(scalar, batched):
+                for s_poly, b_poly in zip(s_pp, b_pp):
+                    if not np.array_equal(s_poly.verts, b_poly.verts):
+                        same = False
+        if not same:
+            print('* * * Error: batched crop results differ * * *')
+
+def compare_parallel(case, iterations=2, drop_if=0.999):
+    # time the search serially & on a pool of processes; the results should be identical
+    workers = os.cpu_count()
+
+    t_serial, count, l_serial, r_serial = run_case(case, iterations, drop_if)
+    t_pool, count, l_pool, r_pool = run_case(case, iterations, drop_if, workers=workers)
+
+    print('Case ' + str(case) + ' (' + str(count) + ' polygons; ' + str(iterations) + ' iteration(s)):')
+    print('  serial:     ' + str(t_serial) + ' s')
+    print('  ' + str(workers) + ' workers: ' + str(t_pool) + ' s (speed-up x' + str(t_serial / t_pool) + ')')
+    if l_serial != l_pool or r_serial != r_pool:
+        print('* * * Error: parallel search results differ * * *')
+
+def compare_budget(case, iterations=3, drop_if=0.999, tolerance=0.5, max_views=None):
+    # time the fixed-iteration search against the energy-budget search, loudest views first
+    S = Space()
+    l_ear, r_ear = scene_cases[case](S)
+
+    start = time.perf_counter()
+    l_ear.search(iterations, drop_if)
+    r_ear.search(iterations, drop_if)
+    t_fixed = time.perf_counter() - start
+    fixed = [l_ear.calc(), r_ear.calc()]
+
+    S = Space()
+    l_ear, r_ear = scene_cases[case](S)
+
+    start = time.perf_counter()
+    n_views = l_ear.search_budget(tolerance, max_views) + r_ear.search_budget(tolerance, max_views)
+    t_budget = time.perf_counter() - start
+    budget = [l_ear.calc(), r_ear.calc()]
+
+    print('Case ' + str(case) + ' (' + str(len(S.polygons)) + ' polygons):')
+    print('  ' + str(iterations) + ' iteration(s): ' + str(t_fixed) + ' s')
+    print('  ' + str(tolerance) + ' dB budget: ' + str(t_budget) + ' s (' + str(n_views) + ' views searched)')
+    for f, b in zip(fixed, budget):
+        if 'total' in f and 'total' in b:
+            print('  total: ' + str(f['total']) + ' dB (fixed); ' + str(b['total']) + ' dB (budget)')
+
+def compare_images(case, order=2, drop_if=0.999):
+    # cross-check the image-source engine against a beam search deep enough for the same number of
+    # reflections; the beam search also follows diffraction zones & other refractive surfaces, so finds more
+    S = Space()
+    l_ear, r_ear = scene_cases[case](S)
+
+    start = time.perf_counter()
+    l_ear.search(order + 1, drop_if)
+    r_ear.search(order + 1, drop_if)
+    t_beam = time.perf_counter() - start
+    beam = [l_ear.calc(), r_ear.calc()]
+
+    start = time.perf_counter()
+    l_ear.search_images(order, drop_if)
+    r_ear.search_images(order, drop_if)
+    t_image = time.perf_counter() - start
+    image = [l_ear.calc(), r_ear.calc()]
+
+    print('Case ' + str(case) + ' (' + str(len(S.polygons)) + ' polygons; up to ' + str(order) + ' reflection(s)):')
+    print('  beam search: ' + str(t_beam) + ' s')
+    print('  image sources: ' + str(t_image) + ' s')
+    for b, i in zip(beam, image):
+        print('  total: ' + str(b.get('total')) + ' dB (beam); ' + str(i.get('total')) + ' dB (image sources)')
+
+def sweep_scene(S, x, materials): # case 1, with the receiver added before the (dynamic) vehicle
+    Scenes.case_1_static(S)
+    ears = S.make_receiver(Scenes.window(S), 2)
+
+    S.set_dynamic(True)
+    Scenes.case_1_vehicle(S, x, materials)
+    S.set_dynamic(False)
+
+    return ears
+
+def compare_sweep(case, iterations=3, drop_if=0.999, positions=(-30, -20, -10, 0, 10, 20, 30)):
+    # move the vehicle of case 1 along the track, as train.py does: a new space & full search at each position,
+    # against moving only the vehicle & re-searching the views that can see where it was or is
+    if case != 1:
+        print('Case ' + str(case) + ': nothing moves')
+        return
+
+    materials = Scenes.case_1_materials()
+
+    start = time.perf_counter()
+    full = []
+    n_full = 0
+    for x in positions:
+        S = Space()
+        l_ear, r_ear = sweep_scene(S, x, materials)
+        n_full += l_ear.search(iterations, drop_if) + r_ear.search(iterations, drop_if)
+        full.append((l_ear.calc(), r_ear.calc()))
+    t_full = time.perf_counter() - start
+
+    start = time.perf_counter()
+    incremental = []
+    searched = 0
+    for x in positions:
+        if len(incremental) == 0:
+            S = Space()
+            l_ear, r_ear = sweep_scene(S, x, materials)
+            searched += l_ear.search(iterations, drop_if) + r_ear.search(iterations, drop_if)
+        else:
+            S.remove_dynamic()
+            S.set_dynamic(True)
+            Scenes.case_1_vehicle(S, x, materials)
+            S.set_dynamic(False)
+            searched += l_ear.research() + r_ear.research()
+        incremental.append((l_ear.calc(), r_ear.calc()))
+    t_incremental = time.perf_counter() - start
+
+    print('Case ' + str(case) + ' (' + str(len(S.polygons)) + ' polygons; ' + str(len(positions)) + ' positions; ' + str(iterations) + ' iteration(s)):')
+    print('  full search at each position: ' + str(t_full) + ' s (' + str(n_full) + ' views searched)')
+    print('  re-search as the vehicle moves: ' + str(t_incremental) + ' s (' + str(searched) + ' views searched)')
+
+    same = True
+    for f, i in zip(full, incremental):
+        for f_ear, i_ear in zip(f, i):
+            if f_ear.get('total') != i_ear.get('total'):
+                same = False
+    print('  same totals: ' + str(same))
+
+def compare_archive(case, iterations=3, drop_if=0.999):
+    # build & search a scene, then save it with its results; time loading them again, for calc()
+    S = Space()
+
+    start = time.perf_counter()
+    l_ear, r_ear = scene_cases[case](S)
+    t_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    l_ear.search(iterations, drop_if)
+    r_ear.search(iterations, drop_if)
+    t_search = time.perf_counter() - start
+    before = [l_ear.calc(), r_ear.calc()]
+
+    path = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        S.save(os.path.join(path, 'space'))
+        l_ear.save(os.path.join(path, 'left'))
+        r_ear.save(os.path.join(path, 'right'))
+        t_save = time.perf_counter() - start
+
+        start = time.perf_counter()
+        S = Space.load(os.path.join(path, 'space'))
+        t_space = time.perf_counter() - start
+
+        start = time.perf_counter()
+        l_ear = Receiver.load(S, os.path.join(path, 'left'))
+        r_ear = Receiver.load(S, os.path.join(path, 'right'))
+        after = [l_ear.calc(), r_ear.calc()]
+        t_calc = time.perf_counter() - start
+
+        size = 0
+        for root, dirs, files in os.walk(path):
+            for f in files:
+                size += os.path.getsize(os.path.join(root, f))
+    finally:
+        shutil.rmtree(path)
+
+    print('Case ' + str(case) + ' (' + str(len(S.polygons)) + ' polygons; ' + str(iterations) + ' iteration(s)):')
+    print('  build: ' + str(t_build) + ' s; search: ' + str(t_search) + ' s')
+    print('  save: ' + str(t_save) + ' s (' + str(size // 1024) + ' kB)')
+    print('  load space: ' + str(t_space) + ' s; load results & calc: ' + str(t_calc) + ' s')
+    print('  same totals: ' + str(before == after))
+
+def compare_stream(case, iterations=3, drop_if=0.999, stop=5):
+    # time to the first source & to the end, streaming, against search(); then stop streaming, save the receivers,
+    # load them again & resume - once at the end of the first iteration, & once by leaving the loop after stop sources,
+    # part way through a view's sources: the totals should be the same throughout
+    S = Space()
+    l_ear, r_ear = scene_cases[case](S)
+    start = time.perf_counter()
+    l_ear.search(iterations, drop_if)
+    r_ear.search(iterations, drop_if)
+    t_search = time.perf_counter() - start
+    before = [l_ear.calc(), r_ear.calc()]
+
+    S = Space()
+    l_ear, r_ear = scene_cases[case](S)
+    start = time.perf_counter()
+    t_first = None
+    streamed = []
+    for ear in [l_ear, r_ear]:
+        totals = { }
+        for source, totals in ear.stream(iterations, drop_if):
+            if t_first is None:
+                t_first = time.perf_counter() - start
+        streamed.append(totals)
+    t_stream = time.perf_counter() - start
+
+    def first_iteration(iteration, searched, views): # stop at the end of it
+        return searched < views
+
+    resumed = { }
+    for label in ['at the end of iteration 1', 'after ' + str(stop) + ' sources']:
+        S = Space()
+        l_ear, r_ear = scene_cases[case](S)
+        path = tempfile.mkdtemp()
+        try:
+            for ear, name in [(l_ear, 'left'), (r_ear, 'right')]:
+                if label == 'at the end of iteration 1':
+                    for found in ear.stream(iterations, drop_if, progress=first_iteration):
+                        pass
+                else:
+                    for found in ear.stream(iterations, drop_if):
+                        if len(ear.sources) == stop:
+                            break
+                ear.save(os.path.join(path, name))
+
+            start = time.perf_counter()
+            S.save(os.path.join(path, 'space'))
+            S = Space.load(os.path.join(path, 'space'))
+            totals = []
+            for name in ['left', 'right']:
+                ear = Receiver.load(S, os.path.join(path, name))
+                for found in ear.stream(iterations, drop_if, resume=True):
+                    pass
+                totals.append(ear.calc())
+            resumed[label] = (totals == before, time.perf_counter() - start)
+        finally:
+            shutil.rmtree(path)
+
+    if t_first is None:
+        t_first = t_stream
+
+    same = [abs(streamed[i].get('total', 0) - before[i].get('total', 0)) < 1e-9 for i in range(0, 2)]
+
+    print('Case ' + str(case) + ' (' + str(len(S.polygons)) + ' polygons; ' + str(iterations) + ' iteration(s)):')
+    print('  search: ' + str(t_search) + ' s; stream: ' + str(t_stream) + ' s, first source after ' + str(t_first) + ' s')
+    print('  same totals streamed: ' + str(same == [True, True]))
+    for label in resumed:
+        print('  resumed after saving, stopped ' + label + ': ' + str(resumed[label][0]) + ' (' + str(resumed[label][1]) + ' s)')
+
+def compare_boxes(count=1000, iterations=2, drop_if=0.999):
+    # build a city of count buildings with add_box() & with add_boxes(): the time taken, & the largest difference in
+    # the polygons; then search a small city built both ways, for the totals
+    built = []
+    for bulk in [False, True]:
+        S = Space()
+        start = time.perf_counter()
+        scene_city(S, count, bulk)
+        built.append((S, time.perf_counter() - start))
+
+    A = built[0][0].table
+    B = built[1][0].table
+    n = A.size
+    same = (n == B.size) and np.array_equal(A.counts[0:n], B.counts[0:n]) and np.array_equal(A.material[0:n], B.material[0:n])
+    if same:
+        diff = max(np.max(np.abs(A.origins[0:n] - B.origins[0:n])), np.max(np.abs(A.matrices[0:n] - B.matrices[0:n])),
+                   np.max(np.abs(A.verts[0:n] - B.verts[0:n])), np.max(np.abs(A.v3D[0:n] - B.v3D[0:n])))
+    else:
+        diff = None
+
+    totals = []
+    for bulk in [False, True]:
+        S = Space()
+        l_ear, r_ear = scene_city(S, 9, bulk)
+        l_ear.search(iterations, drop_if)
+        r_ear.search(iterations, drop_if)
+        totals.append([float(l_ear.calc().get('total', 0)), float(r_ear.calc().get('total', 0))])
+
+    print('City of ' + str(count) + ' buildings (' + str(n) + ' polygons):')
+    print('  add_box(): ' + str(built[0][1]) + ' s; add_boxes(): ' + str(built[1][1]) + ' s (x' + str(built[0][1] / built[1][1]) + ')')
+    print('  same polygons: ' + str(same) + ' (largest difference: ' + str(diff) + ' m)')
+    print('  search of 9 buildings: ' + str(totals[0]) + ' dB & ' + str(totals[1]) + ' dB')
+
+def compare_render(count=4000):
+    # the display buffers of a city of count buildings, as scene.py would draw it: the time taken by Renderer.buffers()
+    # & by a loop over the polygons as before (one Mesh per polygon, less VisPy), & whether the triangles & colors agree
+    lv = [np.cos(200 * np.pi / 180) * np.cos(60 * np.pi / 180), np.sin(200 * np.pi / 180) * np.cos(60 * np.pi / 180), np.sin(60 * np.pi / 180)]
+    S = Space()
+    scene_city(S, count, True)
+
+    start = time.perf_counter()
+    buffers = Renderer(lv, 0.7).buffers(S.polygons)
+    t_batch = time.perf_counter() - start
+
+    start = time.perf_counter()
+    colors = { 'solid': [], 'illustrative': [] } # per triangle
+    for p in S.polygons:
+        v, c = p.vertices()
+        f, e = p.get_colors(lv, 0.7)
+        if f is not None:
+            colors['illustrative' if 'ill_only' in p.props else 'solid'] += [f] * (c - 2)
+    t_loop = time.perf_counter() - start
+
+    same = True
+    for category in colors:
+        if category in buffers:
+            same = same and np.allclose(buffers[category][2], np.asarray(colors[category], dtype='float64'))
+        else:
+            same = same and len(colors[category]) == 0
+    vertices = sum([len(buffers[category][0]) for category in buffers])
+    faces = sum([len(buffers[category][1]) for category in colors if category in buffers])
+
+    print('City of ' + str(count) + ' buildings (' + str(len(S.polygons)) + ' polygons):')
+    print('  buffers: ' + str(t_batch) + ' s (' + str(vertices) + ' vertices, ' + str(faces) + ' triangles in ' + str(len(buffers)) + ' mesh(es)); per polygon: ' + str(t_loop) + ' s (' + str(len(S.polygons)) + ' meshes)')
+    print('  same triangles & colors: ' + str(same))
+
+    try: # & drawn both ways, if VisPy can make a canvas (e.g., headless: EGL_PLATFORM=surfaceless & vispy.use(app='egl'))
+        from vispy import scene
+        from vispy.scene.cameras.turntable import TurntableCamera
+        scene.SceneCanvas(show=False).close()
+    except Exception as e:
+        print('  not drawn: ' + str(e).splitlines()[0])
+        return
+
+    images = []
+    for batched in [False, True]:
+        canvas = scene.SceneCanvas(size=(600, 450), show=False)
+        view = canvas.central_widget.add_view()
+        view.bgcolor = '#efefef'
+        view.camera = TurntableCamera(scale_factor=20 * np.sqrt(count), elevation=35, azimuth=30)
+        start = time.perf_counter()
+        if batched:
+            Renderer(lv, 0.7).draw(S.polygons, view.scene)
+        else: # as scene.py did
+            for p in S.polygons:
+                v, c = p.vertices()
+                f, e = p.get_colors(lv, 0.7)
+                if f is not None:
+                    scene.visuals.Mesh(vertices=v, faces=range(0,c), color=f, mode='triangle_fan', parent=view.scene)
+                if e is not None:
+                    scene.visuals.Mesh(vertices=v, faces=range(0,c), color=e, mode='lines', parent=view.scene)
+        images.append(canvas.render())
+        t_draw = time.perf_counter() - start
+        canvas.close()
+        print('  drawn ' + ('with Renderer' if batched else 'per polygon') + ': ' + str(t_draw) + ' s')
+
+    differ = np.abs(images[0].astype(int) - images[1].astype(int)).max(axis=2)
+    print('  pixels differing: ' + str(int(np.sum(differ > 0))) + ' of ' + str(differ.size) + ' (by at most ' + str(int(differ.max())) + ' of 255)')
+
+def compare_simplify(case, iterations=3, drop_if=0.999):
+    # search a scene (case 0: scene_tiles()) as built, & after Space.simplify(): the polygons, views & totals
+    results = []
+    for simplify in [False, True]:
+        S = Space()
+        if case == 0:
+            l_ear, r_ear = scene_tiles(S)
+        else:
+            l_ear, r_ear = scene_cases[case](S)
+        count = len(S.polygons)
+
+        start = time.perf_counter()
+        if simplify:
+            S.simplify()
+        t_simplify = time.perf_counter() - start
+
+        Stats.reset()
+        Stats.enable()
+        start = time.perf_counter()
+        l_ear.search(iterations, drop_if)
+        r_ear.search(iterations, drop_if)
+        t_search = time.perf_counter() - start
+        Stats.disable()
+
+        views = sum([entry['resolved'] for entry in Stats.report()['iterations']])
+        totals = [float(l_ear.calc().get('total', 0)), float(r_ear.calc().get('total', 0))]
+        results.append((len(S.polygons), views, t_simplify, t_search, totals))
+
+    print('Case ' + str(case) + ' (' + str(count) + ' polygons; ' + str(iterations) + ' iteration(s)):')
+    for label, (polygons, views, t_simplify, t_search, totals) in zip(['as built', 'simplified'], results):
+        print('  ' + label + ': ' + str(polygons) + ' polygons (' + str(t_simplify) + ' s); ' + str(views) + ' views resolved; search: ' + str(t_search) + ' s; totals: ' + str(totals) + ' dB')
+
+def profile_search(case, iterations=3, drop_if=0.999):
+    # where the time of a search goes, with Stats enabled: per phase, per iteration & per window size; also the
+    # overhead of the instrumentation, against a search with it disabled (& printing off for both)
+    Stats.set_printing(False)
+
+    S = Space()
+    l_ear, r_ear = scene_cases[case](S)
+    start = time.perf_counter()
+    l_ear.search(iterations, drop_if)
+    r_ear.search(iterations, drop_if)
+    t_off = time.perf_counter() - start
+
+    S = Space()
+    l_ear, r_ear = scene_cases[case](S)
+    Stats.reset()
+    Stats.enable()
+    start = time.perf_counter()
+    l_ear.search(iterations, drop_if)
+    r_ear.search(iterations, drop_if)
+    t_on = time.perf_counter() - start
+    Stats.disable()
+    Stats.set_printing(True)
+
+    report = Stats.report()
+
+    print('Case ' + str(case) + ' (' + str(len(S.polygons)) + ' polygons; ' + str(iterations) + ' iteration(s)):')
+    print('  search: ' + str(t_off) + ' s; with stats: ' + str(t_on) + ' s')
+    for name, entry in sorted(report['phases'].items(), key=lambda item: -item[1]['time']):
+        print('  {:20s} {:8d} calls {:9.3f} s  Polygon {:8d}  View {:7d}  Visible {:7d}'.format(name, entry['calls'], entry['time'], entry['Polygon'], entry['View'], entry['Visible']))
+    for i in range(0, len(report['iterations'])): # both ears
+        entry = report['iterations'][i]
+        print('  iteration ' + str(i + 1) + ': ' + ', '.join(kind + ' ' + str(entry[kind]) for kind in entry))
+    print('  window vertices: ' + ', '.join(count + ': ' + str(value) for count, value in report['windows'].items()))
+
+    path = tempfile.mkdtemp()
+    try:
+        Stats.save_json(os.path.join(path, 'stats.json'))
+        Stats.save_csv(os.path.join(path, 'stats.csv'))
+        print('  saved: ' + ', '.join(str(os.path.getsize(os.path.join(path, f))) + ' B ' + f for f in sorted(os.listdir(path))))
+    finally:
+        shutil.rmtree(path)
+
+def compare_prune(case, iterations=4, drop_if=0.999, margins=(30, 20, 10)):
+    # energy-aware culling (search() with margin) against the drop_if threshold alone: time, views searched &
+    # the difference in the totals of each ear
+    def run(margin):
+        S = Space()
+        l_ear, r_ear = scene_cases[case](S)
+        start = time.perf_counter()
+        searched = l_ear.search(iterations, drop_if, margin=margin) + r_ear.search(iterations, drop_if, margin=margin)
+        elapsed = time.perf_counter() - start
+        return elapsed, searched, len(S.polygons), [float(l_ear.calc().get('total', 0)), float(r_ear.calc().get('total', 0))]
+
+    Stats.set_printing(False)
+    t_all, n_all, count, totals_all = run(None)
+
+    print('Case ' + str(case) + ' (' + str(count) + ' polygons; ' + str(iterations) + ' iteration(s)):')
+    print('  drop_if only: ' + str(t_all) + ' s; ' + str(n_all) + ' views searched; totals ' + str(totals_all) + ' dB')
+
+    for margin in margins:
+        t, n, count, totals = run(margin)
+        error = max(abs(totals[0] - totals_all[0]), abs(totals[1] - totals_all[1]))
+        print('  margin ' + str(margin) + ' dB: ' + str(t) + ' s (speed-up x' + str(t_all / t) + '); ' + str(n) + ' views searched; totals ' + str(totals) + ' dB (max error ' + str(error) + ' dB)')
+    Stats.set_printing(True)
+
+def compare_pvs(case, iterations=3, drop_if=0.999):
+    # searches with & without the polygons' potentially visible sets (see Space.pvs(); opt-in); the results should be
+    # identical; also the time to build the sets, their average size & the time spent finding polygons in view
+    def run(use_pvs):
+        S = Space(True, use_pvs)
+        l_ear, r_ear = scene_cases[case](S)
+
+        queries = [0, 0.0] # calls, time
+        frustum_polygons = S.frustum_polygons
+        def timed(origin, window):
+            start = time.perf_counter()
+            found = frustum_polygons(origin, window)
+            queries[0] += 1
+            queries[1] += time.perf_counter() - start
+            return found
+        S.frustum_polygons = timed
+
+        start = time.perf_counter()
+        l_ear.search(iterations, drop_if)
+        r_ear.search(iterations, drop_if)
+        elapsed = time.perf_counter() - start
+
+        return S, elapsed, queries, l_ear.calc(), r_ear.calc()
+
+    Stats.set_printing(False)
+    S, t_bvh, q_bvh, l_bvh, r_bvh = run(False)
+    S, t_pvs, q_pvs, l_pvs, r_pvs = run(True)
+    Stats.set_printing(True)
+
+    S = Space()
+    scene_cases[case](S)
+    start = time.perf_counter()
+    pvs = [S.pvs(i) for i in range(0, len(S.polygons))]
+    t_build = time.perf_counter() - start
+    size = np.mean([len(front) + len(back) for front, back in pvs]) / 2
+
+    print('Case ' + str(case) + ' (' + str(len(S.polygons)) + ' polygons; ' + str(iterations) + ' iteration(s)):')
+    print('  every set built in ' + str(t_build) + ' s; ' + str(size) + ' polygons per side, on average')
+    print('  BVH only: ' + str(t_bvh) + ' s; ' + str(q_bvh[0]) + ' queries in ' + str(q_bvh[1]) + ' s')
+    print('  with PVS: ' + str(t_pvs) + ' s; ' + str(q_pvs[0]) + ' queries in ' + str(q_pvs[1]) + ' s (speed-up x' + str(q_bvh[1] / q_pvs[1]) + ')')
+    if l_bvh != l_pvs or r_bvh != r_pvs:
+        print('  * * * results differ * * *')
+
+def remove_occluded_pairwise(visibles):
+    # the original occlusion stage, with two compare_visible() calls per pair; returns the survivors
+    visibles = list(visibles)
+
+    iv1 = 0
+    while (iv1 < len(visibles) - 1) and (len(visibles) > 1):
+        poly1_is_occluded = False
+        poly2_deleted = False
+
+        v1 = visibles[iv1]
+
+        for iv2 in range(iv1+1, len(visibles)):
+            v2 = visibles[iv2]
+
+            v1_exterior, v1_interior, v1_farther, v1_coplanar = v2.compare_visible(v1)
+            if v1_interior and v1_farther:
+                poly1_is_occluded = True
+                break
+
+            v2_exterior, v2_interior, v2_farther, v2_coplanar = v1.compare_visible(v2)
+            if (v2_interior and v2_farther) or (v1_interior and v2_interior):
+                del visibles[iv2]
+                poly2_deleted = True
+                break
+
+        if poly1_is_occluded:
+            del visibles[iv1]
+        elif not poly2_deleted:
+            iv1 += 1
+
+    return visibles
+
+def compare_occlusion(case, repeats=3):
+    # time the occlusion stage on each ear's (dense) initial view, against the pairwise original
+    S = Space()
+    ears = scene_cases[case](S)
+    indices = list(range(0, len(S.polygons)))
+
+    print('Case ' + str(case) + ' (' + str(len(S.polygons)) + ' polygons):')
+    for ear in ears:
+        origin = ear._views[0].region.origin
+        window = ear._views[0].region.window
+
+        visibles = []
+        for poly, proj in S.table.project_and_crop(window, origin, indices):
+            visibles.append(Visible(origin, poly, proj))
+
+        start = time.perf_counter()
+        for r in range(0, repeats):
+            pairwise = remove_occluded_pairwise(visibles)
+        t_pairwise = (time.perf_counter() - start) / repeats
+
+        start = time.perf_counter()
+        for r in range(0, repeats):
+            view = View(origin, window, visibles)
+            view._View__remove_occluded()
+        t_culled = (time.perf_counter() - start) / repeats
+
+        print('  ' + str(len(visibles)) + ' visibles -> ' + str(len(view._visibles)) + ': pairwise: ' + str(t_pairwise) + ' s; culled: ' + str(t_culled) + ' s (speed-up x' + str(t_pairwise / t_culled) + ')')
+
+        same = len(pairwise) == len(view._visibles)
+        if same:
+            for p_v, c_v in zip(pairwise, view._visibles):
+                if p_v is not c_v:
+                    same = False
+        if not same:
+            print('* * * Error: occlusion culling results differ * * *')
+
+def compare_calc(case, iterations=2, drop_if=0.999, copies=1000):
+    # time the batched dB calculation against per-source dB_calc(), over many copies of each ear's sources
+    S = Space()
+    ears = scene_cases[case](S)
+
+    print('Case ' + str(case) + ' (' + str(len(S.polygons)) + ' polygons; ' + str(iterations) + ' iteration(s)):')
+    for ear in ears:
+        ear.search(iterations, drop_if)
+        sources = ear.sources * copies
+        if len(sources) == 0:
+            continue
+
+        start = time.perf_counter()
+        per_source = np.asarray([s.dB_calc() for s in sources])
+        t_single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = View.dB_calc_many(sources)
+        t_batched = time.perf_counter() - start
+
+        print('  ' + str(len(sources)) + ' sources: per-source: ' + str(t_single) + ' s; batched: ' + str(t_batched) + ' s (speed-up x' + str(t_single / t_batched) + ')')
+        if np.max(np.abs(per_source - batched)) > 1E-9:
+            print('* * * Error: batched dB calculation differs * * *')
+
+def compare_map(case, iterations=2, drop_if=0.999, size=4):
+    # time a size x size noise map over the scene's central 40m square, serially & on a pool of processes
+    workers = os.cpu_count()
+
+    S = Space()
+    scene_cases[case](S)
+    grid = np.linspace(-20, 20, size)
+    noise_map = NoiseMap(S, grid, grid, 1.5)
+
+    start = time.perf_counter()
+    serial = noise_map.run(iterations, drop_if, 1)
+    t_serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pool = noise_map.run(iterations, drop_if, workers)
+    t_pool = time.perf_counter() - start
+
+    print('Case ' + str(case) + ' (' + str(len(S.polygons)) + ' polygons; ' + str(size) + 'x' + str(size) + ' grid; ' + str(iterations) + ' iteration(s)):')
+    print('  serial:     ' + str(t_serial) + ' s')
+    print('  ' + str(workers) + ' workers: ' + str(t_pool) + ' s (speed-up x' + str(t_serial / t_pool) + ')')
+    print(np.round(pool, 1))
+    if not np.array_equal(serial, pool, equal_nan=True):
+        print('* * * Error: parallel noise map differs * * *')
+
+def cache_use(case, iterations=2, drop_if=0.999):
+    # polygon geometry cache hits & misses during a search (of both ears)
+    S = Space()
+    l_ear, r_ear = scene_cases[case](S)
+
+    Polygon.reset_cache_stats()
+    start = time.perf_counter()
+    l_ear.search(iterations, drop_if)
+    r_ear.search(iterations, drop_if)
+    elapsed = time.perf_counter() - start
+    hits, misses = Polygon.cache_stats()
+
+    print('Case ' + str(case) + ' (' + str(len(S.polygons)) + ' polygons; ' + str(iterations) + ' iteration(s)): ' + str(elapsed) + ' s')
+    print('  geometry cache: ' + str(hits) + ' hits; ' + str(misses) + ' misses (hit rate ' + str(hits / max(1, hits + misses)) + ')')
+
+def memory_use(case, iterations=6, drop_if=0.999):
+    # peak resident memory of a search (of both ears), as in barrier.py; run one case per process,
+    # since the peak is the process's own
+    S = Space()
+    l_ear, r_ear = scene_cases[case](S)
+
+    rss_scene = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # [kB] on Linux
+    start = time.perf_counter()
+    l_ear.search(iterations, drop_if)
+    r_ear.search(iterations, drop_if)
+    elapsed = time.perf_counter() - start
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    views = len(l_ear._views) + len(r_ear._views)
+    sources = len(l_ear.sources) + len(r_ear.sources)
+
+    print('Case ' + str(case) + ' (' + str(len(S.polygons)) + ' polygons; ' + str(iterations) + ' iteration(s)): ' + str(elapsed) + ' s')
+    print('  ' + str(sources) + ' sources & ' + str(views) + ' views pending')
+    print('  peak RSS: ' + str(rss_scene / 1024) + ' MB after scene; ' + str(rss_peak / 1024) + ' MB after search')
+
+# The suite: each scene, searched by both ears; timed (build, search per iteration, calc) & its dB totals checked
+# against the reference values in benchmark_reference.json, within tolerance [dB]. The reference values are the
+# totals of the original, unoptimised search engine for the same scenes, so that the suite checks the engine against
+# that rather than against itself; only --update them for a change that is meant to alter the results.
+
+suite = [ # name, builder, args, iterations
+    ('case_1',    Scenes.case_1, (),   3),
+    ('case_2',    Scenes.case_2, (),   3),
+    ('case_4',    Scenes.case_4, (),   3),
+    ('barrier_3', scene_barrier, (3,), 3),
+    ('train_0',   scene_train,   (0,), 3) ]
+
+reference_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_reference.json')
+
+def run_suite_entry(name, builder, args, iterations, drop_if):
+    S = Space()
+
+    start = time.perf_counter()
+    l_ear, r_ear = builder(S, *args)
+    t_build = time.perf_counter() - start
+
+    per_iteration = [] # summed over both ears
+    t_search = 0
+
+    for ear in [l_ear, r_ear]:
+        Stats.reset()
+        Stats.enable()
+        start = time.perf_counter()
+        ear.search(iterations, drop_if)
+        t_search += time.perf_counter() - start
+        Stats.disable()
+
+        for i, entry in enumerate(Stats.report()['iterations']):
+            if i == len(per_iteration):
+                per_iteration.append({ kind: 0 for kind in entry })
+            for kind in entry:
+                per_iteration[i][kind] += entry[kind]
+
+    start = time.perf_counter()
+    totals = { 'left': l_ear.calc(), 'right': r_ear.calc() }
+    t_calc = time.perf_counter() - start
+
+    for ear in totals:
+        totals[ear] = { label: float(totals[ear][label]) for label in totals[ear] }
+
+    return { 'name': name, 'polygons': len(S.polygons), 'iterations': iterations,
+             'sources': len(l_ear.sources) + len(r_ear.sources),
+             'build': t_build, 'search': t_search, 'calc': t_calc, 'per_iteration': per_iteration, 'totals': totals }
+
+def check_totals(totals, reference, tolerance):
+    # returns 'pass' or 'fail', & the largest difference [dB] from reference (None if the labels differ)
+    deviation = 0
+    for ear in ['left', 'right']:
+        if sorted(totals[ear]) != sorted(reference[ear]):
+            return 'fail', None
+        for label in totals[ear]:
+            deviation = max(deviation, abs(totals[ear][label] - reference[ear][label]))
+
+    if deviation > tolerance:
+        return 'fail', deviation
+    return 'pass', deviation
+
+def run_suite(report_file='benchmark_report.json', update=False, drop_if=0.999, tolerance=0.01):
+    # runs the suite & writes the report (JSON); if update, the totals become the reference values;
+    # returns the number of scenes whose totals don't match their reference values
+    Stats.set_printing(False)
+
+    references = { }
+    if os.path.exists(reference_file):
+        with open(reference_file, 'r') as file:
+            references = json.load(file)
+
+    results = []
+    failed = 0
+
+    for name, builder, args, iterations in suite:
+        result = run_suite_entry(name, builder, args, iterations, drop_if)
+
+        if update:
+            references[name] = result['totals']
+        if name in references:
+            result['check'], result['deviation'] = check_totals(result['totals'], references[name], tolerance)
+        else:
+            result['check'], result['deviation'] = 'missing', None
+        if result['check'] != 'pass':
+            failed += 1
+
+        print('{:10s} {:4d} polygons  build {:7.3f} s  search {:8.3f} s  calc {:7.4f} s  {:5d} sources  {}'.format(
+              name, result['polygons'], result['build'], result['search'], result['calc'], result['sources'], result['check']))
+        results.append(result)
+
+    Stats.set_printing(True)
+
+    if update:
+        with open(reference_file, 'w') as file:
+            json.dump(references, file, indent=1, sort_keys=True)
+
+    report = { 'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(), 'numpy': np.__version__,
+               'platform': platform.platform(), 'drop_if': drop_if, 'tolerance': tolerance, 'failed': failed, 'results': results }
+
+    with open(report_file, 'w') as file:
+        json.dump(report, file, indent=1)
+    print('Report: ' + report_file + '; ' + str(failed) + ' of ' + str(len(suite)) + ' scene(s) not matching the reference values')
+
+    return failed
+
+benchmarks = { 'bvh': compare_bvh, 'crop': compare_crop, 'parallel': compare_parallel, 'budget': compare_budget, 'occlusion': compare_occlusion, 'calc': compare_calc, 'map': compare_map, 'cache': cache_use, 'memory': memory_use, 'images': compare_images, 'sweep': compare_sweep, 'archive': compare_archive, 'profile': profile_search, 'prune': compare_prune, 'pvs': compare_pvs, 'stream': compare_stream, 'simplify': compare_simplify }
+
+sized = { 'boxes': compare_boxes, 'render': compare_render } # benchmarks of a city of count buildings, not of a case
+
+# Usage: python benchmark.py [bvh|crop|parallel|budget|occlusion|calc|map|cache|memory|images|sweep|archive|profile|prune|pvs|stream|simplify [case [iterations]]]
+#        python benchmark.py suite [report.json] [--update]
+#        python benchmark.py [boxes|render] [count]
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        test = sys.argv[1]
+    else:
+        test = 'bvh'
+
+    if test == 'suite':
+        options = [a for a in sys.argv[2:] if a != '--update']
+        if len(options) > 0:
+            failed = run_suite(options[0], '--update' in sys.argv)
+        else:
+            failed = run_suite(update='--update' in sys.argv)
+        sys.exit(1 if failed > 0 else 0)
+
+    if test in sized:
+        if len(sys.argv) > 2:
+            sized[test](int(sys.argv[2]))
+        else:
+            sized[test]()
+        sys.exit(0)
+
+    if len(sys.argv) > 2:
+        cases = [int(sys.argv[2])]
+    else:
+        cases = [1, 2, 4]
+
+    for case in cases:
+        if test not in ['crop', 'occlusion'] and len(sys.argv) > 3:
+            benchmarks[test](case, int(sys.argv[3]))
+        else:
+            benchmarks[test](case)
@@ -4,18 +4,10 @@ from vispy.scene.cameras.turntable import TurntableCamera
 import numpy as np
 
 from Noise.Space import Space
-from Noise.Material import Material
+from Noise.Scenes import Scenes
+from Noise.Renderer import Renderer
 
-hvac = Material('HVAC', (0,0,1,1))
-hvac.make_source(0,60)
-
-wheel = Material('Wheel', (0.75,0.75,0.75,1))
-wheel.make_source(0,60)
-
-rail = Material('Rail', (0.25,0.25,0.25,1))
-rail.make_source(0,60)
-
-# Make the scene
+# Make the scene: one of the cases in Noise/Scenes.py, shared with benchmark.py
 
 S = Space()
 
@@ -23,208 +15,10 @@ sf = 120 # scale factor
 
 case = 1
 
-if case == 1:
-    B = S.offset([0,-30,0])
-
-    S.add_box(B.offset([ 0,44.5,-1]), (100,9), 1, Material.concrete())
-    S.add_box(B.offset([20,40.5, 0]), ( 60,1), 4, Material.barrier(), (Material.diffzone(), [0,0,0,1]))
-
-    S.add_box(B.offset([  0,  0,0]), (40,40), 1, Material.concrete())
-
-    S.add_box(B.offset([ 19, 30,0]), (62,20), 1, Material.grass())
-    S.add_box(B.offset([-35, 14,0]), (30,52), 1, Material.grass())
-    S.add_box(B.offset([-19,-35,0]), (62,30), 1, Material.grass())
-    S.add_box(B.offset([ 35,-19,0]), (30,62), 1, Material.grass())
-
-    S.add_box(B.offset([ 16,-35,0]), (8,30), 1, Material.concrete())
-    S.add_box(B.offset([-35,-16,0]), (30,8), 1, Material.concrete())
-    S.add_box(B.offset([ 35, 16,0]), (30,8), 1, Material.concrete())
-    S.add_box(B.offset([-16, 30,0]), (8,20), 1, Material.concrete())
-
-    S.add_box(B.rotate_k(-30,[0,0,1]), (20,20), 40, Material.brick(), (Material.diffzone(), [1,1,0,1]))
-
-    V = B.offset([30,46,0])
-    S.add_box(V.offset([ 0,   0,    1    ]), (20,   3   ), 3,    Material.glass())
-    S.add_box(V.offset([ 0,   0,    4    ]), ( 2,   2   ), 0.25, hvac)
-    S.add_box(V.offset([-8,  -0.75, 0    ]), ( 8,   0.25), 0.25, rail)
-    S.add_box(V.offset([-8,   0.75, 0    ]), ( 8,   0.25), 0.25, rail)
-    S.add_box(V.offset([ 8,  -0.75, 0    ]), ( 8,   0.25), 0.25, rail)
-    S.add_box(V.offset([ 8,   0.75, 0    ]), ( 8,   0.25), 0.25, rail)
-    S.add_box(V.offset([-9.5,-0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
-    S.add_box(V.offset([-6.5,-0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
-    S.add_box(V.offset([-9.5, 0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
-    S.add_box(V.offset([-6.5, 0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
-    S.add_box(V.offset([ 9.5,-0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
-    S.add_box(V.offset([ 6.5,-0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
-    S.add_box(V.offset([ 9.5, 0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
-    S.add_box(V.offset([ 6.5, 0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
-
-    # Add a receiver
-    # l_ear, r_ear = S.make_receiver(B.rotate_k(90, [-20,30,2]), 2)
-
-    l_ear, r_ear = S.make_receiver(B.rotate_k(-30,[0,0,1]).rotate_k(90,[0,10.5,30]), 2)
-
-elif case == 2:
-    S.add_box(S.offset([0,0,-1]), (100,100), 1, Material.concrete())
-
-    S.add_box(S.rotate_k(45, [0,45,1]), (10,10), 10, Material.source())
-
-    S.add_box(S.rotate_k(30), (20,20), 40, Material.brick(), (Material.diffzone(), [5,5,5,5]))
-
-    S.add_tree(S.offset([20,20,0]), 2, 5, 3)
-    S.add_tree(S.offset([30,15,0]), 2, 5, 2)
-
-    # Add a receiver
-    l_ear, r_ear = S.make_receiver(S.rotate_k(90, [30,-15,20]), 2)
-
-elif case == 3:
+if case == 3:
     sf = 400
 
-    S.add_box(S.offset([0,0,-1]), (1000,1000), 1, Material.grass())
-
-    S.add_box(S.rotate_k(-27, [190,163,1]), (500,3), 3, Material.source())
-
-    if False:
-        S.add_box(S.offset([-288, 232,0]), ( 72,8), (5,2), Material.brick(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([-288, 196,0]), ( 72,8), (5,2), Material.brick(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([-288, 172,0]), ( 72,8), (5,2), Material.brick(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([-288, 136,0]), ( 72,8), (5,2), Material.brick(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([-288, 112,0]), ( 72,8), (5,2), Material.brick(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([-288,  76,0]), ( 72,8), (5,2), Material.brick(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([-288,  52,0]), ( 72,8), (5,2), Material.brick(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([-288,  16,0]), ( 72,8), (5,2), Material.brick(), (Material.diffzone(), [1,1,0,1]))
-
-        S.add_box(S.offset([-395, 117,0]), ( 30,8), (5,2), Material.brick(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([-404,  79,0]), ( 48,8), (5,2), Material.brick(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([-413,  41,0]), ( 66,8), (5,2), Material.brick(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([-422,   3,0]), ( 84,8), (5,2), Material.brick(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([-431, -35,0]), (102,8), (5,2), Material.brick(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([-440, -73,0]), (120,8), (5,2), Material.brick(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([-458,-104,0]), ( 84,8), (5,2), Material.brick(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([-395,-104,0]), ( 30,8), (5,2), Material.brick(), (Material.diffzone(), [1,1,0,1]))
-
-    if True:
-        # Ring 1
-        r = 45
-        theta_45 = 45 - (6 / (r - 8) * 180 / np.pi) / 2
-        d_theta = 7.5 / r * 180 / np.pi
-        count = np.int(theta_45 / d_theta)
-        angles = theta_45 + d_theta * np.asarray(range(-count,1))
-        S.add_box(S.offset([0,5,0]), ((r-6,angles),4), 7.5, Material.concrete(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([0,5,0]), ((r-2,angles),4), 5, Material.concrete())
-
-        angles = 90 + d_theta * np.asarray(range(-count,count+1))
-        S.add_box(S.offset([0,5,0]), ((r-6,angles),4), 7.5, Material.concrete(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([0,5,0]), ((r-2,angles),4), 5, Material.concrete())
-
-        angles = 180 - theta_45 + d_theta * np.asarray(range(0,count+1))
-        S.add_box(S.offset([0,5,0]), ((r-6,angles),4), 7.5, Material.concrete(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([0,5,0]), ((r-2,angles),4), 5, Material.concrete())
-
-        # Ring 2
-        r = 85
-        theta_45 = 45 - (6 / (r - 8) * 180 / np.pi) / 2
-        d_theta = 7.5 / r * 180 / np.pi
-        count = np.int(theta_45 / d_theta)
-        angles = theta_45 + d_theta * np.asarray(range(-count,1))
-        S.add_box(S.offset([0,5,0]), ((r-6,angles),4), 5, Material.concrete())
-        S.add_box(S.offset([0,5,0]), ((r-2,angles),4), 7.5, Material.concrete(), (Material.diffzone(), [1,1,0,1]))
-
-        angles = 90 + d_theta * np.asarray(range(-count,count+1))
-        S.add_box(S.offset([0,5,0]), ((r-6,angles),4), 5, Material.concrete())
-        S.add_box(S.offset([0,5,0]), ((r-2,angles),4), 7.5, Material.concrete(), (Material.diffzone(), [1,1,0,1]))
-
-        angles = 180 - theta_45 + d_theta * np.asarray(range(0,count+1))
-        S.add_box(S.offset([0,5,0]), ((r-6,angles),4), 5, Material.concrete())
-        S.add_box(S.offset([0,5,0]), ((r-2,angles),4), 7.5, Material.concrete(), (Material.diffzone(), [1,1,0,1]))
-
-        # Ring 3
-        r = 120
-        theta_45 = 45 - (6 / (r - 8) * 180 / np.pi) / 2
-        d_theta = 7.5 / r * 180 / np.pi
-        count = np.int(theta_45 / d_theta)
-        angles = theta_45 + d_theta * np.asarray(range(-count,1))
-        S.add_box(S.offset([0,5,0]), ((r-6,angles),4), 7.5, Material.concrete(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([0,5,0]), ((r-2,angles),4), 5, Material.concrete())
-
-        angles = 90 + d_theta * np.asarray(range(-count,count+1))
-        S.add_box(S.offset([0,5,0]), ((r-6,angles),4), 7.5, Material.concrete(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([0,5,0]), ((r-2,angles),4), 5, Material.concrete())
-
-        angles = 180 - theta_45 + d_theta * np.asarray(range(0,count+1))
-        S.add_box(S.offset([0,5,0]), ((r-6,angles),4), 7.5, Material.concrete(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([0,5,0]), ((r-2,angles),4), 5, Material.concrete())
-
-        # Ring 4
-        r = 160
-        theta_45 = 45 - (6 / (r - 8) * 180 / np.pi) / 2
-        d_theta = 7.5 / r * 180 / np.pi
-        count = np.int(theta_45 / d_theta)
-
-        angles = 90 + d_theta * np.asarray(range(0,count+1))
-        S.add_box(S.offset([0,5,0]), ((r-6,angles),4), 5, Material.concrete())
-        S.add_box(S.offset([0,5,0]), ((r-2,angles),4), 7.5, Material.concrete(), (Material.diffzone(), [1,1,0,1]))
-
-        angles = 180 - theta_45 + d_theta * np.asarray(range(0,count+1))
-        S.add_box(S.offset([0,5,0]), ((r-6,angles),4), 5, Material.concrete())
-        S.add_box(S.offset([0,5,0]), ((r-2,angles),4), 7.5, Material.concrete(), (Material.diffzone(), [1,1,0,1]))
-
-        # Ring 5
-        r = 190
-        theta_45 = 45 - (6 / (r - 8) * 180 / np.pi) / 2
-        d_theta = 7.5 / r * 180 / np.pi
-        count = int(theta_45 / d_theta)
-        c_65 = int(count*20/45)
-        theta_65 = 115 - (6 / (r - 8) * 180 / np.pi) / 2
-
-        angles = theta_65 + d_theta * np.asarray(range(0,c_65+1))
-        S.add_box(S.offset([0,5,0]), ((r-6,angles),4), 7.5, Material.concrete(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([0,5,0]), ((r-2,angles),4), 5, Material.concrete())
-
-        angles = 180 - theta_45 + d_theta * np.asarray(range(0,count+1))
-        S.add_box(S.offset([0,5,0]), ((r-6,angles),4), 7.5, Material.concrete(), (Material.diffzone(), [1,1,0,1]))
-        S.add_box(S.offset([0,5,0]), ((r-2,angles),4), 5, Material.concrete())
-
-        # Ring 6
-        r = 230
-        theta_45 = 45 - (6 / (r - 8) * 180 / np.pi) / 2
-        d_theta = 7.5 / r * 180 / np.pi
-        count = int(theta_45 / d_theta)
-        c_65 = int(count*20/45)
-        theta_65 = 115 - (6 / (r - 8) * 180 / np.pi) / 2
-
-        angles = theta_65 + d_theta * np.asarray(range(0,c_65+1))
-        S.add_box(S.offset([0,5,0]), ((r-6,angles),4), 5, Material.concrete())
-        S.add_box(S.offset([0,5,0]), ((r-2,angles),4), 7.5, Material.concrete(), (Material.diffzone(), [1,1,0,1]))
-
-        angles = 180 - theta_45 + d_theta * np.asarray(range(0,count+1))
-        S.add_box(S.offset([0,5,0]), ((r-6,angles),4), 5, Material.concrete())
-        S.add_box(S.offset([0,5,0]), ((r-2,angles),4), 7.5, Material.concrete(), (Material.diffzone(), [1,1,0,1]))
-
-    # Add a receiver
-    l_ear, r_ear = S.make_receiver(S.rotate_k(90, [0,0,2]), 2)
-
-elif case == 4:
-
-    basis = S.offset([-5,5,0])
-    S.add_box(basis, (10,4), 6, Material.brick(), (Material.diffzone(), [1,1,1,1]))
-    
-    basis = S.offset([5,5,0])
-    S.add_box(basis, (6,8), (5,2), Material.concrete(), (Material.diffzone(), [1,1,0,1]))
-    
-    S.add_box(S, ((20, [0,10,30,60,100]),8), (7,1), Material.glass(), (Material.diffzone(), [1,1,0,1]))
-    
-    S.add_box(S, ((20, [270,315]),8), (7,1), Material.barrier(), (Material.diffzone(), [1,1,1,1]))
-
-    S.add_tree(S.offset([-15,5,0]), 2, 5, 3)
-    S.add_tree(S.offset([-15,15,0]), 2, 5, 2)
-
-    basis = S.offset([-5,10,0])
-    S.add_box(basis, (2,2), 2, Material.source())
-
-    # Add a receiver
-    basis = S.rotate_k(90, [0,-5,2])
-    l_ear, r_ear = S.make_receiver(basis, 2)
+l_ear, r_ear = Scenes.case(S, case)
 
 search_iterations = 0
 drop_if = 0.999
@@ -256,13 +50,8 @@ view.bgcolor = '#efefef'
 view.camera  = TurntableCamera(scale_factor=sf)
 view.padding = 10
 
-for p in S.polygons:
-    v, c = p.vertices()
-    f, e = p.get_colors(lv, 0.7)
-    if f is not None:
-        scene.visuals.Mesh(vertices=v, faces=range(0,c), color=f, mode='triangle_fan', parent=view.scene)
-    if e is not None:
-        scene.visuals.Mesh(vertices=v, faces=range(0,c), color=e, mode='lines', parent=view.scene)
+# one mesh per category of polygon, rather than one per polygon
+Renderer(lv, 0.7).draw(S.polygons, view.scene)
 
 # & go...
 canvas.app.run()
@@ -6,195 +6,127 @@ import numpy as np
 import xlwings as xw
 
 from Noise.Space import Space
-from Noise.Material import Material
+from Noise.Renderer import Renderer
+from Noise.Batch import Batch
+from Noise.Scenes import Scenes
 
-def dB_get(totals, label):
-    if label in totals:
-        value = totals[label]
-    else:
-        value = 0
-    return value
+# The scene & its source-materials are in Noise/Scenes.py, shared with benchmark.py
 
-# Setup the spreadsheet
+def fill_row(sheet, row, batch, variant, receiver):
+    sheet[row, 0].value = variant
 
-wb = xw.Book()
+    sheet[row, 1].value = batch.value(variant, receiver, 'left', 'total')
+    sheet[row, 2].value = batch.value(variant, receiver, 'left', 'Engine')
+    sheet[row, 3].value = batch.value(variant, receiver, 'left', 'HVAC')
+    sheet[row, 4].value = batch.value(variant, receiver, 'left', 'Rail')
+    sheet[row, 5].value = batch.value(variant, receiver, 'left', 'Wheel')
 
-gs = wb.sheets.add('Ground')
-gs[0, 0].value = 'Vehicle Position'
-gs[0, 1].value = 'Left Total'
-gs[0, 2].value = 'Engine'
-gs[0, 3].value = 'HVAC'
-gs[0, 4].value = 'Rails'
-gs[0, 5].value = 'Wheels'
-gs[0, 6].value = 'Right Total'
-gs[0, 7].value = 'Engine'
-gs[0, 8].value = 'HVAC'
-gs[0, 9].value = 'Rails'
-gs[0,10].value = 'Wheels'
+    sheet[row, 6].value = batch.value(variant, receiver, 'right', 'total')
+    sheet[row, 7].value = batch.value(variant, receiver, 'right', 'Engine')
+    sheet[row, 8].value = batch.value(variant, receiver, 'right', 'HVAC')
+    sheet[row, 9].value = batch.value(variant, receiver, 'right', 'Rail')
+    sheet[row,10].value = batch.value(variant, receiver, 'right', 'Wheel')
 
-ws = wb.sheets.add('Window')
-ws[0, 0].value = 'Vehicle Position'
-ws[0, 1].value = 'Left Total'
-ws[0, 2].value = 'Engine'
-ws[0, 3].value = 'HVAC'
-ws[0, 4].value = 'Rails'
-ws[0, 5].value = 'Wheels'
-ws[0, 6].value = 'Right Total'
-ws[0, 7].value = 'Engine'
-ws[0, 8].value = 'HVAC'
-ws[0, 9].value = 'Rails'
-ws[0,10].value = 'Wheels'
+# Worker processes (spawned on Windows & macOS) import this script too, so only the main process runs the study
 
-wb.save('test.xlsx')
+if __name__ == '__main__':
+    # Setup the spreadsheet
 
-row = 1
+    wb = xw.Book()
 
-# Make the source-materials
+    gs = wb.sheets.add('Ground')
+    gs[0, 0].value = 'Vehicle Position'
+    gs[0, 1].value = 'Left Total'
+    gs[0, 2].value = 'Engine'
+    gs[0, 3].value = 'HVAC'
+    gs[0, 4].value = 'Rails'
+    gs[0, 5].value = 'Wheels'
+    gs[0, 6].value = 'Right Total'
+    gs[0, 7].value = 'Engine'
+    gs[0, 8].value = 'HVAC'
+    gs[0, 9].value = 'Rails'
+    gs[0,10].value = 'Wheels'
 
-engine = Material('Engine', (1,0,0,1))
-engine.make_source(0,80)
+    ws = wb.sheets.add('Window')
+    ws[0, 0].value = 'Vehicle Position'
+    ws[0, 1].value = 'Left Total'
+    ws[0, 2].value = 'Engine'
+    ws[0, 3].value = 'HVAC'
+    ws[0, 4].value = 'Rails'
+    ws[0, 5].value = 'Wheels'
+    ws[0, 6].value = 'Right Total'
+    ws[0, 7].value = 'Engine'
+    ws[0, 8].value = 'HVAC'
+    ws[0, 9].value = 'Rails'
+    ws[0,10].value = 'Wheels'
 
-hvac = Material('HVAC', (0,0,1,1))
-hvac.make_source(0,30)
+    wb.save('test.xlsx')
 
-wheel = Material('Wheel', (0.75,0.75,0.75,1))
-wheel.make_source(0,50)
+    row = 1
 
-rail = Material('Rail', (0.25,0.25,0.25,1))
-rail.make_source(0,50)
+    sf = 120 # scale factor for final view
 
-# Note: Rolling Noise: Lp = Lp0 + 30 log10 (V / V0), where Lp0 is the noise level at the speed V0
-#       [https://www.southampton.ac.uk/engineering/research/groups/dynamics/rail/rolling_railway_noise.page]
+    search_iterations = 6
+    drop_if = 0.999
+    show_projections = True # the projections of the searches of the scene displayed
+    csv_file = None # e.g., 'train.csv', for a tidy table of every job's results & timings
 
-sf = 120 # scale factor for final view
+    # Make the scenes; every (vehicle position, receiver, ear) search runs in parallel
 
-search_iterations = 6
-drop_if = 0.999
-show_projections = True
+    positions = range(-38, 39)
 
-# Make the scene
+    batch = Batch(search_iterations, drop_if)
+
+    for x in positions:
+        batch.add_variant(x, Scenes.train, x)
+
+    receivers = [('Window', Scenes.window(Space())), ('Ground', Scenes.ground(Space()))]
+
+    for r_label, basis in receivers:
+        batch.add_receiver(r_label, basis, 2)
+
+    batch.run()
+
+    for x in positions:
+        fill_row(ws, row, batch, x, 'Window')
+        fill_row(gs, row, batch, x, 'Ground')
+
+        row += 1
+        #wb.save()
+
+    if csv_file is not None:
+        batch.write_csv(csv_file)
+
+    # Finished collecting data now; close the spreadsheet
+    #wb.close()
+
+    # Display scene (the last variant)
 
-for x in range(-38, 39):
     S = Space()
+    Scenes.train(S, positions[-1])
+
+    if show_projections: # search the scene again, here, to add the projections to it
+        for r_label, basis in receivers:
+            l_ear, r_ear = S.make_receiver(basis, 2)
+            l_ear.search(search_iterations, drop_if, show_projections)
+            r_ear.search(search_iterations, drop_if, show_projections)
+
+    # Normalised vector towards the sun / light-source
+    lv_phi = 200 * np.pi / 180
+    lv_psi =  60 * np.pi / 180
+    lv = [np.cos(lv_phi)*np.cos(lv_psi),np.sin(lv_phi)*np.cos(lv_psi),np.sin(lv_psi)]
+
+    # VisPy scene setup
+    canvas = scene.SceneCanvas(keys='interactive', size=(1200, 900), show=True)
+
+    # Set up a viewbox to display the cube with interactive arcball
+    view = canvas.central_widget.add_view()
+    view.bgcolor = '#efefef'
+    view.camera  = TurntableCamera(scale_factor=sf)
+    view.padding = 10
+
+    # one mesh per category of polygon, rather than one per polygon
+    Renderer(lv, 0.7).draw(S.polygons, view.scene)
 
-    B = S.offset([0,-30,0])
-
-    S.add_box(B.offset([ 0,44.5,-1]), (100,9), 1, Material.concrete())
-    S.add_box(B.offset([20,40.5, 0]), ( 60,1), 4, Material.barrier(), (Material.diffzone(), [0,0,0,1]))
-
-    S.add_box(B.offset([  0,  0,0]), (40,40), 1, Material.concrete())
-
-    S.add_box(B.offset([ 19, 30,0]), (62,20), 1, Material.grass())
-    S.add_box(B.offset([-35, 14,0]), (30,52), 1, Material.grass())
-    S.add_box(B.offset([-19,-35,0]), (62,30), 1, Material.grass())
-    S.add_box(B.offset([ 35,-19,0]), (30,62), 1, Material.grass())
-
-    S.add_box(B.offset([ 16,-35,0]), (8,30), 1, Material.concrete())
-    S.add_box(B.offset([-35,-16,0]), (30,8), 1, Material.concrete())
-    S.add_box(B.offset([ 35, 16,0]), (30,8), 1, Material.concrete())
-    S.add_box(B.offset([-16, 30,0]), (8,20), 1, Material.concrete())
-
-    S.add_box(B.rotate_k(-30,[0,0,1]), (20,20), 40, Material.brick(), (Material.diffzone(), [1,1,0,1]))
-
-    V = B.offset([x,46,0])
-
-    S.add_box(V.offset([ 0,   0,    1    ]), (20,   3   ), 3,    Material.glass())
-    S.add_box(V.offset([ 0,   0,    4    ]), ( 2,   2   ), 0.25, hvac)
-    S.add_box(V.offset([ 0,   0,    0.5  ]), ( 2,   2   ), 0.5,  engine)
-    S.add_box(V.offset([-8,  -0.75, 0    ]), ( 8,   0.25), 0.25, rail)
-    S.add_box(V.offset([-8,   0.75, 0    ]), ( 8,   0.25), 0.25, rail)
-    S.add_box(V.offset([ 8,  -0.75, 0    ]), ( 8,   0.25), 0.25, rail)
-    S.add_box(V.offset([ 8,   0.75, 0    ]), ( 8,   0.25), 0.25, rail)
-    S.add_box(V.offset([-9.5,-0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
-    S.add_box(V.offset([-6.5,-0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
-    S.add_box(V.offset([-9.5, 0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
-    S.add_box(V.offset([-6.5, 0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
-    S.add_box(V.offset([ 9.5,-0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
-    S.add_box(V.offset([ 6.5,-0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
-    S.add_box(V.offset([ 9.5, 0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
-    S.add_box(V.offset([ 6.5, 0.75, 0.25 ]), ( 0.75,0.25), 0.75, wheel)
-
-    # Add receivers
-
-    print('=== Window ===')
-    w_l_ear, w_r_ear = S.make_receiver(B.rotate_k(-30,[0,0,1]).rotate_k(90,[0,10.5,30]), 2)
-    print('Left ear: Searching...')
-    w_l_sources = w_l_ear.search(search_iterations, drop_if, show_projections)
-    print('Right ear: Searching...')
-    w_r_sources = w_r_ear.search(search_iterations, drop_if, show_projections)
-    print('Left ear: Calculating...')
-    w_l_totals = w_l_ear.calc()
-    print('Right ear: Calculating...')
-    w_r_totals = w_r_ear.calc()
-
-    ws[row, 0].value = x
-
-    ws[row, 1].value = dB_get(w_l_totals, 'total')
-    ws[row, 2].value = dB_get(w_l_totals, 'Engine')
-    ws[row, 3].value = dB_get(w_l_totals, 'HVAC')
-    ws[row, 4].value = dB_get(w_l_totals, 'Rail')
-    ws[row, 5].value = dB_get(w_l_totals, 'Wheel')
-
-    ws[row, 6].value = dB_get(w_r_totals, 'total')
-    ws[row, 7].value = dB_get(w_r_totals, 'Engine')
-    ws[row, 8].value = dB_get(w_r_totals, 'HVAC')
-    ws[row, 9].value = dB_get(w_r_totals, 'Rail')
-    ws[row,10].value = dB_get(w_r_totals, 'Wheel')
-
-    print('=== Ground ===')
-    g_l_ear, g_r_ear = S.make_receiver(B.rotate_k(90, [-20,30,2]), 2)
-    print('Left ear: Searching...')
-    g_l_sources = g_l_ear.search(search_iterations, drop_if, show_projections)
-    print('Right ear: Searching...')
-    g_r_sources = g_r_ear.search(search_iterations, drop_if, show_projections)
-    print('Left ear: Calculating...')
-    g_l_totals = g_l_ear.calc()
-    print('Right ear: Calculating...')
-    g_r_totals = g_r_ear.calc()
-
-    gs[row, 0].value = x
-
-    gs[row, 1].value = dB_get(g_l_totals, 'total')
-    gs[row, 2].value = dB_get(g_l_totals, 'Engine')
-    gs[row, 3].value = dB_get(g_l_totals, 'HVAC')
-    gs[row, 4].value = dB_get(g_l_totals, 'Rail')
-    gs[row, 5].value = dB_get(g_l_totals, 'Wheel')
-
-    gs[row, 6].value = dB_get(g_r_totals, 'total')
-    gs[row, 7].value = dB_get(g_r_totals, 'Engine')
-    gs[row, 8].value = dB_get(g_r_totals, 'HVAC')
-    gs[row, 9].value = dB_get(g_r_totals, 'Rail')
-    gs[row,10].value = dB_get(g_r_totals, 'Wheel')
-
-    row += 1
-    #wb.save()
-
-# Finished collecting data now; close the spreadsheet
-#wb.close()
-
-# Display scene
-
-# Normalised vector towards the sun / light-source
-lv_phi = 200 * np.pi / 180
-lv_psi =  60 * np.pi / 180
-lv = [np.cos(lv_phi)*np.cos(lv_psi),np.sin(lv_phi)*np.cos(lv_psi),np.sin(lv_psi)]
-
-# VisPy scene setup
-canvas = scene.SceneCanvas(keys='interactive', size=(1200, 900), show=True)
-
-# Set up a viewbox to display the cube with interactive arcball
-view = canvas.central_widget.add_view()
-view.bgcolor = '#efefef'
-view.camera  = TurntableCamera(scale_factor=sf)
-view.padding = 10
-
-for p in S.polygons:
-    v, c = p.vertices()
-    f, e = p.get_colors(lv, 0.7)
-    if f is not None:
-        scene.visuals.Mesh(vertices=v, faces=range(0,c), color=f, mode='triangle_fan', parent=view.scene)
-    if e is not None:
-        scene.visuals.Mesh(vertices=v, faces=range(0,c), color=e, mode='lines', parent=view.scene)
-
-# & go...
-canvas.app.run()
+    # & go...
+    canvas.app.run()